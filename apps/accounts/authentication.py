@@ -0,0 +1,133 @@
+"""
+JWT authentication that trusts signed claims instead of loading the user.
+
+Tokens from /auth/jwt/create/ and /auth/jwt/refresh/ carry
+
+    {"user_id": 7, "username": "anna", "is_staff": false,
+     "is_superuser": false, "roles": ["Delivery crew"], ...}
+
+and ClaimsJWTAuthentication turns them into a ``User`` built from those
+fields alone: every other field is deferred and loads on first access, and the
+roles are already memoised for get_roles(). Filters, FK assignments and
+permission checks work as with a loaded user, with no query for identity.
+
+Claims go stale when a user is saved, deleted or changes groups: the signals
+stamp ``claims-stale:<id>`` in the cache and tokens issued before the stamp
+take the database path again (a new token from /refresh/ is current). With the
+per-process LocMem cache the stamp only reaches the current worker, like the
+role cache; set CACHE_BACKEND to a shared cache when running several.
+
+Views that need more than the claims (the email) use ``load_account()``, a
+short-lived cache (USER_CACHE_TTL) of the few fields they show: never the
+model instance, so the password hash does not end up in a shared cache.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .roles import get_roles, remember_roles
+
+CLAIM_FIELDS = ("username", "is_staff", "is_superuser")
+ACCOUNT_FIELDS = ("id", "username", "email")  # что кешируется в load_account; без пароля
+ROLES_CLAIM = "roles"
+
+
+def _stale_key(user_id):
+    return f"claims-stale:{user_id}"
+
+
+def _user_key(user_id):
+    return f"user:{user_id}"
+
+
+def add_claims(token, user):
+    """Stamp ``user``'s identity and roles on ``token`` (refresh or access)."""
+    for field in CLAIM_FIELDS:
+        token[field] = getattr(user, field)
+    token[ROLES_CLAIM] = sorted(get_roles(user))
+    return token
+
+
+def claims_changed(*user_ids):
+    """Tokens issued before now no longer speak for these users; drop their cached rows."""
+    if not user_ids:
+        return
+    now = time.time()
+    # штамп живёт не дольше access-токена: более старые токены уже истекли
+    ttl = int(jwt_settings.ACCESS_TOKEN_LIFETIME.total_seconds()) + 1
+    cache.set_many({_stale_key(uid): now for uid in user_ids}, ttl)
+    cache.delete_many([_user_key(uid) for uid in user_ids])
+
+
+def _has_claims(token):
+    return ROLES_CLAIM in token and all(field in token for field in CLAIM_FIELDS)
+
+
+def _is_current(token, stale_since):
+    return stale_since is None or token.get("iat", 0) > stale_since
+
+
+def _build_user(token):
+    User = get_user_model()
+    id_field = User._meta.get_field(jwt_settings.USER_ID_FIELD)
+    claims = {
+        # simplejwt пишет user_id строкой — приводим к типу поля
+        id_field.attname: id_field.to_python(token[jwt_settings.USER_ID_CLAIM]),
+        "is_active": True,  # неактивным токены не выдаются, деактивация ставит штамп
+        **{field: token[field] for field in CLAIM_FIELDS},
+    }
+    fields = [f.attname for f in User._meta.concrete_fields if f.attname in claims]
+    user = User.from_db(router.db_for_read(User), fields, [claims[name] for name in fields])
+    remember_roles(user, token[ROLES_CLAIM])
+    return user
+
+
+def claims_user(token):
+    """User built from ``token``'s claims, or None when it has none or they are stale."""
+    if not _has_claims(token):
+        return None
+    if not _is_current(token, cache.get(_stale_key(token[jwt_settings.USER_ID_CLAIM]))):
+        return None
+    return _build_user(token)
+
+
+async def aclaims_user(token):
+    if not _has_claims(token):
+        return None
+    if not _is_current(token, await cache.aget(_stale_key(token[jwt_settings.USER_ID_CLAIM]))):
+        return None
+    return _build_user(token)
+
+
+def load_account(user_id):
+    """{id, username, email} of the user, from a short-lived cache (None if there is no such user)."""
+    key = _user_key(user_id)
+    account = cache.get(key)
+    if account is None:
+        account = get_user_model().objects.filter(pk=user_id).values(*ACCOUNT_FIELDS).first()
+        if account is not None:
+            cache.set(key, account, getattr(settings, "USER_CACHE_TTL", 60))
+    return account
+
+
+async def aload_account(user_id):
+    key = _user_key(user_id)
+    account = await cache.aget(key)
+    if account is None:
+        account = await get_user_model().objects.filter(pk=user_id).values(*ACCOUNT_FIELDS).afirst()
+        if account is not None:
+            await cache.aset(key, account, getattr(settings, "USER_CACHE_TTL", 60))
+    return account
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication without the per-request user query for tokens that carry claims."""
+
+    def get_user(self, validated_token):
+        user = claims_user(validated_token)
+        return user if user is not None else super().get_user(validated_token)
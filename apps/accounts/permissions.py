@@ -1,12 +1,14 @@
 from rest_framework.permissions import BasePermission
 
+from .roles import MANAGER, DELIVERY, get_roles
+
 def in_group(user, name):
-    return user.is_authenticated and user.groups.filter(name=name).exists()
+    return name in get_roles(user)
 
 class IsManager(BasePermission):
     def has_permission(self, request, view):
-        return in_group(request.user, "Manager")
+        return in_group(request.user, MANAGER)
 
 class IsDeliveryCrew(BasePermission):
     def has_permission(self, request, view):
-        return in_group(request.user, "Delivery crew")
+        return in_group(request.user, DELIVERY)
@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.core.cache import cache
+
+MANAGER = "Manager"
+DELIVERY = "Delivery crew"
+
+# атрибут на объекте пользователя: роли считаются один раз за запрос
+_ATTR = "_ll_roles"
+
+
+def _cache_key(user_id):
+    return f"roles:{user_id}"
+
+
+def get_roles(user) -> frozenset:
+    """Group names of ``user``: per-request memo -> shared cache -> one query."""
+    if not user or not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, _ATTR, None)
+    if roles is not None:
+        return roles
+    key = _cache_key(user.pk)
+    names = cache.get(key)
+    if names is None:
+        names = list(user.groups.values_list("name", flat=True))
+        cache.set(key, names, getattr(settings, "ROLE_CACHE_TTL", 300))
+    roles = frozenset(names)
+    setattr(user, _ATTR, roles)
+    return roles
+
+
+def remember_roles(user, names):
+    """Memoise roles already known for ``user`` (e.g. from token claims)."""
+    setattr(user, _ATTR, frozenset(names))
+
+
+def invalidate_roles(*user_ids):
+    cache.delete_many([_cache_key(uid) for uid in user_ids])
+
+
+async def aget_roles(user) -> frozenset:
+    """Async twin of get_roles() for the async read views."""
+    if not user or not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, _ATTR, None)
+    if roles is not None:
+        return roles
+    key = _cache_key(user.pk)
+    names = await cache.aget(key)
+    if names is None:
+        names = [name async for name in user.groups.values_list("name", flat=True)]
+        await cache.aset(key, names, getattr(settings, "ROLE_CACHE_TTL", 300))
+    roles = frozenset(names)
+    setattr(user, _ATTR, roles)
+    return roles
+
+
+def _role(user, roles) -> str:
+    if user.is_staff or MANAGER in roles:
+        return "manager"
+    if DELIVERY in roles:
+        return "delivery"
+    return "user"
+
+
+def derive_role(user) -> str:
+    if user.is_superuser:
+        return "admin"
+    return _role(user, get_roles(user))
+
+
+async def aderive_role(user) -> str:
+    if user.is_superuser:
+        return "admin"
+    return _role(user, await aget_roles(user))
@@ -1,5 +1,9 @@
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from django.contrib.auth.models import User
+from .authentication import add_claims
 from .models import Profile
 
 
@@ -11,4 +15,36 @@ class ProfileSerializer(serializers.ModelSerializer):
 class UserTinySerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ["id", "username", "email"]
\ No newline at end of file
+        fields = ["id", "username", "email"]
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """/auth/jwt/create/: tokens carry identity + roles (see authentication.py)."""
+
+    @classmethod
+    def get_token(cls, user):
+        return add_claims(super().get_token(user), user)
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """/auth/jwt/refresh/: re-reads the user so the new tokens carry current claims."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user = User.objects.filter(**{jwt_settings.USER_ID_FIELD: refresh.get(jwt_settings.USER_ID_CLAIM)}).first()
+        if user is None or not jwt_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+        add_claims(refresh, user)
+
+        data = {"access": str(refresh.access_token)}
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            if jwt_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:  # token_blacklist не установлен
+                    pass
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data["refresh"] = str(refresh)
+        return data
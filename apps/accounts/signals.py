@@ -1,11 +1,42 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from .models import Profile
+from .authentication import claims_changed
+from .roles import invalidate_roles
 
 User = get_user_model()
 
+def roles_changed(*user_ids):
+    invalidate_roles(*user_ids)
+    claims_changed(*user_ids)
+
 @receiver(post_save, sender=User)
 def ensure_profile(sender, instance, created, **kwargs):
     if created:
-        Profile.objects.get_or_create(user=instance)
\ No newline at end of file
+        Profile.objects.get_or_create(user=instance)
+
+@receiver(post_save, sender=User)
+def reset_claims_on_save(sender, instance, created, **kwargs):
+    if not created:
+        # имя/флаги могли поменяться: токены с прежними claims идут через БД
+        claims_changed(instance.pk)
+
+@receiver(m2m_changed, sender=User.groups.through)
+def reset_roles_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear", "pre_clear"):
+        return
+    if not reverse:
+        # user.groups.add(...) / remove / clear
+        instance.__dict__.pop("_ll_roles", None)
+        roles_changed(instance.pk)
+    elif action == "pre_clear":
+        # group.user_set.clear(): pk_set is empty, collect members before they go
+        roles_changed(*instance.user_set.values_list("pk", flat=True))
+    elif pk_set:
+        # group.user_set.add(...) / remove
+        roles_changed(*pk_set)
+
+@receiver(post_delete, sender=User)
+def reset_roles_on_delete(sender, instance, **kwargs):
+    roles_changed(instance.pk)
@@ -1,3 +1,162 @@
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from .permissions import in_group
+from .roles import MANAGER, DELIVERY, derive_role, get_roles
+
+
+class RoleCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.g_manager, _ = Group.objects.get_or_create(name=MANAGER)
+        cls.g_delivery, _ = Group.objects.get_or_create(name=DELIVERY)
+        cls.user = User.objects.create_user("u1", password="pass")
+
+    def setUp(self):
+        cache.clear()
+
+    def fresh(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_roles_resolved_once_per_request(self):
+        u = self.fresh()
+        with self.assertNumQueries(1):
+            in_group(u, MANAGER)
+            in_group(u, DELIVERY)
+            derive_role(u)
+
+    def test_roles_cached_across_requests(self):
+        get_roles(self.fresh())
+        u = self.fresh()
+        with self.assertNumQueries(0):
+            self.assertEqual(derive_role(u), "user")
+
+    def test_user_groups_add_invalidates(self):
+        self.assertFalse(in_group(self.fresh(), MANAGER))
+        self.user.groups.add(self.g_manager)
+        self.assertTrue(in_group(self.fresh(), MANAGER))
+        self.user.groups.remove(self.g_manager)
+        self.assertFalse(in_group(self.fresh(), MANAGER))
+
+    def test_group_user_set_invalidates(self):
+        self.assertEqual(derive_role(self.fresh()), "user")
+        self.g_delivery.user_set.add(self.user)
+        self.assertEqual(derive_role(self.fresh()), "delivery")
+        self.g_delivery.user_set.clear()
+        self.assertEqual(derive_role(self.fresh()), "user")
+
+    def test_anonymous_has_no_roles(self):
+        from django.contrib.auth.models import AnonymousUser
+        self.assertFalse(in_group(AnonymousUser(), MANAGER))
+
+
+class AsyncMeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("u1", email="u1@example.com", password="pass")
+        cls.user.groups.add(Group.objects.get_or_create(name=DELIVERY)[0])
+
+    def setUp(self):
+        cache.clear()
+
+    def auth(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        return {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+    async def test_me_and_role(self):
+        r = await self.async_client.get("/api/me", headers=self.auth())
+        self.assertEqual(r.json(), {"id": self.user.id, "username": "u1", "email": "u1@example.com"})
+        r = await self.async_client.get("/api/me/role", headers=self.auth())
+        self.assertEqual(r.json(), {"role": "delivery"})
+
+    async def test_bad_token_and_wrong_method(self):
+        r = await self.async_client.get("/api/me", headers={"Authorization": "Bearer nope"})
+        self.assertEqual(r.status_code, 401)
+        r = await self.async_client.post("/api/me/role", headers=self.auth())
+        self.assertEqual(r.status_code, 405)
+
+    def test_account_cache_has_no_password(self):
+        self.client.get("/api/me", headers=self.auth())
+        self.assertEqual(cache.get(f"user:{self.user.pk}"),
+                         {"id": self.user.id, "username": "u1", "email": "u1@example.com"})
+
+    async def test_deleted_user_with_valid_claims_is_401(self):
+        headers = self.auth()
+        await User.objects.filter(pk=self.user.pk).adelete()
+        await cache.aclear()  # штамп устаревания остался в другом воркере
+        r = await self.async_client.get("/api/me", headers=headers)
+        self.assertEqual(r.status_code, 401)
+
+
+class ClaimsAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.g_manager, _ = Group.objects.get_or_create(name=MANAGER)
+        cls.g_delivery, _ = Group.objects.get_or_create(name=DELIVERY)
+        cls.user = User.objects.create_user("crew1", email="c@example.com", password="pass")
+        cls.user.groups.add(cls.g_delivery)
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self):
+        r = self.client.post("/auth/jwt/create/", {"username": "crew1", "password": "pass"},
+                             content_type="application/json")
+        self.assertEqual(r.status_code, 200, r.content)
+        return r.json()
+
+    def bearer(self, access):
+        return {"Authorization": f"Bearer {access}"}
+
+    def test_tokens_carry_claims(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        token = AccessToken(self.login()["access"])
+        self.assertEqual(token["username"], "crew1")
+        self.assertEqual(token["roles"], [DELIVERY])
+        self.assertIs(token["is_staff"], False)
+
+    def test_reads_need_no_identity_query(self):
+        access = self.login()["access"]
+        cache.clear()
+        with self.assertNumQueries(0):
+            r = self.client.get("/api/me/role", headers=self.bearer(access))
+        self.assertEqual(r.json(), {"role": "delivery"})
+        with self.assertNumQueries(1):  # только корзина
+            r = self.client.get("/api/cart/menu-items", headers=self.bearer(access))
+        self.assertEqual(r.status_code, 200)
+
+    def test_claims_user_loads_the_rest_lazily(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        from .authentication import claims_user
+        user = claims_user(AccessToken(self.login()["access"]))
+        self.assertEqual(user, self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, "c@example.com")
+        r = self.client.get("/api/me", headers=self.bearer(self.login()["access"]))
+        self.assertEqual(r.json()["email"], "c@example.com")
+
+    def test_me_for_deleted_user_is_401(self):
+        headers = self.bearer(self.login()["access"])
+        self.user.delete()
+        cache.clear()  # штамп устаревания остался в другом воркере
+        self.assertEqual(self.client.get("/api/me", headers=headers).status_code, 401)
+
+    def test_stale_claims_fall_back_to_database(self):
+        tokens = self.login()
+        self.user.groups.add(self.g_manager)
+        r = self.client.get("/api/me/role", headers=self.bearer(tokens["access"]))
+        self.assertEqual(r.json(), {"role": "manager"})
+
+        r = self.client.post("/auth/jwt/refresh/", {"refresh": tokens["refresh"]}, content_type="application/json")
+        self.assertEqual(r.status_code, 200, r.content)
+        from rest_framework_simplejwt.tokens import AccessToken
+        self.assertEqual(sorted(AccessToken(r.json()["access"])["roles"]), sorted([MANAGER, DELIVERY]))
+
+    def test_deactivated_user_is_rejected(self):
+        access = self.login()["access"]
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.user.refresh_from_db()
+        self.user.save()  # сохранение ставит штамп устаревания
+        r = self.client.get("/api/cart/menu-items", headers=self.bearer(access))
+        self.assertEqual(r.status_code, 401)
@@ -2,6 +2,7 @@ from django.test import TestCase
 from django.contrib.auth.models import User, Group
 from rest_framework.test import APIClient
 from rest_framework import status
+from django.core.cache import cache
 from decimal import Decimal
 
 # Группы
@@ -40,6 +41,7 @@ class BaseSetup(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.c = APIClient()
 
     # JWT login через Djoser: /auth/jwt/create/
@@ -2,7 +2,7 @@
 from django.urls import path
 from .views import (
     ManagerUsersView, ManagerUserDetailView,
-    DeliveryCrewUsersView, DeliveryCrewUserDetailView, me, me_role
+    DeliveryCrewUsersView, DeliveryCrewUserDetailView, AsyncMeView, AsyncMeRoleView
 )
 
 urlpatterns = [
@@ -10,6 +10,6 @@ urlpatterns = [
     path("groups/manager/users/<int:user_id>", ManagerUserDetailView.as_view()),
     path("groups/delivery-crew/users", DeliveryCrewUsersView.as_view()),
     path("groups/delivery-crew/users/<int:user_id>", DeliveryCrewUserDetailView.as_view()),
-    path("me", me),
-    path("me/role", me_role),
+    path("me", AsyncMeView.as_view()),
+    path("me/role", AsyncMeRoleView.as_view()),
 ]
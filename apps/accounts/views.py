@@ -4,41 +4,50 @@ from rest_framework import permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from apps.orders.serializers import UserTinySerializer
 
 from .permissions import IsManager
-# Create your views here.
-
-MANAGER = "Manager"
-DELIVERY = "Delivery crew"
+from apps.common.async_views import AsyncReadView
 
-def derive_role(u) -> str:
-    if u.is_superuser:
-        return "admin"
-    if u.is_staff or u.groups.filter(name=MANAGER).exists():
-        return "manager"
-    if u.groups.filter(name=DELIVERY).exists():
-        return "delivery"
-    return "user"
+from .authentication import load_account, aload_account
+from .roles import MANAGER, DELIVERY, derive_role, aderive_role
+# Create your views here.
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def me(request):
-    u = request.user
-    return Response({
-        "id": u.id,
-        "username": u.username,
-        "email": u.email
-    })
+    # email нет в claims токена — берём из кеша учётных записей
+    account = load_account(request.user.pk)
+    if account is None:  # удалён после выдачи токена
+        raise AuthenticationFailed("User not found", code="user_not_found")
+    return Response(account)
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def me_role(request):
     return Response({"role": derive_role(request.user)})
 
+class AsyncMeView(AsyncReadView):
+    drf_view = me.cls
+    write_view = me
+
+    async def get(self, request, *args, **kwargs):
+        account = await aload_account(request.user.pk)
+        if account is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        return self.render(account)
+
+class AsyncMeRoleView(AsyncReadView):
+    drf_view = me_role.cls
+    write_view = me_role
+
+    async def get(self, request, *args, **kwargs):
+        return self.render({"role": await aderive_role(request.user)})
+
 class ManagerUsersView(APIView):
     """
     GET  /api/groups/manager/users        -> list managers
@@ -50,7 +59,7 @@ class ManagerUsersView(APIView):
         return [permissions.IsAuthenticated(), IsManager()]
 
     def get(self, request):
-        managers = User.objects.filter(groups__name="Manager")
+        managers = User.objects.filter(groups__name=MANAGER)
         return Response(UserTinySerializer(managers, many=True).data)
 
     def post(self, request):
@@ -58,7 +67,7 @@ class ManagerUsersView(APIView):
         if not user_id:
             return Response({"detail": "user_id is required"}, status=400)
         user = get_object_or_404(User, pk=user_id)
-        group, _ = Group.objects.get_or_create(name="Manager")
+        group, _ = Group.objects.get_or_create(name=MANAGER)
         group.user_set.add(user)
         return Response(UserTinySerializer(user).data, status=201)
 
@@ -73,10 +82,10 @@ class ManagerUserDetailView(APIView):
         return [permissions.IsAuthenticated(), IsManager()]
 
     def delete(self, request, user_id):
-        user = User.objects.filter(pk=user_id, groups__name="Manager").first()
+        user = User.objects.filter(pk=user_id, groups__name=MANAGER).first()
         if not user:
             return Response({"detail": "Not found"}, status=404)
-        group = Group.objects.get(name="Manager")
+        group = Group.objects.get(name=MANAGER)
         group.user_set.remove(user)
         return Response(status=200)
 
@@ -92,7 +101,7 @@ class DeliveryCrewUsersView(APIView):
         return [permissions.IsAuthenticated(), IsManager()]
 
     def get(self, request):
-        crew = User.objects.filter(groups__name="Delivery crew")
+        crew = User.objects.filter(groups__name=DELIVERY)
         return Response(UserTinySerializer(crew, many=True).data)
 
     def post(self, request):
@@ -100,7 +109,7 @@ class DeliveryCrewUsersView(APIView):
         if not user_id:
             return Response({"detail": "user_id is required"}, status=400)
         user = get_object_or_404(User, pk=user_id)
-        group, _ = Group.objects.get_or_create(name="Delivery crew")
+        group, _ = Group.objects.get_or_create(name=DELIVERY)
         group.user_set.add(user)
         return Response(UserTinySerializer(user).data, status=201)
 
@@ -115,9 +124,9 @@ class DeliveryCrewUserDetailView(APIView):
         return [permissions.IsAuthenticated(), IsManager()]
 
     def delete(self, request, user_id):
-        user = User.objects.filter(pk=user_id, groups__name="Delivery crew").first()
+        user = User.objects.filter(pk=user_id, groups__name=DELIVERY).first()
         if not user:
             return Response({"detail": "Not found"}, status=404)
-        group = Group.objects.get(name="Delivery crew")
+        group = Group.objects.get(name=DELIVERY)
         group.user_set.remove(user)
         return Response(status=200)
\ No newline at end of file
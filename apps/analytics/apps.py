@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class AnalyticsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = "apps.analytics"
+    verbose_name = "Analytics"
+
+    def ready(self):
+        from . import signals
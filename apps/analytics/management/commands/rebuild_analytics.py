@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.analytics.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the sales rollups from the orders, archived ones included (after bulk loads or raw SQL writes)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=50_000, help="Order ids per aggregation query")
+
+    def handle(self, *args, **opts):
+        verbose = opts["verbosity"] > 1
+        stats = rebuild(
+            chunk_size=opts["chunk_size"],
+            progress=(lambda last_id: self.stdout.write(f"  up to order {last_id}")) if verbose else None,
+        )
+        self.stdout.write(", ".join(f"{name}: {count} rows" for name, count in stats.items()))
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('menu', '0004_menuitem_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.IntegerField(default=0)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('delivered_orders', models.IntegerField(default=0)),
+                ('delivered_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('day', models.DateField(unique=True)),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.IntegerField(default=0)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('delivered_orders', models.IntegerField(default=0)),
+                ('delivered_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('day', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+            ],
+            options={
+                'ordering': ['day', 'hour'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'hour'), name='hourlysales_day_hour_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CategoryDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.IntegerField(default=0)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('day', models.DateField()),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='menu.category')),
+            ],
+            options={
+                'ordering': ['day', 'category'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'category'), name='categorydailysales_day_cat_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ItemDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.IntegerField(default=0)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('day', models.DateField()),
+                ('menuitem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='menu.menuitem')),
+            ],
+            options={
+                'ordering': ['day', 'menuitem'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'menuitem'), name='itemdailysales_day_item_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+from django.db import models
+
+from apps.menu.models import Category, MenuItem
+
+
+class Counters(models.Model):
+    # счётчики только растут/убывают через rollups.py (UPDATE x = x + delta)
+    orders = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class DeliveryCounters(Counters):
+    delivered_orders = models.IntegerField(default=0)
+    delivered_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class DailySales(DeliveryCounters):
+    day = models.DateField(unique=True)
+
+    class Meta:
+        ordering = ["day"]
+
+
+class HourlySales(DeliveryCounters):
+    day = models.DateField()
+    hour = models.PositiveSmallIntegerField()  # 0..23, TIME_ZONE
+
+    class Meta:
+        ordering = ["day", "hour"]
+        constraints = [
+            models.UniqueConstraint(fields=["day", "hour"], name="hourlysales_day_hour_uniq"),
+        ]
+
+
+class ItemDailySales(Counters):
+    day = models.DateField()
+    menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name="+")
+
+    class Meta:
+        ordering = ["day", "menuitem"]
+        constraints = [
+            models.UniqueConstraint(fields=["day", "menuitem"], name="itemdailysales_day_item_uniq"),
+        ]
+
+
+class CategoryDailySales(Counters):
+    day = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="+")
+
+    class Meta:
+        ordering = ["day", "category"]
+        constraints = [
+            models.UniqueConstraint(fields=["day", "category"], name="categorydailysales_day_cat_uniq"),
+        ]
@@ -0,0 +1,220 @@
+"""
+Sales rollups kept up to date as orders change.
+
+    DailySales          day             orders, quantity, revenue, delivered_*
+    HourlySales         day, hour       same
+    ItemDailySales      day, menuitem   orders, quantity, revenue
+    CategoryDailySales  day, category   orders, quantity, revenue
+
+Days and hours are in TIME_ZONE. A change is a set of deltas added with one
+INSERT ... ON CONFLICT DO UPDATE per table, in the transaction that changes
+the order (signals.py):
+
+    order_placed (checkout)        + the order and its lines
+    status 0 <-> 1 (save, bulk)    +/- delivered_orders, delivered_revenue
+    order deleted                  - the order and its lines
+
+Bulk loaders that know their rows pass them to ``orders_loaded()``. What
+bypasses the signals otherwise (raw SQL, bulk_create of orders, a menu item
+moved to another category) is repaired by ``rebuild()`` / ``manage.py
+rebuild_analytics``, which recomputes the tables from Order/OrderItem and the
+archive tables in id-range chunks.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import ExtractHour, TruncDate
+from django.utils import timezone
+
+from apps.orders.models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
+from .models import DailySales, HourlySales, ItemDailySales, CategoryDailySales
+
+DELIVERED = 1
+
+KEYS = {
+    DailySales: ("day",),
+    HourlySales: ("day", "hour"),
+    ItemDailySales: ("day", "menuitem_id"),
+    CategoryDailySales: ("day", "category_id"),
+}
+COUNTERS = ("orders", "quantity", "revenue", "delivered_orders", "delivered_revenue")
+
+
+def counters(model):
+    return [f.attname for f in model._meta.concrete_fields if f.attname in COUNTERS]
+
+
+def bucket(moment):
+    """Order date -> (local day, local hour)."""
+    local = timezone.localtime(moment) if timezone.is_aware(moment) else moment
+    return local.date(), local.hour
+
+
+class Deltas:
+    """Counter deltas per rollup row, written with one statement per table."""
+
+    def __init__(self):
+        self.rows = {model: defaultdict(lambda: defaultdict(int)) for model in KEYS}
+
+    def add(self, model, key, **values):
+        row = self.rows[model][key]
+        for name, value in values.items():
+            row[name] += value
+
+    def apply(self):
+        for model, rows in self.rows.items():
+            rows = {key: row for key, row in rows.items() if any(row.values())}
+            if rows:
+                _upsert(model, rows)
+
+
+def _upsert(model, rows):
+    keys, names = KEYS[model], counters(model)
+    if connection.vendor not in ("sqlite", "postgresql"):
+        with transaction.atomic():
+            for key, row in rows.items():
+                lookup = dict(zip(keys, key))
+                changes = {name: F(name) + row.get(name, 0) for name in names}
+                if not model.objects.filter(**lookup).update(**changes):
+                    model.objects.create(**lookup, **{name: row.get(name, 0) for name in names})
+        return
+
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    columns = [qn(model._meta.get_field(name).column) for name in (*keys, *names)]
+    marks = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([marks] * len(rows))} "
+        f"ON CONFLICT ({', '.join(columns[:len(keys)])}) DO UPDATE SET "
+        + ", ".join(f"{col} = {table}.{col} + excluded.{col}" for col in columns[len(keys):])
+    )
+    params = []
+    for key, row in rows.items():
+        params += [*key, *(row.get(name, 0) for name in names)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+# ---- incremental -------------------------------------------------------
+
+def _add_order(deltas, order, lines, sign):
+    """``lines``: (menuitem_id, category_id, quantity, price) of ``order``."""
+    day, hour = bucket(order.date)
+    lines = list(lines)
+    totals = {
+        "orders": sign,
+        "quantity": sign * sum(quantity for _, _, quantity, _ in lines),
+        "revenue": sign * order.total,
+    }
+    if order.status == DELIVERED:
+        totals.update(delivered_orders=sign, delivered_revenue=sign * order.total)
+    deltas.add(DailySales, (day,), **totals)
+    deltas.add(HourlySales, (day, hour), **totals)
+
+    per_item, per_category = defaultdict(lambda: [0, Decimal(0)]), defaultdict(lambda: [0, Decimal(0)])
+    for menuitem_id, category_id, quantity, price in lines:
+        for grouped, key in ((per_item, menuitem_id), (per_category, category_id)):
+            grouped[key][0] += quantity
+            grouped[key][1] += price
+    for model, grouped in ((ItemDailySales, per_item), (CategoryDailySales, per_category)):
+        for key, (quantity, revenue) in grouped.items():
+            deltas.add(model, (day, key), orders=sign, quantity=sign * quantity, revenue=sign * revenue)
+
+
+def order_placed(order, items):
+    deltas = Deltas()
+    lines = [(i.menuitem_id, i.menuitem.category_id, i.quantity, i.price) for i in items]
+    _add_order(deltas, order, lines, +1)
+    deltas.apply()
+
+
+def orders_loaded(orders):
+    """``orders``: (order, lines as for _add_order) written without signals, e.g. generated in bulk."""
+    deltas = Deltas()
+    for order, lines in orders:
+        _add_order(deltas, order, lines, +1)
+    deltas.apply()
+
+
+def order_removed(order):
+    deltas = Deltas()
+    lines = OrderItem.objects.filter(order_id=order.pk).values_list(
+        "menuitem_id", "menuitem__category_id", "quantity", "price"
+    )
+    _add_order(deltas, order, lines, -1)
+    deltas.apply()
+
+
+def status_changed(changes):
+    """``changes``: (order date, total, old status, new status) per order."""
+    deltas = Deltas()
+    for date, total, old, new in changes:
+        if (old == DELIVERED) == (new == DELIVERED):
+            continue
+        sign = 1 if new == DELIVERED else -1
+        day, hour = bucket(date)
+        for model, key in ((DailySales, (day,)), (HourlySales, (day, hour))):
+            deltas.add(model, key, delivered_orders=sign, delivered_revenue=sign * total)
+    deltas.apply()
+
+
+# ---- rebuild -----------------------------------------------------------
+
+def _grouped(queryset, group, **aggregates):
+    return queryset.order_by().values(*group).annotate(**aggregates)
+
+
+def _add_chunks(order_model, item_model, totals, chunk_size, progress):
+    """Add the orders of ``order_model`` / lines of ``item_model`` to ``totals``, chunk by chunk."""
+    bounds = order_model.objects.aggregate(lo=Min("id"), hi=Max("id"))
+    delivered = Q(status=DELIVERED)
+
+    lo = bounds["lo"] or 0
+    while bounds["hi"] is not None and lo <= bounds["hi"]:
+        hi = lo + chunk_size
+        orders = order_model.objects.filter(id__gte=lo, id__lt=hi).annotate(day=TruncDate("date"), hour=ExtractHour("date"))
+        items = item_model.objects.filter(order_id__gte=lo, order_id__lt=hi).annotate(
+            day=TruncDate("order__date"), hour=ExtractHour("order__date")
+        )
+
+        # псевдонимы с "_": annotate() не может называться как поле модели (quantity)
+        for row in _grouped(
+            orders, ("day", "hour"), _orders=Count("id"), _revenue=Sum("total"),
+            _delivered_orders=Count("id", filter=delivered), _delivered_revenue=Sum("total", filter=delivered),
+        ):
+            for model, key in ((DailySales, (row["day"],)), (HourlySales, (row["day"], row["hour"]))):
+                target = totals[model][key]
+                for name in ("orders", "revenue", "delivered_orders", "delivered_revenue"):
+                    target[name] += row[f"_{name}"] or 0
+        for row in _grouped(items, ("day", "hour"), _quantity=Sum("quantity")):
+            totals[DailySales][(row["day"],)]["quantity"] += row["_quantity"]
+            totals[HourlySales][(row["day"], row["hour"])]["quantity"] += row["_quantity"]
+        for model, field in ((ItemDailySales, "menuitem_id"), (CategoryDailySales, "menuitem__category_id")):
+            for row in _grouped(
+                items, ("day", field), _orders=Count("order_id", distinct=True),
+                _quantity=Sum("quantity"), _revenue=Sum("price"),
+            ):
+                target = totals[model][(row["day"], row[field])]
+                for name in ("orders", "quantity", "revenue"):
+                    target[name] += row[f"_{name}"]
+        if progress:
+            progress(min(hi - 1, bounds["hi"]))
+        lo = hi
+
+
+def rebuild(chunk_size=50_000, progress=None):
+    """Recompute every rollup from the orders (hot and archived), ``chunk_size`` order ids at a time."""
+    totals = {model: defaultdict(lambda: defaultdict(int)) for model in KEYS}
+    for order_model, item_model in ((Order, OrderItem), (ArchivedOrder, ArchivedOrderItem)):
+        _add_chunks(order_model, item_model, totals, chunk_size, progress)
+
+    with transaction.atomic():
+        for model, rows in totals.items():
+            model.objects.all().delete()
+            model.objects.bulk_create(
+                (model(**dict(zip(KEYS[model], key)), **row) for key, row in rows.items()),
+                batch_size=1000,
+            )
+    return {model._meta.model_name: len(rows) for model, rows in totals.items()}
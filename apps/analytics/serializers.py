@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework import serializers
+
+
+class RangeSerializer(serializers.Serializer):
+    """?from=YYYY-MM-DD&to=YYYY-MM-DD (inclusive, TIME_ZONE days); last 30 days by default."""
+    max_days = 366 * 3
+
+    # "from" — ключевое слово, поле объявляется в __init__
+    to = serializers.DateField(required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["from"] = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        end = attrs.get("to") or timezone.localdate()
+        start = attrs.get("from") or end - timedelta(days=29)
+        if start > end:
+            raise serializers.ValidationError({"from": "must not be after to"})
+        if (end - start).days >= self.max_days:
+            raise serializers.ValidationError({"from": f"range is limited to {self.max_days} days"})
+        return dict(attrs, start=start, end=end)
+
+
+class SalesQuerySerializer(RangeSerializer):
+    by = serializers.ChoiceField(choices=["day", "hour"], default="day")
+
+
+class TopQuerySerializer(RangeSerializer):
+    order = serializers.ChoiceField(choices=["revenue", "quantity", "orders"], default="revenue")
+    limit = serializers.IntegerField(min_value=1, max_value=500, default=20)
+
+
+class SalesRowSerializer(serializers.Serializer):
+    day = serializers.DateField()
+    hour = serializers.IntegerField(required=False)
+    orders = serializers.IntegerField()
+    quantity = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    delivered_orders = serializers.IntegerField()
+    delivered_revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class SalesTotalsSerializer(SalesRowSerializer):
+    day = None
+    hour = None
+
+
+class TopRowSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    orders = serializers.IntegerField()
+    quantity = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
@@ -0,0 +1,38 @@
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.orders.models import Order
+from apps.orders.signals import order_placed, orders_bulk_updated
+from . import rollups
+
+
+@receiver(order_placed, sender=Order)
+def rollup_placed_order(sender, order, items, **kwargs):
+    rollups.order_placed(order, items)
+
+
+@receiver(post_save, sender=Order)
+def rollup_status_change(sender, instance, created, **kwargs):
+    before = getattr(instance, "_loaded", {})
+    if created or "status" not in before or "status" in instance.get_deferred_fields():
+        return
+    if before["status"] != instance.status:
+        rollups.status_changed([(instance.date, instance.total, before["status"], instance.status)])
+
+
+@receiver(orders_bulk_updated, sender=Order)
+def rollup_bulk_status_change(sender, before, fields=("status",), **kwargs):
+    if "status" not in fields:
+        return
+    changed = [pk for pk, state in before.items() if "status" in state]
+    if not changed:
+        return
+    rows = Order.objects.filter(pk__in=changed).values_list("pk", "date", "total", "status")
+    rollups.status_changed(
+        (date, total, before[pk]["status"], status) for pk, date, total, status in rows
+    )
+
+
+@receiver(pre_delete, sender=Order)
+def rollup_deleted_order(sender, instance, **kwargs):
+    rollups.order_removed(instance)
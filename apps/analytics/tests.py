@@ -0,0 +1,102 @@
+import io
+from decimal import Decimal
+
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.accounts.roles import MANAGER
+from apps.cart.models import Cart
+from apps.menu.models import Category, MenuItem
+from apps.orders.bulk import bulk_update_orders
+from apps.orders.checkout import checkout
+from apps.orders.models import Order
+from .models import DailySales, HourlySales, ItemDailySales, CategoryDailySales
+from .rollups import rebuild
+
+
+def snapshot():
+    """Every rollup row as plain values, for comparing incremental with rebuilt."""
+    data = {}
+    for model in (DailySales, HourlySales, ItemDailySales, CategoryDailySales):
+        fields = [f.attname for f in model._meta.concrete_fields if f.attname != "id"]
+        data[model.__name__] = sorted(tuple(str(v) for v in row) for row in model.objects.values_list(*fields))
+    return data
+
+
+class SalesRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("boss")
+        cls.manager.groups.add(Group.objects.create(name=MANAGER))
+        cls.customer = User.objects.create_user("cust")
+        mains = Category.objects.create(slug="mains", title="Mains")
+        drinks = Category.objects.create(slug="drinks", title="Drinks")
+        cls.pasta = MenuItem.objects.create(title="Pasta", price=Decimal("12.00"), category=mains)
+        cls.fish = MenuItem.objects.create(title="Fish", price=Decimal("20.00"), category=mains)
+        cls.lemonade = MenuItem.objects.create(title="Lemonade", price=Decimal("3.50"), category=drinks)
+
+    def setUp(self):
+        cache.clear()
+
+    def place(self, *lines):
+        Cart.objects.add_lines(self.customer, lines)
+        return checkout(self.customer)
+
+    def test_checkout_status_and_delete_update_rollups(self):
+        first = self.place((self.pasta, 2), (self.lemonade, 1))
+        self.place((self.fish, 1), (self.pasta, 1))
+        day = DailySales.objects.get()
+        self.assertEqual((day.orders, day.quantity, day.revenue), (2, 5, Decimal("59.50")))
+        self.assertEqual(ItemDailySales.objects.get(menuitem=self.pasta).quantity, 3)
+        mains = CategoryDailySales.objects.get(category=self.pasta.category)
+        self.assertEqual((mains.orders, mains.quantity, mains.revenue), (2, 4, Decimal("56.00")))
+
+        first.status = 1
+        first.save()
+        bulk_update_orders(Order.objects.all(), {"status": 1})  # второй: 0 -> 1, первый не меняется
+        day.refresh_from_db()
+        self.assertEqual((day.delivered_orders, day.delivered_revenue), (2, Decimal("59.50")))
+
+        incremental = snapshot()
+        rebuild(chunk_size=1)
+        self.assertEqual(snapshot(), incremental)
+
+        first.delete()
+        day = DailySales.objects.get()  # rebuild пересоздал строки
+        self.assertEqual((day.orders, day.quantity, day.delivered_orders), (1, 2, 1))
+        self.assertEqual(ItemDailySales.objects.get(menuitem=self.lemonade).orders, 0)
+
+    def test_rebuild_command_after_bulk_load(self):
+        Order.objects.bulk_create(Order(user=self.customer, total=Decimal("5.00"), status=i % 2) for i in range(7))
+        out = io.StringIO()
+        call_command("rebuild_analytics", "--chunk-size", "3", stdout=out)
+        self.assertIn("dailysales: 1 rows", out.getvalue())
+        day = DailySales.objects.get()
+        self.assertEqual((day.orders, day.revenue, day.delivered_orders), (7, Decimal("35.00"), 3))
+
+    def test_manager_endpoints(self):
+        self.place((self.pasta, 2), (self.lemonade, 4))
+        self.place((self.fish, 1))
+        c = APIClient()
+        c.force_authenticate(self.customer)
+        self.assertEqual(c.get("/api/analytics/sales").status_code, 403)
+
+        c.force_authenticate(self.manager)
+        today = timezone.localdate().isoformat()
+        with self.assertNumQueries(3):  # роли, итоги, строки
+            r = c.get("/api/analytics/sales", {"from": today, "to": today, "by": "hour"})
+        self.assertEqual(r.status_code, 200, r.content)
+        self.assertEqual(r.json()["totals"]["revenue"], "58.00")
+        self.assertEqual(len(r.json()["rows"]), 1)
+
+        r = c.get("/api/analytics/items", {"order": "quantity", "limit": 2})
+        self.assertEqual([row["title"] for row in r.json()["rows"]], ["Lemonade", "Pasta"])
+        r = c.get("/api/analytics/categories")
+        self.assertEqual(r.json()["rows"][0], {
+            "id": self.pasta.category_id, "title": "Mains", "orders": 2, "quantity": 3, "revenue": "44.00",
+        })
+        self.assertEqual(c.get("/api/analytics/sales", {"from": "2030-01-02", "to": "2030-01-01"}).status_code, 400)
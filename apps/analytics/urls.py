@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import SalesView, TopItemsView, CategorySalesView
+
+urlpatterns = [
+    path("analytics/sales", SalesView.as_view()),
+    path("analytics/items", TopItemsView.as_view()),
+    path("analytics/categories", CategorySalesView.as_view()),
+]
@@ -0,0 +1,83 @@
+from django.db.models import Sum
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.accounts.permissions import IsManager
+from .models import DailySales, HourlySales, ItemDailySales, CategoryDailySales
+from .serializers import (
+    SalesQuerySerializer, TopQuerySerializer, SalesRowSerializer, SalesTotalsSerializer, TopRowSerializer,
+)
+
+SALES_FIELDS = ("orders", "quantity", "revenue", "delivered_orders", "delivered_revenue")
+
+
+class ManagerAnalyticsView(APIView):
+    def get_permissions(self):
+        if self.request.user and self.request.user.is_superuser:
+            return [permissions.IsAuthenticated()]
+        return [permissions.IsAuthenticated(), IsManager()]
+
+    def query(self, serializer_class):
+        ser = serializer_class(data=self.request.query_params)
+        ser.is_valid(raise_exception=True)
+        return ser.validated_data
+
+
+class SalesView(ManagerAnalyticsView):
+    """
+    GET /api/analytics/sales?from=&to=&by=day|hour   (Manager)
+      -> {"from", "to", "by", "totals": {...}, "rows": [{"day", "hour"?, orders,
+          quantity, revenue, delivered_orders, delivered_revenue}]}
+      read from the DailySales / HourlySales rollups; days without orders are omitted
+    """
+    def get(self, request):
+        q = self.query(SalesQuerySerializer)
+        model = HourlySales if q["by"] == "hour" else DailySales
+        rows = model.objects.filter(day__range=(q["start"], q["end"]))
+        totals = rows.aggregate(**{name: Sum(name) for name in SALES_FIELDS})
+        return Response({
+            "from": q["start"],
+            "to": q["end"],
+            "by": q["by"],
+            "totals": SalesTotalsSerializer({k: v or 0 for k, v in totals.items()}).data,
+            "rows": SalesRowSerializer(rows, many=True).data,
+        })
+
+
+class TopView(ManagerAnalyticsView):
+    model = None        # ItemDailySales / CategoryDailySales
+    key = None          # "menuitem" / "category"
+
+    def get(self, request):
+        q = self.query(TopQuerySerializer)
+        key_id, title = f"{self.key}_id", f"{self.key}__title"
+        rows = (
+            self.model.objects.filter(day__range=(q["start"], q["end"]))
+            .values(key_id, title)
+            .annotate(**{f"sum_{name}": Sum(name) for name in ("orders", "quantity", "revenue")})
+            .order_by(f"-sum_{q['order']}", key_id)[: q["limit"]]
+        )
+        rows = [
+            {"id": r[key_id], "title": r[title], "orders": r["sum_orders"],
+             "quantity": r["sum_quantity"], "revenue": r["sum_revenue"]}
+            for r in rows
+        ]
+        return Response({
+            "from": q["start"],
+            "to": q["end"],
+            "order": q["order"],
+            "rows": TopRowSerializer(rows, many=True).data,
+        })
+
+
+class TopItemsView(TopView):
+    """GET /api/analytics/items?from=&to=&order=revenue|quantity|orders&limit=20   (Manager)"""
+    model = ItemDailySales
+    key = "menuitem"
+
+
+class CategorySalesView(TopView):
+    """GET /api/analytics/categories?from=&to=&order=revenue|quantity|orders&limit=20   (Manager)"""
+    model = CategoryDailySales
+    key = "category"
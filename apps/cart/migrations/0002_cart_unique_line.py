@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:09
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_lines(apps, schema_editor):
+    """Fold duplicate (user, menuitem) rows into the oldest one before the constraint."""
+    Cart = apps.get_model("cart", "Cart")
+    dupes = (
+        Cart.objects.values("user_id", "menuitem_id")
+        .annotate(n=Count("id"), keep=Min("id"), qty=Sum("quantity"))
+        .filter(n__gt=1)
+    )
+    for row in dupes.iterator():
+        keep = Cart.objects.get(pk=row["keep"])
+        keep.quantity = row["qty"]
+        keep.price = keep.unit_price * row["qty"]
+        keep.save(update_fields=["quantity", "price"])
+        Cart.objects.filter(user_id=row["user_id"], menuitem_id=row["menuitem_id"]).exclude(pk=keep.pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0001_initial'),
+        ('menu', '0002_menuitem_menuitem_category_price_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_lines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(fields=('user', 'menuitem'), name='cart_user_menuitem_uniq'),
+        ),
+    ]
@@ -1,11 +1,82 @@
-from django.db import models
+from collections import defaultdict
+
+from django.db import models, connection, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
 from apps.menu.models import MenuItem
 
 
+class CartQuerySet(models.QuerySet):
+    def add_lines(self, user, lines):
+        """
+        Add ``(menuitem, quantity)`` pairs to the user's cart: an existing line
+        gets its quantity incremented and price recomputed, a missing one is
+        inserted. SQLite/PostgreSQL do it in one INSERT ... ON CONFLICT DO UPDATE,
+        so concurrent adds neither lose quantity nor create duplicates.
+        Returns the affected Cart rows (menuitem + category selected).
+        """
+        merged = defaultdict(int)
+        prices = {}
+        for menuitem, quantity in lines:
+            merged[menuitem.pk] += quantity
+            prices[menuitem.pk] = menuitem.price
+        if not merged:
+            return []
+
+        if connection.vendor in ("sqlite", "postgresql"):
+            self._upsert(user.pk, [(mid, qty, prices[mid]) for mid, qty in merged.items()])
+        else:
+            with transaction.atomic():
+                for mid, qty in merged.items():
+                    self._add_one(user.pk, mid, qty, prices[mid])
+
+        return list(
+            self.model.objects.select_related("menuitem__category")
+            .filter(user=user, menuitem_id__in=list(merged))
+            .order_by("id")
+        )
+
+    def _upsert(self, user_id, rows):
+        qn = connection.ops.quote_name
+        table = qn(self.model._meta.db_table)
+        quantity, unit_price, price = qn("quantity"), qn("unit_price"), qn("price")
+        values = ", ".join(["(%s, %s, %s, %s, %s)"] * len(rows))
+        sql = (
+            f"INSERT INTO {table} ({qn('user_id')}, {qn('menuitem_id')}, {quantity}, {unit_price}, {price}) "
+            f"VALUES {values} "
+            f"ON CONFLICT ({qn('user_id')}, {qn('menuitem_id')}) DO UPDATE SET "
+            f"{quantity} = {table}.{quantity} + excluded.{quantity}, "
+            f"{unit_price} = excluded.{unit_price}, "
+            f"{price} = ({table}.{quantity} + excluded.{quantity}) * excluded.{unit_price}"
+        )
+        params = []
+        for mid, qty, unit in rows:
+            params += [user_id, mid, qty, unit, unit * qty]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def _add_one(self, user_id, menuitem_id, quantity, unit_price):
+        updated = self.filter(user_id=user_id, menuitem_id=menuitem_id).update(
+            quantity=F("quantity") + quantity,
+            unit_price=unit_price,
+            price=(F("quantity") + quantity) * unit_price,
+        )
+        if not updated:
+            self.create(user_id=user_id, menuitem_id=menuitem_id, quantity=quantity,
+                        unit_price=unit_price, price=unit_price * quantity)
+
+
 class Cart(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
     unit_price = models.DecimalField(max_digits=6, decimal_places=2)
-    price = models.DecimalField(max_digits=8, decimal_places=2)
\ No newline at end of file
+    price = models.DecimalField(max_digits=8, decimal_places=2)
+
+    objects = CartQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # одна строка на блюдо: повторное добавление увеличивает quantity
+            models.UniqueConstraint(fields=["user", "menuitem"], name="cart_user_menuitem_uniq"),
+        ]
@@ -39,6 +39,22 @@ class CartSerializer(serializers.ModelSerializer):
         return attrs
 
     def create(self, validated):
-        validated["user"] = self.context["request"].user
-        # menuitem/quantity/unit_price/price уже проставлены в validate()
-        return super().create(validated)
\ No newline at end of file
+        # menuitem/quantity уже проставлены в validate(); повторное добавление
+        # того же блюда увеличивает quantity существующей строки (upsert)
+        user = self.context["request"].user
+        [line] = Cart.objects.add_lines(user, [(validated["menuitem"], validated["quantity"])])
+        return line
+
+
+class CartLineSerializer(serializers.Serializer):
+    """One line of a bulk add; the menu item itself is resolved by the view (in_bulk)."""
+    menuitem_id = serializers.IntegerField(required=False)
+    menuitem = serializers.IntegerField(required=False)
+    quantity = serializers.IntegerField(min_value=1)
+
+    def validate(self, attrs):
+        mid = attrs.pop("menuitem", None)
+        attrs["menuitem_id"] = attrs.get("menuitem_id") or mid
+        if not attrs["menuitem_id"]:
+            raise serializers.ValidationError({"menuitem": "Provide menuitem or menuitem_id"})
+        return attrs
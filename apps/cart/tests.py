@@ -1,3 +1,87 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.menu.models import Category, MenuItem
+from .models import Cart
+
+
+class CartUpsertTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user("cust", password="pass")
+        cat = Category.objects.create(slug="main", title="Main")
+        cls.pizza = MenuItem.objects.create(title="Pizza", price=Decimal("12.50"), category=cat)
+        cls.pasta = MenuItem.objects.create(title="Pasta", price=Decimal("10.00"), category=cat)
+
+    def setUp(self):
+        cache.clear()
+        self.c = APIClient()
+        self.c.force_authenticate(self.customer)
+
+    def test_repeated_add_increments_one_line(self):
+        for qty in (1, 2, 3):
+            r = self.c.post("/api/cart/menu-items", {"menuitem_id": self.pizza.id, "quantity": qty}, format="json")
+            self.assertEqual(r.status_code, 201, r.content)
+        self.assertEqual(r.json()["quantity"], 6)
+        self.assertEqual(r.json()["price"], "75.00")
+        self.assertEqual(Cart.objects.filter(user=self.customer).count(), 1)
+
+    def test_add_lines_is_one_write(self):
+        Cart.objects.add_lines(self.customer, [(self.pizza, 1)])
+        with self.assertNumQueries(2):  # upsert + чтение результата
+            lines = Cart.objects.add_lines(self.customer, [(self.pizza, 2), (self.pasta, 1), (self.pasta, 1)])
+        self.assertEqual([(l.menuitem_id, l.quantity) for l in lines], [(self.pizza.id, 3), (self.pasta.id, 2)])
+        self.assertEqual(lines[1].price, Decimal("20.00"))
+
+    def test_price_follows_current_menu_price(self):
+        Cart.objects.add_lines(self.customer, [(self.pizza, 1)])
+        self.pizza.price = Decimal("14.00")
+        [line] = Cart.objects.add_lines(self.customer, [(self.pizza, 1)])
+        self.assertEqual((line.unit_price, line.price), (Decimal("14.00"), Decimal("28.00")))
+
+
+class CartBulkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user("cust", password="pass")
+        cat = Category.objects.create(slug="main", title="Main")
+        cls.items = [
+            MenuItem.objects.create(title=f"Dish {i}", price=Decimal("3.00"), category=cat) for i in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.c = APIClient()
+        self.c.force_authenticate(self.customer)
+        self.c.get("/api/cart/menu-items")  # роли в кэше
+
+    def test_many_lines_constant_queries(self):
+        lines = [{"menuitem_id": mi.id, "quantity": 2} for mi in self.items]
+        with self.assertNumQueries(3):  # in_bulk, upsert, чтение строк
+            r = self.c.post("/api/cart/menu-items/bulk", lines, format="json")
+        self.assertEqual(r.status_code, 201, r.content)
+        self.assertEqual(len(r.json()["lines"]), 5)
+        self.assertEqual(r.json()["errors"], [])
+
+    def test_per_line_errors_do_not_fail_batch(self):
+        r = self.c.post("/api/cart/menu-items/bulk", {"items": [
+            {"menuitem_id": self.items[0].id, "quantity": 1},
+            {"menuitem_id": 999999, "quantity": 1},
+            {"menuitem": self.items[1].id, "quantity": 0},
+            {"menuitem": self.items[1].id, "quantity": 3},
+        ]}, format="json")
+        self.assertEqual(r.status_code, 201, r.content)
+        self.assertEqual([e["index"] for e in r.json()["errors"]], [1, 2])
+        self.assertIn("menuitem_id", r.json()["errors"][0]["errors"])
+        self.assertEqual(
+            sorted(Cart.objects.filter(user=self.customer).values_list("quantity", flat=True)), [1, 3]
+        )
 
-# Create your tests here.
+    def test_all_invalid_is_400(self):
+        r = self.c.post("/api/cart/menu-items/bulk", [{"menuitem_id": 999999, "quantity": 1}], format="json")
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(self.c.post("/api/cart/menu-items/bulk", [], format="json").status_code, 400)
@@ -1,8 +1,9 @@
 # LittleLemonAPI/urls.py
 from django.urls import path
-from .views import CartView
+from .views import CartView, CartBulkView
 
 
 urlpatterns = [
     path("cart/menu-items", CartView.as_view()),
+    path("cart/menu-items/bulk", CartBulkView.as_view()),
 ]
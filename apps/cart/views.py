@@ -1,26 +1,31 @@
 from rest_framework import permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.throttling import ScopedRateThrottle
+
+from apps.common.sparse import sparse_fields, plan_queryset
+from apps.common.throttling import ScopedBucketThrottle
+
+from apps.menu.models import MenuItem
 
 from .models import Cart
-from .serializers import CartSerializer
+from .serializers import CartSerializer, CartLineSerializer
 
 
 class CartView(APIView):
     """
     /api/cart/menu-items  (Customer only)
-      GET    -> list current user's cart
-      POST   -> add item  { menuitem_id, quantity }
+      GET    -> list current user's cart  (?fields= / ?expand=)
+      POST   -> add item  { menuitem_id, quantity }  (same item again -> quantity += n)
       DELETE -> clear current user's cart
     """
     permission_classes = [permissions.IsAuthenticated]
     throttle_scope = "cart"
-    throttle_classes = [ScopedRateThrottle]
+    throttle_classes = [ScopedBucketThrottle]
 
     def get(self, request):
-        items = Cart.objects.filter(user=request.user)
-        ser = CartSerializer(items, many=True)
+        shape = sparse_fields(CartSerializer(many=True), request)
+        items = plan_queryset(shape, Cart.objects.filter(user=request.user))
+        ser = sparse_fields(CartSerializer(items, many=True), request)
         return Response(ser.data, status=200)
 
     def post(self, request):
@@ -32,4 +37,49 @@ class CartView(APIView):
 
     def delete(self, request):
         Cart.objects.filter(user=request.user).delete()
-        return Response(status=200)
\ No newline at end of file
+        return Response(status=200)
+
+
+class CartBulkView(APIView):
+    """
+    /api/cart/menu-items/bulk  (Customer only)
+      POST -> [{ menuitem_id, quantity }, ...]  or  { "items": [...] }
+              all menu items resolved with one query, all valid lines written
+              in one statement; invalid lines are reported, not fatal:
+              { "lines": [...cart lines...], "errors": [{ "index", "errors" }] }
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "cart"
+    throttle_classes = [ScopedBucketThrottle]
+    max_lines = 100
+
+    def post(self, request):
+        payload = request.data.get("items") if isinstance(request.data, dict) else request.data
+        if not isinstance(payload, list) or not payload:
+            return Response({"detail": "Expected a non-empty list of lines"}, status=400)
+        if len(payload) > self.max_lines:
+            return Response({"detail": f"At most {self.max_lines} lines per request"}, status=400)
+
+        errors, parsed = [], []
+        for index, raw in enumerate(payload):
+            ser = CartLineSerializer(data=raw)
+            if ser.is_valid():
+                parsed.append((index, ser.validated_data))
+            else:
+                errors.append({"index": index, "errors": ser.errors})
+
+        menu = MenuItem.objects.in_bulk({line["menuitem_id"] for _, line in parsed})
+        lines = []
+        for index, line in parsed:
+            mi = menu.get(line["menuitem_id"])
+            if mi is None:
+                errors.append({"index": index, "errors": {"menuitem_id": ["Invalid menuitem_id"]}})
+            else:
+                lines.append((mi, line["quantity"]))
+
+        saved = Cart.objects.add_lines(request.user, lines)
+        errors.sort(key=lambda e: e["index"])
+        return Response(
+            {"lines": CartSerializer(saved, many=True).data, "errors": errors},
+            status=201 if saved else 400,
+        )
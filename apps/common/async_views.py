@@ -0,0 +1,180 @@
+"""
+Native async read path in front of the existing DRF views.
+
+GET/HEAD run as coroutines: JWT is checked without touching a thread, the user
+comes from the token claims (the async ORM for tokens without them), the data
+through Django's async ORM, and the DRF view class is reused for everything
+that is pure CPU (get_queryset, filter backends, permission and throttle
+classes, serializers, pagination links). Every other method is handed
+to the original sync DRF view unchanged, so the URL contract stays the same.
+
+Permission classes used on the read path must not query the database
+(IsAuthenticated / AllowAny are fine) unless they provide ``ahas_permission``.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, HttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from apps.accounts.authentication import ClaimsJWTAuthentication, aclaims_user
+
+
+class AsyncJWTAuthentication(ClaimsJWTAuthentication):
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)  # только криптография
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user = await aclaims_user(validated_token)
+        if user is not None:
+            return user
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise exceptions.AuthenticationFailed("Token contained no recognizable user identification")
+        user = await get_user_model().objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).afirst()
+        if user is None:
+            raise exceptions.AuthenticationFailed("User not found", code="user_not_found")
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise exceptions.AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
+
+
+class AsyncReadView(View):
+    drf_view = None             # DRF view class whose configuration the read path reuses
+    write_view = None           # callable serving non-GET methods (defaults to drf_view.as_view())
+    authentication_class = AsyncJWTAuthentication
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # CSRF для записи проверяет сам DRF-вью
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return await self._delegate(request, *args, **kwargs)
+        try:
+            drf_request = await self.initial(request)
+            return await self.get(drf_request, *args, **kwargs)
+        except Exception as exc:
+            return self.handle_exception(exc)
+
+    async def _delegate(self, request, *args, **kwargs):
+        view = self._write_view()
+        if view is None:
+            return self.render({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+        return await sync_to_async(view)(request, *args, **kwargs)
+
+    def _write_view(self):
+        cls = type(self)
+        if not hasattr(cls, "_write_view_fn"):
+            fn = cls.write_view or (cls.drf_view.as_view() if cls.drf_view is not None else None)
+            cls._write_view_fn = staticmethod(fn) if fn is not None else None
+        return cls._write_view_fn
+
+    # ---- request setup -------------------------------------------------
+
+    async def initial(self, request):
+        authenticator = self.authentication_class()
+        drf_request = Request(request, authenticators=(authenticator,))
+        if getattr(request, "_force_auth_user", None) is not None:  # APIClient.force_authenticate
+            result = request._force_auth_user, getattr(request, "_force_auth_token", None)
+        else:
+            result = await authenticator.aauthenticate(request)
+        if result is None:
+            drf_request._authenticator = None
+            drf_request.user, drf_request.auth = AnonymousUser(), None
+        else:
+            drf_request._authenticator = authenticator
+            drf_request.user, drf_request.auth = result
+
+        self.view = self.make_drf_view(drf_request)
+        await self.check_permissions(drf_request)
+        # запись в хранилище корзин блокирующая (BEGIN IMMEDIATE, ждёт до 1 с) — не в цикле событий
+        await sync_to_async(self.view.check_throttles, thread_sensitive=False)(drf_request)
+        return drf_request
+
+    def make_drf_view(self, drf_request):
+        view = self.drf_view()
+        view.request = drf_request
+        view.args, view.kwargs = self.args, self.kwargs
+        view.format_kwarg = None
+        view.headers = {}
+        return view
+
+    async def check_permissions(self, drf_request):
+        for permission in self.view.get_permissions():
+            check = getattr(permission, "ahas_permission", None)
+            allowed = await check(drf_request, self.view) if check else permission.has_permission(drf_request, self.view)
+            if not allowed:
+                self.view.permission_denied(
+                    drf_request,
+                    message=getattr(permission, "message", None),
+                    code=getattr(permission, "code", None),
+                )
+
+    # ---- output --------------------------------------------------------
+
+    def render(self, data, status=200, headers=None):
+        self.rendered_data = data
+        response = HttpResponse(JSONRenderer().render(data), status=status, content_type="application/json")
+        for name, value in (headers or {}).items():
+            response[name] = value
+        return response
+
+    def handle_exception(self, exc):
+        if isinstance(exc, Http404):
+            exc = exceptions.NotFound(*exc.args)
+        if not isinstance(exc, exceptions.APIException):
+            raise exc
+        headers = {}
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            headers["WWW-Authenticate"] = self.authentication_class().authenticate_header(None)
+            exc.status_code = 401
+        if getattr(exc, "wait", None):
+            headers["Retry-After"] = "%d" % exc.wait
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+        return self.render(data, status=exc.status_code, headers=headers)
+
+
+class AsyncListView(AsyncReadView):
+    """GET list: filter backends + paginator of ``drf_view``, rows via the async ORM."""
+
+    async def get(self, request, *args, **kwargs):
+        view = self.view
+        queryset = view.filter_queryset(view.get_queryset())
+        paginator = view.paginator
+        if paginator is not None:
+            page = await paginator.apaginate_queryset(queryset, request, view=view)
+            if page is not None:
+                data = view.get_serializer(page, many=True).data
+                return self.render(paginator.get_paginated_response(data).data)
+        rows = [obj async for obj in queryset]
+        return self.render(view.get_serializer(rows, many=True).data)
+
+
+class AsyncRetrieveView(AsyncReadView):
+    """GET detail by ``lookup_field`` of ``drf_view``."""
+
+    async def get(self, request, *args, **kwargs):
+        view = self.view
+        lookup = view.lookup_url_kwarg or view.lookup_field
+        queryset = view.filter_queryset(view.get_queryset())
+        obj = await queryset.filter(**{view.lookup_field: kwargs[lookup]}).afirst()
+        if obj is None:
+            raise exceptions.NotFound(f"No {queryset.model._meta.object_name} matches the given query.")
+        view.check_object_permissions(request, obj)
+        return self.render(view.get_serializer(obj).data)
@@ -0,0 +1,104 @@
+"""
+Small helpers shared by the benchmark management commands.
+"""
+import json
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def scratch_database():
+    """A throwaway test database (same as manage.py test creates) for the run."""
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def measure(fn, repeat=20, setup=None):
+    """
+    Call ``fn`` ``repeat`` times (``setup`` before each call, not timed).
+    Returns latency percentiles in ms, throughput and queries per call.
+    """
+    timings, queries = [], []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        queries.append(len(ctx.captured_queries))
+    return summarize(timings, queries)
+
+
+def summarize(timings, queries=None):
+    """Latencies in seconds (+ query count per call) -> the stats dict measure() returns."""
+    total = sum(timings)
+    return {
+        "runs": len(timings),
+        "p50_ms": round(percentile(timings, 50) * 1000, 3),
+        "p95_ms": round(percentile(timings, 95) * 1000, 3),
+        "p99_ms": round(percentile(timings, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(timings) * 1000, 3) if timings else 0.0,
+        "rps": round(len(timings) / total, 1) if total else None,
+        "queries": max(queries) if queries else None,
+    }
+
+
+def save_baseline(path, results, meta=None):
+    with open(path, "w") as fh:
+        json.dump({"meta": meta or {}, "results": results}, fh, indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def compare(current, baseline, tolerance=0.25):
+    """
+    Per-name deltas against a baseline's results. A row regresses when its p95
+    grew by more than ``tolerance`` (a fraction), it issues more queries or
+    more of its requests fail.
+    """
+    rows = []
+    for name, stats in current.items():
+        base = baseline.get(name)
+        if base is None:
+            rows.append({"name": name, "p95_ms": stats["p95_ms"], "base_p95_ms": None,
+                         "p95_delta": None, "queries": stats["queries"], "base_queries": None,
+                         "regressed": False})
+            continue
+        delta = (stats["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        more_queries = (
+            stats["queries"] is not None and base.get("queries") is not None
+            and stats["queries"] > base["queries"]
+        )
+        more_errors = stats.get("errors", 0) > base.get("errors", 0)
+        rows.append({
+            "name": name,
+            "p95_ms": stats["p95_ms"],
+            "base_p95_ms": base["p95_ms"],
+            "p95_delta": round(delta, 3),
+            "queries": stats["queries"],
+            "base_queries": base.get("queries"),
+            "regressed": delta > tolerance or more_queries or more_errors,
+        })
+    return rows
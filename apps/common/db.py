@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    """WAL, synchronous=NORMAL, busy timeout and mmap for every SQLite connection."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+            cursor.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,425 @@
+"""
+Latency / throughput / query-count benchmark of the API's critical flows.
+
+    python manage.py bench_api                       # in-process, scratch database
+    python manage.py bench_api --save bench.json     # ... and keep the numbers
+    python manage.py bench_api --compare bench.json  # flag regressions against them
+    python manage.py bench_api --url http://127.0.0.1:8000 --seed-configured-db   # a running server
+    python manage.py bench_api --remove-seeded       # drop what --seed-configured-db left behind
+
+Requests go through the real URL routes: the Django test client in-process,
+or HTTP against ``--url``. In-process, throttle rates are lifted (the throttle
+code still runs) and every request's SQL is counted; over HTTP the query count
+comes from the Server-Timing header when the server runs with PROFILING=1 and
+PROFILING_SAMPLE_RATE=1, and 429s count as errors.
+
+``--url`` and ``--no-scratch`` write bench-* users (no staff flag), menu
+categories and orders into the configured database, so they need
+``--seed-configured-db``; ``--remove-seeded`` deletes those rows again. The
+bench users' password comes from ``--password`` / BENCH_PASSWORD or is
+generated and printed once; a later run resets it on the reused users.
+"""
+import http.client
+import json
+import os
+import random
+import re
+import secrets
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import urlencode, urlsplit
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from apps.accounts.roles import MANAGER, DELIVERY, invalidate_roles
+from apps.common.bench import compare, load_baseline, save_baseline, scratch_database, summarize
+from apps.menu import search
+from apps.menu.models import Category, MenuItem
+from apps.orders.models import Order, OrderItem
+
+PREFIX = "bench-"
+WORDS = (
+    "grilled fried roasted smoked spicy sweet lemon garlic herb olive tomato basil "
+    "chicken lamb beef salmon tuna shrimp octopus feta halloumi falafel hummus "
+    "salad soup pasta risotto pita wrap bowl tart cake sorbet baklava"
+).split()
+CATEGORIES = ("Starters", "Salads", "Mains", "Grill", "Seafood", "Pasta", "Desserts", "Drinks")
+SEARCH_TERMS = ("salmon", "gri", "lemon chicken", "feta salad", "cake")
+
+_QUERIES = re.compile(r'\bdb;dur=[\d.]+;desc="(\d+) queries"')
+
+
+# ---- drivers -----------------------------------------------------------
+
+class InProcessDriver:
+    """Django test client on this process's database; counts SQL per request."""
+
+    label = "in-process"
+
+    def __init__(self):
+        self.client = Client()
+
+    def request(self, method, path, data=None, token=None):
+        headers = {"authorization": f"Bearer {token}"} if token else {}
+        body = json.dumps(data) if data is not None else ""
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = self.client.generic(method, path, body, content_type="application/json", headers=headers)
+            elapsed = time.perf_counter() - start
+        return response.status_code, response.content, elapsed, len(ctx.captured_queries)
+
+
+class HttpDriver:
+    """One keep-alive HTTP connection to a running server."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise CommandError(f"Not an http(s) URL: {url}")
+        self.label = url
+        self.prefix = parts.path.rstrip("/")
+        conn_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self._connect = lambda: conn_class(parts.hostname, parts.port, timeout=30)
+        self.conn = self._connect()
+
+    def _send(self, method, path, body, headers):
+        self.conn.request(method, self.prefix + path, body=body, headers=headers)
+        response = self.conn.getresponse()
+        return response, response.read()
+
+    def request(self, method, path, data=None, token=None):
+        headers = {"Content-Type": "application/json", "Accept": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        body = json.dumps(data).encode() if data is not None else None
+        start = time.perf_counter()
+        try:
+            response, content = self._send(method, path, body, headers)
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            # сервер закрыл keep-alive соединение — один повтор на свежем
+            self.conn.close()
+            self.conn = self._connect()
+            start = time.perf_counter()
+            response, content = self._send(method, path, body, headers)
+        elapsed = time.perf_counter() - start
+        match = _QUERIES.search(response.getheader("Server-Timing") or "")
+        return response.status, content, elapsed, int(match.group(1)) if match else None
+
+
+# ---- data --------------------------------------------------------------
+
+def seed(opts, rng, out, password):
+    """Bench users, menu and order history; reused when a previous run left them."""
+    hashed = make_password(password)  # один хеш на всех: PBKDF2 на тысячу пользователей — минуты
+    if User.objects.filter(username=f"{PREFIX}manager").exists():
+        out.write("Reusing previously seeded bench data")
+        # пароль мог быть сгенерирован прошлой прогонкой — ставим текущий
+        User.objects.filter(username__startswith=PREFIX).update(password=hashed)
+    else:
+        _create(opts, rng, hashed)
+    users = dict(User.objects.filter(username__startswith=PREFIX).values_list("username", "id"))
+    invalidate_roles(*users.values())
+    items = list(MenuItem.objects.values_list("id", flat=True))
+    if not items:
+        raise CommandError("No menu items to benchmark against")
+    return {
+        "items": items,
+        "categories": list(Category.objects.values_list("id", flat=True)),
+        "manager": f"{PREFIX}manager",
+        "crew": f"{PREFIX}crew-0",
+        "reader": f"{PREFIX}customer-0",
+        "shopper": f"{PREFIX}customer-1",
+        "buyer": f"{PREFIX}customer-2",
+        "password": password,
+    }
+
+
+def remove_seeded():
+    """Delete the bench-* users (with their orders and carts), categories and their items -> rows deleted."""
+    with transaction.atomic():
+        return sum(
+            qs.delete()[0]
+            for qs in (
+                User.objects.filter(username__startswith=PREFIX),
+                MenuItem.objects.filter(category__slug__startswith=PREFIX),
+                Category.objects.filter(slug__startswith=PREFIX),
+            )
+        )
+
+
+def _create(opts, rng, hashed):
+    managers, _ = Group.objects.get_or_create(name=MANAGER)
+    crews, _ = Group.objects.get_or_create(name=DELIVERY)
+
+    cats = Category.objects.bulk_create(
+        Category(slug=f"{PREFIX}{i}", title=CATEGORIES[i % len(CATEGORIES)] + ("" if i < len(CATEGORIES) else f" {i}"))
+        for i in range(opts["categories"])
+    )
+    items = MenuItem.objects.bulk_create(
+        MenuItem(
+            title=" ".join(rng.sample(WORDS, 3)).title(),
+            price=Decimal(rng.randint(250, 4500)) / 100,
+            featured=rng.random() < 0.1,
+            category=rng.choice(cats),
+        )
+        for _ in range(opts["items"])
+    )
+    search.rebuild()  # bulk_create идёт мимо сигналов
+
+    # права менеджера — только группа, без is_staff: в админку бенч-пользователю незачем
+    manager = User.objects.create(username=f"{PREFIX}manager", password=hashed)
+    crew = User.objects.bulk_create(
+        User(username=f"{PREFIX}crew-{i}", password=hashed) for i in range(opts["crew"])
+    )
+    customers = User.objects.bulk_create(
+        User(username=f"{PREFIX}customer-{i}", password=hashed) for i in range(max(opts["customers"], 3))
+    )
+    manager.groups.add(managers)
+    User.groups.through.objects.bulk_create(User.groups.through(user=u, group=crews) for u in crew)
+
+    # история заказов: у каждого клиента свои, ~70% назначены курьеру
+    for start in range(0, opts["orders"], 1000):
+        batch = range(start, min(start + 1000, opts["orders"]))
+        lines = [
+            [(mi, rng.randint(1, 3)) for mi in rng.sample(items, rng.randint(1, min(4, len(items))))]
+            for _ in batch
+        ]
+        orders = Order.objects.bulk_create(
+            Order(
+                user=customers[i % len(customers)],
+                delivery_crew=rng.choice(crew) if crew and rng.random() < 0.7 else None,
+                status=int(rng.random() < 0.5),
+                total=sum(mi.price * qty for mi, qty in order_lines),
+            )
+            for i, order_lines in zip(batch, lines)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, menuitem=mi, quantity=qty, unit_price=mi.price, price=mi.price * qty)
+            for order, order_lines in zip(orders, lines)
+            for mi, qty in order_lines
+        )
+
+
+# ---- flows -------------------------------------------------------------
+
+class Flows:
+    """name -> (request factory, setup) over the seeded fixtures."""
+
+    def __init__(self, driver, fixtures, rng):
+        self.driver = driver
+        self.fx = fixtures
+        self.rng = rng
+        self.tokens = {}
+
+    def token(self, username):
+        if username not in self.tokens:
+            status, content, _, _ = self.driver.request(
+                "POST", "/auth/jwt/create/", {"username": username, "password": self.fx["password"]}
+            )
+            if status != 200:
+                raise CommandError(f"Login as {username} failed with {status}: {content[:200]!r}")
+            self.tokens[username] = json.loads(content)["access"]
+        return self.tokens[username]
+
+    def all(self):
+        return {
+            "menu_list": (self.menu_list, None),
+            "menu_filter": (self.menu_filter, None),
+            "menu_search": (self.menu_search, None),
+            "cart_add": (self.cart_add, None),
+            "checkout": (self.checkout, self.fill_cart),
+            "orders_customer": (lambda: ("GET", "/api/orders", None, self.token(self.fx["reader"])), None),
+            "orders_crew": (lambda: ("GET", "/api/orders", None, self.token(self.fx["crew"])), None),
+            "orders_manager": (lambda: ("GET", "/api/orders", None, self.token(self.fx["manager"])), None),
+            "login": (self.login, None),
+        }
+
+    def menu_list(self):
+        return "GET", f"/api/menu-items?page={self.rng.randint(1, 5)}", None, None
+
+    def menu_filter(self):
+        params = {
+            "category": self.rng.choice(self.fx["categories"]),
+            "ordering": self.rng.choice(("price", "-price", "title")),
+        }
+        if self.rng.random() < 0.3:
+            params["featured"] = "true"
+        return "GET", f"/api/menu-items?{urlencode(params)}", None, None
+
+    def menu_search(self):
+        return "GET", f"/api/menu-items?{urlencode({'search': self.rng.choice(SEARCH_TERMS)})}", None, None
+
+    def cart_add(self):
+        data = {"menuitem_id": self.rng.choice(self.fx["items"]), "quantity": 1}
+        return "POST", "/api/cart/menu-items", data, self.token(self.fx["shopper"])
+
+    def fill_cart(self):
+        lines = [{"menuitem_id": mid, "quantity": 2} for mid in self.rng.sample(self.fx["items"], min(3, len(self.fx["items"])))]
+        status, content, _, _ = self.driver.request(
+            "POST", "/api/cart/menu-items/bulk", lines, self.token(self.fx["buyer"])
+        )
+        if status >= 400:
+            raise CommandError(f"Filling the checkout cart failed with {status}: {content[:200]!r}")
+
+    def checkout(self):
+        return "POST", "/api/orders", None, self.token(self.fx["buyer"])
+
+    def login(self):
+        return "POST", "/auth/jwt/create/", {"username": self.fx["reader"], "password": self.fx["password"]}, None
+
+
+def run_flow(driver, make_request, setup, repeat, warmup):
+    timings, queries, errors = [], [], {}
+    for i in range(warmup + repeat):
+        if setup:
+            setup()
+        method, path, data, token = make_request()
+        status, _, elapsed, n_queries = driver.request(method, path, data, token)
+        if i < warmup:
+            continue
+        if status >= 400:
+            errors[status] = errors.get(status, 0) + 1
+            continue
+        timings.append(elapsed)
+        if n_queries is not None:
+            queries.append(n_queries)
+    stats = summarize(timings, queries)
+    stats["errors"] = sum(errors.values())
+    if errors:
+        stats["error_statuses"] = {str(k): v for k, v in sorted(errors.items())}
+    return stats
+
+
+def _unthrottled():
+    # лимиты снимаем, но сами троттлы отрабатывают — их стоимость входит в замер
+    rates = {scope: "1000000/s" for scope in SimpleRateThrottle.THROTTLE_RATES}
+    return mock.patch.object(SimpleRateThrottle, "THROTTLE_RATES", rates)
+
+
+class Command(BaseCommand):
+    help = "Benchmark the API's critical flows (menu, cart, checkout, orders per role, JWT login)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Base URL of a running server; seeds the configured database")
+        parser.add_argument("--no-scratch", action="store_true",
+                            help="In-process against the configured database instead of a throwaway one")
+        parser.add_argument("--seed-configured-db", action="store_true",
+                            help="Allow --url / --no-scratch to write bench-* rows into the configured database")
+        parser.add_argument("--remove-seeded", action="store_true",
+                            help="Delete the bench-* users, orders, categories and items from the configured database")
+        parser.add_argument("--password", default=os.getenv("BENCH_PASSWORD"),
+                            help="Bench users' password (default: $BENCH_PASSWORD, else generated and printed)")
+        parser.add_argument("--flows", nargs="+", help="Subset of flows to run (default: all)")
+        parser.add_argument("--repeat", type=int, default=30)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--items", type=int, default=300)
+        parser.add_argument("--categories", type=int, default=8)
+        parser.add_argument("--customers", type=int, default=200)
+        parser.add_argument("--crew", type=int, default=10)
+        parser.add_argument("--orders", type=int, default=5000)
+        parser.add_argument("--save", metavar="FILE", help="Write the results as a baseline JSON")
+        parser.add_argument("--compare", metavar="FILE", help="Compare with a saved baseline")
+        parser.add_argument("--tolerance", type=float, default=0.25,
+                            help="Allowed p95 growth before a flow counts as regressed (fraction)")
+        parser.add_argument("--fail-on-regression", action="store_true")
+
+    def handle(self, *args, **opts):
+        if opts["remove_seeded"]:
+            self.stdout.write(f"Removed {remove_seeded()} bench row(s)")
+            return
+        if (opts["url"] or opts["no_scratch"]) and not opts["seed_configured_db"]:
+            raise CommandError(
+                "--url / --no-scratch seed bench-* users, menu and orders into the configured database; "
+                "pass --seed-configured-db to allow it (--remove-seeded cleans up)"
+            )
+        if not opts["password"]:
+            opts["password"] = secrets.token_urlsafe(12)
+            self.stdout.write(f"Bench users' password: {opts['password']}")
+        baseline = load_baseline(opts["compare"]) if opts["compare"] else None
+        with ExitStack() as stack:
+            if opts["url"]:
+                driver = HttpDriver(opts["url"])
+            else:
+                if not opts["no_scratch"]:
+                    stack.enter_context(scratch_database())
+                stack.enter_context(override_settings(
+                    ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+                    THROTTLE_STORE=":memory:",  # не трогаем корзины работающего сервера
+                ))
+                stack.enter_context(_unthrottled())
+                driver = InProcessDriver()
+            results, meta = self.run(driver, opts)
+
+        self.report(results)
+        if baseline is not None:
+            self.report_comparison(results, meta, baseline, opts)
+        if opts["save"]:
+            save_baseline(opts["save"], results, meta)
+            self.stdout.write(f"Baseline written to {opts['save']}")
+
+    def run(self, driver, opts):
+        rng = random.Random(opts["seed"])
+        fixtures = seed(opts, rng, self.stdout, opts["password"])
+        flows = Flows(driver, fixtures, rng).all()
+        names = opts["flows"] or list(flows)
+        unknown = set(names) - set(flows)
+        if unknown:
+            raise CommandError(f"Unknown flows: {', '.join(sorted(unknown))} (known: {', '.join(flows)})")
+
+        results = {}
+        for name in names:
+            make_request, setup = flows[name]
+            results[name] = run_flow(driver, make_request, setup, opts["repeat"], opts["warmup"])
+        meta = {
+            "target": driver.label,
+            "database": connection.vendor,
+            "django": django.get_version(),
+            "repeat": opts["repeat"],
+            "data": {k: opts[k] for k in ("seed", "items", "categories", "customers", "crew", "orders")},
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        return results, meta
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'flow':<16} {'runs':>5} {'errors':>6} {'queries':>7} "
+            f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rps':>8}"
+        )
+        for name, r in results.items():
+            queries = "-" if r["queries"] is None else r["queries"]
+            self.stdout.write(
+                f"{name:<16} {r['runs']:>5} {r['errors']:>6} {queries:>7} "
+                f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['rps'] or '-':>8}"
+            )
+
+    def report_comparison(self, results, meta, baseline, opts):
+        base_meta = baseline.get("meta", {})
+        for key in ("target", "database", "data"):
+            if base_meta.get(key) != meta[key]:
+                self.stdout.write(self.style.WARNING(
+                    f"Baseline {key} differs ({base_meta.get(key)!r} vs {meta[key]!r}); numbers may not be comparable"
+                ))
+
+        rows = compare(results, baseline.get("results", {}), opts["tolerance"])
+        self.stdout.write(f"\n{'flow':<16} {'p95 ms':>9} {'base':>9} {'delta':>8} {'queries':>9}")
+        for row in rows:
+            delta = "new" if row["p95_delta"] is None else f"{row['p95_delta']:+.0%}"
+            queries = f"{row['queries']}/{row['base_queries']}" if row["base_queries"] is not None else "-"
+            line = f"{row['name']:<16} {row['p95_ms']:>9} {row['base_p95_ms'] or '-':>9} {delta:>8} {queries:>9}"
+            self.stdout.write(self.style.ERROR(line + "  REGRESSION") if row["regressed"] else line)
+
+        regressed = [row["name"] for row in rows if row["regressed"]]
+        if regressed and opts["fail_on_regression"]:
+            raise CommandError(f"Regressed: {', '.join(regressed)}")
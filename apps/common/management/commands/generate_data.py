@@ -0,0 +1,246 @@
+"""
+Synthetic data at production scale, for reproducing slow paths locally.
+
+    python manage.py generate_data                                   # ~100k orders
+    python manage.py generate_data --orders 3500000 --lines 3        # ~10M order items
+    DB_NAME=/tmp/big.sqlite3 python manage.py migrate && DB_NAME=/tmp/big.sqlite3 python manage.py generate_data ...
+
+Categories, menu items, customers / crew / managers with profiles and group
+memberships, carts, then orders and their items, all from one seeded RNG: the
+same ``--seed`` and ``--start-date`` give the same rows (without
+``--start-date`` the days count back from today, so only on the same day). Users and the small tables
+go through bulk_create (no post_save, so ``ensure_profile`` does not run; the
+profiles are bulk-created alongside). Orders and order items, the bulk of the
+volume, are written as value tuples in multi-row INSERTs on the raw cursor:
+model instances and per-field preparation cost ~90% of bulk_create's time
+at this size. Order days spread over ``--days`` from ``--start-date``, in id
+order, with the hour of day drawn from a lunch/dinner profile.
+
+Signals are bypassed throughout: the menu is announced once with
+``menu_bulk_changed`` (search index, cache version, snapshot) and each chunk of
+orders is added to the sales rollups with ``rollups.orders_loaded()`` in the
+same transaction, so nothing needs rebuilding afterwards.
+"""
+import random
+import time
+from collections import namedtuple
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.accounts.models import Profile
+from apps.accounts.roles import MANAGER, DELIVERY
+from apps.analytics import rollups
+from apps.cart.models import Cart
+from apps.menu.models import Category, MenuItem
+from apps.menu.signals import menu_bulk_changed
+from apps.orders.models import Order, OrderItem
+from .bench_api import CATEGORIES, WORDS
+
+PASSWORD = "generated-pass-42"
+# что rollups читают у заказа; экземпляр Order на строку — треть времени генерации
+Placed = namedtuple("Placed", "date total status")
+CITIES = ("Chicago", "Evanston", "Oak Park", "Skokie", "Cicero")
+# доля заказов по часу дня: обед и ужин
+HOUR_WEIGHTS = [1, 0, 0, 0, 0, 0, 1, 2, 3, 3, 4, 8, 12, 10, 5, 4, 5, 8, 12, 11, 7, 4, 2, 1]
+
+
+def insert_rows(model, names, rows):
+    """Multi-row INSERTs of value tuples for ``names``, as many rows per statement as the backend allows."""
+    fields = [model._meta.get_field(name) for name in names]
+    qn = connection.ops.quote_name
+    per_statement = max(1, min(1000, connection.ops.bulk_batch_size(fields, rows)))
+    head = f"INSERT INTO {qn(model._meta.db_table)} ({', '.join(qn(f.column) for f in fields)}) VALUES "
+    marks = "(" + ", ".join(["%s"] * len(fields)) + ")"
+    with connection.cursor() as wrapper:
+        # курсор драйвера: при DEBUG=1 обёртка Django логирует каждый запрос с параметрами
+        cursor = wrapper.cursor
+        for start in range(0, len(rows), per_statement):
+            batch = rows[start:start + per_statement]
+            cursor.execute(head + ", ".join([marks] * len(batch)), [v for row in batch for v in row])
+
+
+class Command(BaseCommand):
+    help = "Fill the database with seeded synthetic menu, users, carts and orders at scale."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--prefix", default="gen-", help="Username prefix; must not be in use yet")
+        parser.add_argument("--categories", type=int, default=12)
+        parser.add_argument("--items", type=int, default=500)
+        parser.add_argument("--customers", type=int, default=20000)
+        parser.add_argument("--crew", type=int, default=100)
+        parser.add_argument("--managers", type=int, default=3)
+        parser.add_argument("--carts", type=float, default=0.1, help="Share of customers with a filled cart")
+        parser.add_argument("--orders", type=int, default=100000)
+        parser.add_argument("--lines", type=int, default=3, help="Average items per order (1 .. 2*lines-1)")
+        parser.add_argument("--days", type=int, default=365, help="Orders spread over this many days")
+        parser.add_argument(
+            "--start-date", type=date.fromisoformat, default=None,
+            help="First order day, YYYY-MM-DD (default: --days before today). "
+                 "Pass it to get the same rows from the same --seed on another day",
+        )
+        parser.add_argument("--chunk", type=int, default=20000, help="Orders per transaction")
+
+    def handle(self, *args, **opts):
+        if User.objects.filter(username__startswith=opts["prefix"]).exists():
+            raise CommandError(f"Users named {opts['prefix']}* exist already; pass another --prefix")
+        at_least_one = ("lines", "items", "customers", "categories", "orders", "days", "chunk")
+        if any(opts[name] < 1 for name in at_least_one):
+            raise CommandError(f"{', '.join('--' + n for n in at_least_one)} must be at least 1")
+        if opts["crew"] < 0 or opts["managers"] < 0:
+            raise CommandError("--crew and --managers must not be negative")
+
+        rng = random.Random(opts["seed"])
+        started = time.monotonic()
+        with transaction.atomic():
+            items = self.menu(rng, opts)
+            customers, crew = self.users(rng, opts)
+            carts = self.carts(rng, opts, customers, items)
+            menu_bulk_changed.send(sender=MenuItem, ids=[mi.pk for mi in items])
+        self.stdout.write(
+            f"{len(items)} items, {len(customers)} customers, {len(crew)} crew, {carts} cart lines "
+            f"({time.monotonic() - started:.1f}s)"
+        )
+
+        orders, lines = self.orders(rng, opts, customers, crew, items)
+        self.stdout.write(self.style.SUCCESS(
+            f"{orders} orders, {lines} items; done in {time.monotonic() - started:.1f}s; password: {PASSWORD}"
+        ))
+
+    def menu(self, rng, opts):
+        start = Category.objects.count()
+        cats = Category.objects.bulk_create(
+            Category(slug=f"{opts['prefix']}{start + i}", title=f"{CATEGORIES[i % len(CATEGORIES)]} {start + i}")
+            for i in range(opts["categories"])
+        )
+        return MenuItem.objects.bulk_create(
+            (
+                MenuItem(
+                    title=" ".join(rng.sample(WORDS, 3)).title(),
+                    price=Decimal(rng.randint(250, 4500)) / 100,
+                    featured=rng.random() < 0.1,
+                    category=rng.choice(cats),
+                )
+                for _ in range(opts["items"])
+            ),
+            batch_size=1000,
+        )
+
+    def users(self, rng, opts):
+        prefix = opts["prefix"]
+        hashed = make_password(PASSWORD)  # один хеш на всех: PBKDF2 на каждого — часы
+        groups = {name: Group.objects.get_or_create(name=name)[0] for name in (MANAGER, DELIVERY)}
+
+        def create(role, count):
+            return User.objects.bulk_create(
+                (User(username=f"{prefix}{role}-{i}", password=hashed, email=f"{prefix}{role}-{i}@example.com")
+                 for i in range(count)),
+                batch_size=1000,
+            )
+
+        managers = create("manager", opts["managers"])
+        crew = create("crew", opts["crew"])
+        customers = create("customer", opts["customers"])
+        Profile.objects.bulk_create(
+            (
+                Profile(
+                    user=user,
+                    address_line1=f"{rng.randint(1, 9999)} {rng.choice(WORDS).title()} St",
+                    city=rng.choice(CITIES),
+                    postal_code=f"60{rng.randint(100, 999)}",
+                    phone=f"+1312{rng.randint(1000000, 9999999)}",
+                )
+                for user in (*managers, *crew, *customers)
+            ),
+            batch_size=1000,
+        )
+        User.groups.through.objects.bulk_create(
+            [User.groups.through(user=u, group=groups[MANAGER]) for u in managers]
+            + [User.groups.through(user=u, group=groups[DELIVERY]) for u in crew],
+            batch_size=1000,
+        )
+        return customers, crew
+
+    def carts(self, rng, opts, customers, items):
+        lines = [
+            Cart(user=user, menuitem=mi, quantity=qty, unit_price=mi.price, price=mi.price * qty)
+            for user in customers
+            if rng.random() < opts["carts"]
+            for mi, qty in ((mi, rng.randint(1, 3)) for mi in rng.sample(items, min(len(items), rng.randint(1, 5))))
+        ]
+        Cart.objects.bulk_create(lines, batch_size=1000)
+        return len(lines)
+
+    def orders(self, rng, opts, customers, crew, items):
+        total_orders, chunk, days = opts["orders"], opts["chunk"], opts["days"]
+        first_id = (Order.objects.aggregate(top=Max("id"))["top"] or 0) + 1
+        first_day = opts["start_date"] or timezone.localdate() - timedelta(days=days)
+        tz = timezone.get_current_timezone()
+        adapt = connection.ops.adapt_datetimefield_value
+        day_index, midnight, stamps = None, None, {}
+
+        menu = [(mi.id, mi.category_id, mi.price, [mi.price * qty for qty in range(4)]) for mi in items]
+        customer_ids, crew_ids = [u.id for u in customers], [u.id for u in crew]
+        max_lines = 2 * opts["lines"] - 1
+        hours, cum_weights = list(range(24)), list(accumulate(HOUR_WEIGHTS))
+        written_lines, report_every = 0, max(total_orders // 10, 1)
+
+        for offset in range(0, total_orders, chunk):
+            order_rows, line_rows, placed = [], [], []
+            for n in range(offset, min(offset + chunk, total_orders)):
+                order_id = first_id + n
+                # день растёт вместе с id, час — по профилю спроса
+                if n * days // total_orders != day_index:
+                    day_index = n * days // total_orders
+                    midnight = datetime.combine(first_day + timedelta(days=day_index), dt_time.min, tzinfo=tz)
+                    stamps = {}  # adapt() дорогой, а минут в дне всего 1440
+                minute = rng.choices(hours, cum_weights=cum_weights)[0] * 60 + rng.randrange(60)
+                if minute not in stamps:
+                    moment = midnight + timedelta(minutes=minute)
+                    stamps[minute] = moment, adapt(moment)
+                moment, stamp = stamps[minute]
+                total, lines = Decimal(0), []
+                for menuitem_id, category_id, unit, prices in rng.sample(
+                    menu, min(len(menu), rng.randint(1, max_lines))
+                ):
+                    qty = rng.randint(1, 3)
+                    line_rows.append((order_id, menuitem_id, qty, unit, prices[qty]))
+                    lines.append((menuitem_id, category_id, qty, prices[qty]))
+                    total += prices[qty]
+                assigned = bool(crew_ids) and rng.random() < 0.85
+                # вчерашние и старше почти все доставлены
+                status = int(assigned and day_index < days - 1 and rng.random() < 0.97)
+                order_rows.append((
+                    order_id,
+                    rng.choice(customer_ids),
+                    rng.choice(crew_ids) if assigned else None,
+                    status,
+                    total,
+                    stamp,
+                    "",
+                ))
+                placed.append((Placed(moment, total, status), lines))
+            with transaction.atomic():
+                insert_rows(Order, ("id", "user", "delivery_crew", "status", "total", "date", "shipping_address"),
+                            order_rows)
+                insert_rows(OrderItem, ("order", "menuitem", "quantity", "unit_price", "price"), line_rows)
+                rollups.orders_loaded(placed)
+            written_lines += len(line_rows)
+            done = offset + len(order_rows)
+            if done // report_every != offset // report_every or done == total_orders:
+                self.stdout.write(f"  {done}/{total_orders} orders, {written_lines} items")
+
+        # явные id: на PostgreSQL сдвигаем последовательность за них
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Order]):
+                cursor.execute(sql)
+        return total_orders, written_lines
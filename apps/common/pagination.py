@@ -1,7 +1,197 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage, Page
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class DefaultPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = "page_size"
-    max_page_size = 100
\ No newline at end of file
+    max_page_size = 100
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() with the COUNT and the page fetch done through the async ORM."""
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()  # cached_property -> кладём готовое
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+        bottom = (number - 1) * page_size
+        top = min(bottom + page_size, paginator.count)
+        objects = [obj async for obj in queryset[bottom:top]] if top > bottom else []
+        self.page = Page(objects, number, paginator)
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return objects
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in cursor pagination: ?pagination=cursor (follow-up pages carry ?cursor=).
+
+    Pages are cut with a WHERE on the ordering key + id, e.g. for "-date":
+        date < :d OR (date = :d AND id < :id)  ORDER BY date DESC, id DESC
+    so fetching page N costs the same as page 1 and no COUNT(*) is run.
+    """
+    page_size = DefaultPagination.page_size
+    page_size_query_param = "page_size"
+    max_page_size = DefaultPagination.max_page_size
+    cursor_query_param = "cursor"
+    mode_query_param = "pagination"
+    invalid_cursor_message = "Invalid cursor"
+
+    @classmethod
+    def is_requested(cls, request):
+        params = request.query_params
+        return params.get(cls.mode_query_param) == "cursor" or cls.cursor_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_keys(self, queryset, view):
+        ordering = list(queryset.query.order_by) or list(getattr(view, "ordering", None) or [])
+        keys = [f for f in ordering if isinstance(f, str) and f.lstrip("-").isidentifier() and "__" not in f]
+        names = {k.lstrip("-") for k in keys}
+        if not names & {"id", "pk"}:
+            # id добивает ключ до уникального; направление как у первого поля
+            desc = bool(keys) and keys[0].startswith("-")
+            keys.append("-id" if desc else "id")
+        return keys
+
+    def encode_cursor(self, values, backwards):
+        # str()/isoformat() без потерь: DjangoJSONEncoder режет datetime до миллисекунд
+        values = [
+            v.isoformat() if hasattr(v, "isoformat") else v if isinstance(v, (int, float)) else str(v)
+            for v in values
+        ]
+        payload = json.dumps({"v": values, "b": backwards}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request):
+        raw = request.query_params.get(self.cursor_query_param)
+        if not raw:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)))
+            return list(data["v"]), bool(data["b"])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def clean_values(self, queryset, values):
+        """Cursor values -> typed values of their key fields (a tampered cursor -> 404)."""
+        opts = queryset.model._meta
+        cleaned = []
+        for key, value in zip(self.keys, values):
+            name = key.lstrip("-")
+            try:
+                field = opts.pk if name == "pk" else opts.get_field(name)
+            except FieldDoesNotExist:
+                field = None  # аннотация: сравниваем как есть
+            try:
+                value = field.to_python(value) if field is not None else value
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None or isinstance(value, (dict, list)):
+                raise NotFound(self.invalid_cursor_message)
+            cleaned.append(value)
+        return cleaned
+
+    def _seek(self, keys, values, backwards):
+        # (k0, k1, ...) строго после / до values в порядке keys
+        clauses = []
+        for i, key in enumerate(keys):
+            name = key.lstrip("-")
+            after = key.startswith("-") == backwards
+            lookup = f"{name}__gt" if after else f"{name}__lt"
+            eq = {k.lstrip("-"): v for k, v in zip(keys[:i], values[:i])}
+            clauses.append(Q(**eq, **{lookup: values[i]}))
+        return reduce(or_, clauses)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        self.keys = self.get_keys(queryset, view)
+        if len(self.keys) != len(set(k.lstrip("-") for k in self.keys)):
+            raise NotFound(self.invalid_cursor_message)
+
+        values, backwards = self.decode_cursor(request)
+        if values is not None:
+            if len(values) != len(self.keys):
+                raise NotFound(self.invalid_cursor_message)
+            values = self.clean_values(queryset, values)
+
+        order = self.keys
+        if backwards:
+            order = [k[1:] if k.startswith("-") else f"-{k}" for k in self.keys]
+        qs = queryset.order_by(*order)
+        if values is not None:
+            qs = qs.filter(self._seek(self.keys, values, backwards))
+
+        rows = list(qs[: self.page_size_value + 1])
+        more = len(rows) > self.page_size_value
+        rows = rows[: self.page_size_value]
+        if backwards:
+            rows.reverse()
+
+        self.has_next = more if not backwards else values is not None
+        self.has_previous = values is not None if not backwards else more
+        self.page = rows
+        return rows
+
+    def _key_values(self, obj):
+        return [getattr(obj, k.lstrip("-")) for k in self.keys]
+
+    def _link(self, obj, backwards):
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.mode_query_param, "cursor")
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self._key_values(obj), backwards))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], backwards=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self._link(self.page[0], backwards=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
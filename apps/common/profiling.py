@@ -0,0 +1,238 @@
+"""
+Opt-in per-request profiling (PROFILING=1 adds the middleware).
+
+A sampled request gets
+
+    Server-Timing: db;dur=4.1;desc="7 queries", cache;dur=0.3;desc="5 calls",
+                   throttle;dur=0.4, view;dur=9.8, serialize;dur=3.2, render;dur=0.6,
+                   total;dur=11.2
+
+and, with ?_profile=1 where forcing is allowed (PROFILING_ALLOW_FORCE), the
+same numbers as a "_profile" key appended to a JSON object body.
+
+Timing hooks are installed once: an execute_wrapper on every DB connection
+(added as connections open, middleware or not), wrappers around the cache backends, serializer ``.data``, DRF renderers and
+APIView.check_throttles. They all check one context variable, so requests that
+are not sampled pay a ContextVar lookup per hook and nothing else. The context
+variable follows the request into sync_to_async, so the async views are
+covered too.
+"""
+import functools
+import json
+import random
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.response import SimpleTemplateResponse
+
+PROFILE_PARAM = "_profile"
+CACHE_METHODS = (
+    "get", "set", "add", "delete", "touch", "incr", "decr", "has_key",
+    "get_many", "set_many", "delete_many", "get_or_set", "clear",
+)
+
+_current = ContextVar("ll_profile", default=None)
+_installed = set()
+
+
+class Profile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+        self._inside = set()
+
+    def call(self, bucket, fn, *args, **kwargs):
+        # вложенные вызовы той же корзины (get_many -> get) не считаем дважды
+        if bucket in self._inside:
+            return fn(*args, **kwargs)
+        self._inside.add(bucket)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.durations[bucket] += time.perf_counter() - start
+            self.counts[bucket] += 1
+            self._inside.discard(bucket)
+
+    def add(self, bucket, seconds):
+        self.durations[bucket] += seconds
+
+    def summary(self):
+        data = {"total_ms": round((time.perf_counter() - self.started) * 1000, 3)}
+        for bucket, seconds in self.durations.items():
+            data[f"{bucket}_ms"] = round(seconds * 1000, 3)
+        for bucket in ("db", "cache"):
+            data[f"{bucket}_count"] = self.counts.get(bucket, 0)
+        return data
+
+    def server_timing(self):
+        parts = []
+        for bucket in ("db", "cache", "throttle", "view", "serialize", "render"):
+            if bucket not in self.durations:
+                continue
+            part = f"{bucket};dur={self.durations[bucket] * 1000:.1f}"
+            if bucket == "db":
+                part += f';desc="{self.counts[bucket]} queries"'
+            elif bucket == "cache":
+                part += f';desc="{self.counts[bucket]} calls"'
+            parts.append(part)
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+# ---- hooks -------------------------------------------------------------
+
+def _db_wrapper(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile.call("db", execute, sql, params, many, context)
+
+
+def _add_db_wrapper(connection):
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_wrapper)
+
+
+@receiver(connection_created)
+def _on_connection_created(sender, connection, **kwargs):
+    # всегда (подключено из CommonConfig.ready): соединение может открыться раньше,
+    # чем загрузится middleware, а без активного профиля обёртка — один ContextVar.get
+    _add_db_wrapper(connection)
+
+
+def _instrument(cls, name, bucket):
+    if (cls, name) in _installed or name not in vars(cls):
+        return
+    _installed.add((cls, name))
+    original = vars(cls)[name]
+
+    if isinstance(original, property):
+        fget = original.fget
+
+        def getter(self):
+            profile = _current.get()
+            return fget(self) if profile is None else profile.call(bucket, fget, self)
+
+        setattr(cls, name, property(getter, original.fset, original.fdel, original.__doc__))
+        return
+
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        return original(*args, **kwargs) if profile is None else profile.call(bucket, original, *args, **kwargs)
+
+    setattr(cls, name, wrapper)
+
+
+def install():
+    """Idempotent: put the timing hooks in place."""
+    from rest_framework import serializers
+    from rest_framework.settings import api_settings
+    from rest_framework.views import APIView
+
+    for conn in connections.all(initialized_only=True):
+        _add_db_wrapper(conn)
+
+    for alias in settings.CACHES:
+        for klass in type(caches[alias]).__mro__:
+            for name in CACHE_METHODS:
+                _instrument(klass, name, "cache")
+
+    _instrument(serializers.Serializer, "data", "serialize")
+    _instrument(serializers.ListSerializer, "data", "serialize")
+    for renderer in api_settings.DEFAULT_RENDERER_CLASSES:
+        _instrument(renderer, "render", "render")
+    _instrument(APIView, "check_throttles", "throttle")
+
+
+# ---- middleware --------------------------------------------------------
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        install()
+
+    def _forced(self, request):
+        return request.GET.get(PROFILE_PARAM) == "1" and getattr(settings, "PROFILING_ALLOW_FORCE", False)
+
+    def _should_profile(self, request):
+        return self._forced(request) or random.random() < getattr(settings, "PROFILING_SAMPLE_RATE", 1.0)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._should_profile(request):
+            return self.get_response(request)
+        profile = Profile()
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        if not self._should_profile(request):
+            return await self.get_response(request)
+        profile = Profile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if _current.get() is not None:
+            request._profile_view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF Response: вью отработало, рендер ещё впереди
+        self._end_view(request)
+        return response
+
+    def _end_view(self, request):
+        started = getattr(request, "_profile_view_started", None)
+        profile = _current.get()
+        if started is not None and profile is not None:
+            profile.add("view", time.perf_counter() - started)
+            request._profile_view_started = None
+
+    def finish(self, request, response, profile):
+        started = getattr(request, "_profile_view_started", None)
+        if started is not None:
+            profile.add("view", time.perf_counter() - started)
+        response["Server-Timing"] = profile.server_timing()
+        # разбивка в теле — только там, где ?_profile=1 разрешён; иначе хватит заголовка
+        if self._forced(request):
+            self._append_json(response, profile.summary())
+        return response
+
+    def _append_json(self, response, summary):
+        if response.streaming or "json" not in response.get("Content-Type", ""):
+            return
+        if isinstance(response, SimpleTemplateResponse) and not response.is_rendered:
+            return
+        try:
+            body = json.loads(response.content)
+        except ValueError:
+            return
+        if isinstance(body, dict):
+            body[PROFILE_PARAM] = summary
+            response.content = json.dumps(body).encode()
+            if response.has_header("Content-Length"):
+                response["Content-Length"] = str(len(response.content))
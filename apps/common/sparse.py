@@ -0,0 +1,158 @@
+"""
+Sparse fieldsets for read endpoints.
+
+    ?fields=id,status,items.quantity,items.menuitem.title
+        keep only the listed fields; dotted paths select inside nested objects,
+        a bare nested name keeps all of its fields
+    ?expand=items,items.menuitem
+        when given, only the listed nested relations stay objects, every other
+        nested relation is rendered as its primary key (?expand= collapses all)
+
+Without either parameter the output is unchanged. plan_queryset() then narrows
+the queryset to what the pruned serializer reads: only() columns,
+select_related for nested FKs and Prefetch(...) for nested lists.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+
+def parse_paths(raw):
+    """"a,b.c,b.d" -> {"a": {}, "b": {"c": {}, "d": {}}}"""
+    tree = {}
+    for path in (raw or "").split(","):
+        node = tree
+        for part in filter(None, (p.strip() for p in path.split("."))):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def _unwrap(field):
+    return field.child if isinstance(field, serializers.ListSerializer) else field
+
+
+def _prune(serializer, fields, expand):
+    """fields: tree or None (keep all); expand: tree or None (expand all)."""
+    declared = serializer.fields
+    for name in list(declared):
+        field = declared[name]
+        if fields and name not in fields:
+            declared.pop(name)
+            continue
+        nested = _unwrap(field)
+        if not isinstance(nested, serializers.BaseSerializer) or field.write_only:
+            continue
+        if expand is not None and name not in expand:
+            kwargs = {"many": isinstance(field, serializers.ListSerializer), "read_only": True}
+            if field.source != name:
+                kwargs["source"] = field.source
+            declared[name] = serializers.PrimaryKeyRelatedField(**kwargs)
+            continue
+        _prune(
+            nested,
+            (fields or {}).get(name) or None,
+            None if expand is None else expand[name],
+        )
+    return serializer
+
+
+def sparse_fields(serializer, request):
+    params = request.query_params
+    if FIELDS_PARAM not in params and EXPAND_PARAM not in params:
+        return serializer
+    fields = parse_paths(params.get(FIELDS_PARAM)) or None
+    expand = parse_paths(params[EXPAND_PARAM]) if EXPAND_PARAM in params else None
+    _prune(_unwrap(serializer), fields, expand)
+    return serializer
+
+
+class _Plan:
+    def __init__(self):
+        self.only = set()
+        self.select = set()
+        self.prefetch = []
+        self.exact = True  # False -> поле не из модели, only() не применяем
+
+    def apply(self, queryset):
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if self.select:
+            queryset = queryset.select_related(*sorted(self.select))
+        if self.prefetch:
+            queryset = queryset.prefetch_related(*self.prefetch)
+        if self.exact:
+            queryset = queryset.only(*sorted(self.only))
+        return queryset
+
+
+def _plan(serializer, model, plan, prefix=""):
+    plan.only.add(f"{prefix}{model._meta.pk.name}")
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        attrs = field.source_attrs
+        if not attrs:  # source="*"
+            plan.exact = False
+            continue
+        try:
+            model_field = model._meta.get_field(attrs[0])
+        except FieldDoesNotExist:
+            plan.exact = False
+            continue
+        path = f"{prefix}{attrs[0]}"
+
+        if isinstance(field, (serializers.ListSerializer, serializers.ManyRelatedField)):
+            if model_field.one_to_many and not prefix:
+                related = model_field.related_model
+                child = _Plan()
+                child.only.add(model_field.field.name)
+                nested = _unwrap(field)
+                if isinstance(nested, serializers.BaseSerializer):
+                    _plan(nested, related, child)
+                else:
+                    child.only.add(related._meta.pk.name)
+                plan.prefetch.append(Prefetch(path, queryset=child.apply(related._default_manager.all())))
+            else:
+                plan.exact = False
+                plan.prefetch.append(path)
+        elif isinstance(field, serializers.BaseSerializer) and model_field.is_relation:
+            plan.only.add(path)
+            plan.select.add(path)
+            _plan(field, model_field.related_model, plan, prefix=f"{path}__")
+        elif len(attrs) == 1 and model_field.concrete:
+            plan.only.add(path)
+        else:
+            plan.exact = False
+    return plan
+
+
+def plan_queryset(serializer, queryset, extra_fields=()):
+    plan = _plan(_unwrap(serializer), queryset.model, _Plan())
+    for name in extra_fields:
+        try:
+            if queryset.model._meta.get_field(name).concrete:
+                plan.only.add(name)
+        except FieldDoesNotExist:
+            pass
+    return plan.apply(queryset)
+
+
+class SparseFieldsMixin:
+    """Generic-view mixin: ?fields= / ?expand= on reads + a matching queryset."""
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.request.method in SAFE_METHODS:
+            sparse_fields(serializer, self.request)
+        return serializer
+
+    def sparse_queryset(self, queryset):
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        sparse_fields(serializer, self.request)
+        extra = getattr(self, "ordering_fields", None)
+        return plan_queryset(serializer, queryset, extra if isinstance(extra, (list, tuple)) else ())
@@ -0,0 +1,26 @@
+import unittest
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+from . import throttling
+
+
+class ThrottleResetMixin:
+    def startTest(self, test):
+        throttling.reset()
+        super().startTest(test)
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner with per-process throttle buckets, emptied before each test
+    (the default cache is not shared with them, so cache.clear() does not)."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.THROTTLE_STORE = ":memory:"
+        throttling.close_store()
+
+    def get_resultclass(self):
+        base = super().get_resultclass() or unittest.TextTestResult
+        return type(f"ThrottleReset{base.__name__}", (ThrottleResetMixin, base), {})
@@ -1,3 +1,308 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Count, Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.accounts.roles import MANAGER, DELIVERY
+from apps.analytics.models import DailySales
+from apps.cart.models import Cart
+from apps.menu import search
+from apps.menu.models import Category, MenuItem
+from apps.orders.models import Order, OrderItem
+
+from . import throttling
+from .bench import compare
+from .sparse import parse_paths
+
+
+class SparseFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("boss", password="pass")
+        cls.manager.groups.add(Group.objects.create(name=MANAGER))
+        cls.customer = User.objects.create_user("cust", password="pass")
+        cat = Category.objects.create(slug="main", title="Main")
+        cls.item = MenuItem.objects.create(title="Pizza", price=Decimal("12.50"), category=cat)
+        for _ in range(3):
+            o = Order.objects.create(user=cls.customer, total=Decimal("12.50"))
+            OrderItem.objects.create(order=o, menuitem=cls.item, quantity=1,
+                                     unit_price=cls.item.price, price=cls.item.price)
+
+    def setUp(self):
+        cache.clear()
+        self.c = APIClient()
+        self.c.force_authenticate(self.manager)
+
+    def test_parse_paths(self):
+        self.assertEqual(parse_paths("id, items.menuitem.title,items.quantity"),
+                         {"id": {}, "items": {"menuitem": {"title": {}}, "quantity": {}}})
+
+    def test_default_output_unchanged(self):
+        o = self.c.get("/api/orders").json()["results"][0]
+        self.assertEqual(o["items"][0]["menuitem"]["category"]["title"], "Main")
+        self.assertEqual(o["user"]["username"], "cust")
+
+    def test_fields_select_columns_and_skip_prefetch(self):
+        with self.assertNumQueries(3):  # роли, COUNT, заказы
+            data = self.c.get("/api/orders?fields=id,status").json()
+        self.assertEqual(data["results"][0], {"id": data["results"][0]["id"], "status": 0})
+
+    def test_expand_collapses_relations_to_pk(self):
+        o = self.c.get("/api/orders?expand=items").json()["results"][0]
+        self.assertEqual(o["user"], self.customer.id)
+        self.assertEqual(o["items"][0]["menuitem"], self.item.id)
+
+    def test_nested_fields_on_menu_and_cart(self):
+        r = self.c.get(f"/api/menu-items/{self.item.id}?fields=title,category.title")
+        self.assertEqual(r.json(), {"title": "Pizza", "category": {"title": "Main"}})
+        self.c.force_authenticate(self.customer)
+        self.c.post("/api/cart/menu-items", {"menuitem_id": self.item.id, "quantity": 2}, format="json")
+        r = self.c.get("/api/cart/menu-items?fields=quantity,menuitem&expand=")
+        self.assertEqual(r.json(), [{"quantity": 2, "menuitem": self.item.id}])
+
+
+class SQLiteTuningTests(TestCase):
+    def test_pragmas_applied_to_connections(self):
+        from django.db import connection
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite only")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS["busy_timeout"])
+
+
+PROFILED = ["apps.common.profiling.ProfilingMiddleware", *settings.MIDDLEWARE]
+
+
+def timings(header):
+    """Server-Timing -> {name: {"dur": float, "desc": str?}}"""
+    out = {}
+    for metric in header.split(", "):
+        name, *params = metric.split(";")
+        out[name] = dict(p.split("=", 1) for p in params)
+    return out
+
+
+@override_settings(MIDDLEWARE=PROFILED, PROFILING_SAMPLE_RATE=1.0, PROFILING_ALLOW_FORCE=True)
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("boss", password="pass")
+        cls.manager.groups.add(Group.objects.create(name=MANAGER))
+        cls.customer = User.objects.create_user("cust", password="pass")
+        cat = Category.objects.create(slug="main", title="Main")
+        item = MenuItem.objects.create(title="Pizza", price=Decimal("12.50"), category=cat)
+        for _ in range(3):
+            o = Order.objects.create(user=cls.customer, total=Decimal("12.50"))
+            OrderItem.objects.create(order=o, menuitem=item, quantity=1, unit_price=1, price=1)
+
+    def setUp(self):
+        cache.clear()
+        self.c = APIClient()
+        self.c.force_authenticate(self.manager)
+
+    def test_server_timing_breakdown(self):
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.c.get("/api/orders")
+        self.assertEqual(r.status_code, 200)
+        t = timings(r["Server-Timing"])
+        self.assertEqual(t["db"]["desc"], f'"{len(ctx.captured_queries)} queries"')
+        for name in ("cache", "throttle", "view", "serialize", "render", "total"):
+            self.assertIn(name, t)
+        self.assertGreaterEqual(float(t["total"]["dur"]), float(t["view"]["dur"]))
+
+    def test_debug_json_and_sampling(self):
+        data = self.c.get("/api/orders?_profile=1").json()
+        self.assertEqual(len(data["results"]), 3)
+        self.assertGreater(data["_profile"]["db_count"], 0)
+        self.assertIn("serialize_ms", data["_profile"])
+
+        with self.settings(PROFILING_SAMPLE_RATE=0.0):
+            self.assertFalse(self.c.get("/api/orders").has_header("Server-Timing"))
+            self.assertTrue(self.c.get("/api/orders?_profile=1").has_header("Server-Timing"))
+            with self.settings(PROFILING_ALLOW_FORCE=False):
+                self.assertFalse(self.c.get("/api/orders?_profile=1").has_header("Server-Timing"))
+        with self.settings(PROFILING_ALLOW_FORCE=False):
+            r = self.c.get("/api/orders?_profile=1")  # попал в выборку, но тело без разбивки
+            self.assertTrue(r.has_header("Server-Timing"))
+            self.assertNotIn("_profile", r.json())
+
+    async def test_async_views_are_covered(self):
+        r = await self.async_client.get("/api/menu-items")
+        t = timings(r["Server-Timing"])
+        self.assertEqual(t["db"]["desc"], '"2 queries"')  # COUNT + page
+        self.assertIn("render", t)
+
+
+class BenchApiCommandTests(TestCase):
+    FLOWS = ["menu_filter", "cart_add", "checkout", "orders_manager"]
+
+    def bench(self, *args):
+        out = io.StringIO()
+        call_command(
+            "bench_api", "--no-scratch", "--seed-configured-db", "--repeat", "3", "--warmup", "1", "--items", "12",
+            "--customers", "4", "--crew", "2", "--orders", "30", "--flows", *self.FLOWS, *args, stdout=out,
+        )
+        return out.getvalue()
+
+    def test_runs_flows_and_compares_with_baseline(self):
+        fd, path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        self.bench("--save", path)
+        with open(path) as fh:
+            saved = json.load(fh)
+        self.assertEqual(set(saved["results"]), set(self.FLOWS))
+        for stats in saved["results"].values():
+            self.assertEqual(stats["errors"], 0)
+            self.assertEqual(stats["runs"], 3)
+            self.assertGreater(stats["queries"], 0)
+        self.assertEqual(Order.objects.count(), 30 + 4)  # засеянные + checkout (warmup + 3)
+
+        # вторая прогонка переиспользует данные; запросов стало «больше» -> регрессия
+        saved["results"]["checkout"]["queries"] -= 1
+        with open(path, "w") as fh:
+            json.dump(saved, fh)
+        with self.assertRaisesMessage(CommandError, "Regressed: checkout"):
+            self.bench("--compare", path, "--tolerance", "1000", "--fail-on-regression")
+
+    def test_configured_database_needs_opt_in_and_can_be_cleaned(self):
+        with self.assertRaisesMessage(CommandError, "--seed-configured-db"):
+            call_command("bench_api", "--no-scratch", stdout=io.StringIO())
+        self.assertFalse(User.objects.filter(username__startswith="bench-").exists())
+
+        self.assertRegex(self.bench(), r"Bench users' password: \S+")
+        manager = User.objects.get(username="bench-manager")
+        self.assertFalse(manager.is_staff)
+        self.assertTrue(manager.groups.filter(name=MANAGER).exists())
+        # повторный запуск со своим паролем: пользователи те же, логины проходят
+        self.assertNotIn("password:", self.bench("--password", "another-secret"))
+        self.assertTrue(User.objects.get(username="bench-manager").check_password("another-secret"))
+
+        call_command("bench_api", "--remove-seeded", stdout=io.StringIO())
+        self.assertFalse(User.objects.filter(username__startswith="bench-").exists())
+        self.assertFalse(Category.objects.filter(slug__startswith="bench-").exists())
+        self.assertFalse(Order.objects.exists())
+
+    def test_compare_flags_latency_queries_and_errors(self):
+        base = {"a": {"p95_ms": 10.0, "queries": 3, "errors": 0}}
+        rows = {r["name"]: r for r in compare({
+            "a": {"p95_ms": 11.0, "queries": 3, "errors": 0},
+        }, base, tolerance=0.25)}
+        self.assertFalse(rows["a"]["regressed"])
+        for current in (
+            {"p95_ms": 13.0, "queries": 3, "errors": 0},
+            {"p95_ms": 10.0, "queries": 4, "errors": 0},
+            {"p95_ms": 10.0, "queries": 3, "errors": 1},
+        ):
+            self.assertTrue(compare({"a": current}, base)[0]["regressed"], current)
+        self.assertIsNone(compare({"b": {"p95_ms": 1.0, "queries": 1}}, base)[0]["p95_delta"])
+
+
+class GenerateDataCommandTests(TestCase):
+    def generate(self, prefix, **options):
+        options = {"categories": 3, "items": 20, "customers": 15, "crew": 3, "managers": 1, "orders": 250,
+                   "chunk": 100, "carts": 0.5, **options}
+        call_command("generate_data", prefix=prefix, stdout=io.StringIO(), **options)
+        return Order.objects.filter(user__username__startswith=prefix).order_by("id")
+
+    def test_generates_consistent_seeded_data(self):
+        orders = self.generate("a-")
+        self.assertEqual(orders.count(), 250)
+        self.assertEqual(User.objects.filter(username__startswith="a-", profile__isnull=False).count(), 19)
+        self.assertEqual(Group.objects.get(name=DELIVERY).user_set.count(), 3)
+        self.assertTrue(Cart.objects.exists())
+        lines = OrderItem.objects.filter(order__in=orders)
+        self.assertTrue(all(1 <= n <= 5 for n in orders.annotate(n=Count("items")).values_list("n", flat=True)))
+        self.assertEqual(sum(orders.values_list("total", flat=True)), lines.aggregate(s=Sum("price"))["s"])
+        dates = list(orders.values_list("date", flat=True))
+        self.assertEqual([d.date() for d in dates], sorted(d.date() for d in dates))
+
+        # rollups и поиск заполнены по ходу, без rebuild
+        totals = DailySales.objects.aggregate(orders=Sum("orders"), revenue=Sum("revenue"))
+        self.assertEqual(totals, {"orders": 250, "revenue": orders.aggregate(s=Sum("total"))["s"]})
+        if search.available():
+            title = MenuItem.objects.last().title
+            self.assertIn(title, [m.title for m in search.search(MenuItem.objects.all(), title.lower().split())])
+
+        # тот же seed -> те же суммы заказов
+        again = self.generate("b-")
+        self.assertEqual(list(again.values_list("total", flat=True)), list(orders.values_list("total", flat=True)))
+        with self.assertRaisesMessage(CommandError, "exist already"):
+            self.generate("a-")
+
+    def test_without_crew_nothing_is_assigned(self):
+        orders = self.generate("c-", crew=0, managers=0)
+        self.assertEqual(orders.count(), 250)
+        self.assertFalse(orders.filter(delivery_crew__isnull=False).exists())
+        self.assertFalse(orders.filter(status=1).exists())
+        for bad in ({"crew": -1}, {"orders": 0}, {"days": 0}, {"chunk": -5}):
+            with self.subTest(bad=bad), self.assertRaises(CommandError):
+                self.generate("e-", **bad)
+        self.assertFalse(User.objects.filter(username__startswith="e-").exists())
+
+    def test_start_date_fixes_the_days(self):
+        from datetime import date
+        orders = self.generate("d-", orders=50, days=10, start_date=date(2024, 3, 1))
+        days = {d.date() for d in orders.values_list("date", flat=True)}
+        self.assertEqual(min(days), date(2024, 3, 1))
+        self.assertLessEqual(max(days), date(2024, 3, 10))
+
+
+class BucketThrottleTests(TestCase):
+    def store(self):
+        fd, path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_token_bucket_refills(self):
+        store = throttling.BucketStore(self.store())
+        bucket = [("cart:1", 2, 1.0)]
+        self.assertEqual(store.consume(bucket, now=100.0), (True, 0.0))
+        self.assertEqual(store.consume(bucket, now=100.0), (True, 0.0))
+        allowed, wait = store.consume(bucket, now=100.5)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 0.5)
+        self.assertTrue(store.consume(bucket, now=101.0)[0])
+
+    def test_scopes_are_charged_together_and_shared_between_workers(self):
+        path = self.store()
+        a, b = throttling.BucketStore(path), throttling.BucketStore(path)  # два воркера, один файл
+        self.assertTrue(a.consume([("orders:1", 1, 0.01), ("user:1", 5, 0.01)], now=0.0)[0])
+        # orders пуст -> user не списывается
+        self.assertFalse(b.consume([("orders:1", 1, 0.01), ("user:1", 5, 0.01)], now=1.0)[0])
+        for _ in range(4):
+            self.assertTrue(b.consume([("user:1", 5, 0.01)], now=1.0)[0])
+        self.assertFalse(a.consume([("user:1", 5, 0.01)], now=1.0)[0])
+
+    def test_api_returns_429_with_retry_after(self):
+        user = User.objects.create_user("thr", password="pass")
+        c = APIClient()
+        c.force_authenticate(user)
+        rates = {"cart": "2/min", "user": "100/min", "anon": "100/min"}
+        with mock.patch.object(throttling.BucketThrottle, "THROTTLE_RATES", rates):
+            self.assertEqual(c.get("/api/cart/menu-items").status_code, 200)
+            self.assertEqual(c.get("/api/cart/menu-items").status_code, 200)
+            r = c.get("/api/cart/menu-items")
+            self.assertEqual(r.status_code, 429)
+            self.assertIn(r["Retry-After"], ("29", "30"))
+            # у меню нет скоупа: только user
+            self.assertEqual(c.get("/api/menu-items").status_code, 200)
@@ -0,0 +1,193 @@
+"""
+Token-bucket throttling shared by every worker process.
+
+DRF's SimpleRateThrottle keeps a list of request timestamps per key in the
+cache: a get and a set per throttle class, three classes stacked, and with the
+default LocMem cache each worker counts on its own. Here every scope that
+applies to a request (the view's throttle_scope, plus "user" or "anon") is
+checked and charged in one SQLite transaction on a small file
+(THROTTLE_STORE):
+
+    buckets(key, tokens, stamp, full_at)      key = "<scope>:<user id or ip>"
+
+A rate "60/min" is a bucket of 60 tokens refilled at 1 per second; a request
+takes one token from each of its buckets, or from none of them if any is
+empty (the longest wait for a token becomes Retry-After). BEGIN IMMEDIATE
+serialises writers across processes, so the limits hold for all workers on
+the host. Rows of full buckets are pruned now and then: a missing row is a full
+bucket. If the store fails, requests are let through and the error is logged.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.throttling import SimpleRateThrottle
+
+logger = logging.getLogger(__name__)
+
+PRUNE_EVERY = 1000  # проверок между чистками полных корзин
+
+
+class BucketStore:
+    """One SQLite connection per process (re-opened after fork), used under a lock."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._checks = 0
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, stamp REAL NOT NULL, full_at REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def consume(self, buckets, now=None):
+        """
+        ``buckets``: [(key, capacity, refill per second)]. Takes a token from
+        each if all have one -> (True, 0.0); otherwise takes none -> (False, wait s).
+        """
+        now = time.time() if now is None else now
+        keys = [key for key, _, _ in buckets]
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = {
+                    key: (tokens, stamp)
+                    for key, tokens, stamp in conn.execute(
+                        f"SELECT key, tokens, stamp FROM buckets WHERE key IN ({', '.join('?' * len(keys))})", keys
+                    )
+                }
+                levels, wait = [], 0.0
+                for key, capacity, refill in buckets:
+                    tokens, stamp = rows.get(key, (capacity, now))
+                    level = min(capacity, tokens + max(0.0, now - stamp) * refill)
+                    if level < 1:
+                        wait = max(wait, (1 - level) / refill)
+                    levels.append((key, level - 1, now, now + (capacity - level + 1) / refill))
+                if wait:
+                    conn.execute("ROLLBACK")
+                    return False, wait
+                conn.executemany(
+                    "INSERT INTO buckets (key, tokens, stamp, full_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, stamp = excluded.stamp, "
+                    "full_at = excluded.full_at",
+                    levels,
+                )
+                self._checks += 1
+                if self._checks % PRUNE_EVERY == 0:
+                    conn.execute("DELETE FROM buckets WHERE full_at < ?", [now])
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+        return True, 0.0
+
+    def reset(self):
+        with self._lock:
+            self._connection().execute("DELETE FROM buckets")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = BucketStore(str(getattr(settings, "THROTTLE_STORE", ":memory:")))
+    return _store
+
+
+def reset():
+    """Empty every bucket (the test runner does this before each test)."""
+    get_store().reset()
+
+
+def close_store():
+    """Drop the store; the next check opens THROTTLE_STORE again."""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
+
+
+@receiver(setting_changed)
+def _store_setting_changed(setting, **kwargs):
+    if setting == "THROTTLE_STORE":
+        close_store()
+
+
+class BucketThrottle(SimpleRateThrottle):
+    """
+    The view's throttle_scope plus "user" / "anon", charged together
+    (stands in for ScopedRateThrottle + UserRateThrottle + AnonRateThrottle).
+    """
+
+    user_scopes = True
+
+    def __init__(self):
+        # ставки разбираются по скоупу в allow_request, не в конструкторе
+        self._wait = None
+
+    def scopes(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        scopes = [scope] if scope else []
+        if self.user_scopes:
+            scopes.append("user" if request.user and request.user.is_authenticated else "anon")
+        return [s for s in scopes if self.THROTTLE_RATES.get(s)]
+
+    def allow_request(self, request, view):
+        scopes = self.scopes(request, view)
+        if not scopes:
+            return True
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+
+        buckets = []
+        for scope in scopes:
+            num_requests, duration = self.parse_rate(self.THROTTLE_RATES[scope])
+            buckets.append((f"{scope}:{ident}", num_requests, num_requests / duration))
+        try:
+            allowed, self._wait = get_store().consume(buckets, self.timer())
+        except sqlite3.Error:
+            logger.warning("Throttle store unavailable, letting the request through", exc_info=True)
+            return True
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class ScopedBucketThrottle(BucketThrottle):
+    """Only the view's throttle_scope (as ScopedRateThrottle)."""
+
+    user_scopes = False
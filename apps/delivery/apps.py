@@ -5,3 +5,6 @@ class DeliveryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = "apps.delivery"
     verbose_name = "Delivery"
+
+    def ready(self):
+        from . import signals
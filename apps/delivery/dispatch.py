@@ -0,0 +1,133 @@
+"""
+Automatic delivery dispatch.
+
+One run loads the unassigned open orders (oldest first) and the active crew
+with their current open load, pairs them through two heaps
+
+    orders: (date, id)           -> oldest order goes first
+    crew:   (open orders, id)    -> least loaded courier gets it
+
+and writes the result in batches: per batch the rows that are still open and
+unassigned are locked and set with one UPDATE ... SET delivery_crew_id = CASE,
+so a manager assigning by hand in the meantime wins. Whatever a run could not place (no crew or every
+courier at the cap) is picked up by the next run.
+"""
+import heapq
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, Count, Q, Value, When
+from django.utils import timezone
+
+from apps.accounts.roles import DELIVERY
+from apps.common.bench import percentile
+from apps.orders.models import Order
+from apps.orders.signals import orders_bulk_updated
+
+OPEN = 0
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class Dispatcher:
+    def __init__(self, batch_size=None, max_per_crew=None, limit=None):
+        self.batch_size = batch_size or _setting("DISPATCH_BATCH_SIZE", 200)
+        # 0 -> без ограничения
+        self.max_per_crew = _setting("DISPATCH_MAX_PER_CREW", 5) if max_per_crew is None else max_per_crew
+        self.limit = limit
+
+    def load_crew(self):
+        """-> heap of (open orders, crew id) for couriers below the cap."""
+        crew = (
+            User.objects.filter(groups__name=DELIVERY, is_active=True)
+            .annotate(load=Count("deliveries", filter=Q(deliveries__status=OPEN)))
+            .values_list("load", "id")
+        )
+        heap = [(load, pk) for load, pk in crew if not self.max_per_crew or load < self.max_per_crew]
+        heapq.heapify(heap)
+        return heap
+
+    def load_orders(self):
+        qs = (
+            Order.objects.filter(status=OPEN, delivery_crew__isnull=True)
+            .order_by("date", "id")
+            .values_list("date", "id")
+        )
+        heap = list(qs[: self.limit] if self.limit else qs)
+        heapq.heapify(heap)
+        return heap
+
+    def plan(self, orders, crew):
+        """Pop orders/crew off the heaps -> [(order id, crew id, order date)]."""
+        pairs = []
+        while orders and crew:
+            date, order_id = heapq.heappop(orders)
+            load, crew_id = heapq.heappop(crew)
+            pairs.append((order_id, crew_id, date))
+            load += 1
+            if not self.max_per_crew or load < self.max_per_crew:
+                heapq.heappush(crew, (load, crew_id))
+        return pairs
+
+    def commit(self, batch):
+        """Lock what is still unassigned, one UPDATE for it -> ids actually assigned."""
+        with transaction.atomic():
+            ids = set(
+                Order.objects.select_for_update()
+                .filter(pk__in=[order_id for order_id, _, _ in batch], status=OPEN, delivery_crew__isnull=True)
+                .values_list("id", flat=True)
+            )
+            whens = [When(pk=order_id, then=Value(crew_id)) for order_id, crew_id, _ in batch if order_id in ids]
+            if whens:
+                Order.objects.filter(pk__in=ids).update(delivery_crew_id=Case(*whens))
+                orders_bulk_updated.send(
+                    sender=Order,
+                    before={pk: {"status": OPEN, "delivery_crew_id": None} for pk in ids},
+                    fields=("delivery_crew_id",),
+                )
+        return ids
+
+    def run(self):
+        started = time.perf_counter()
+
+        crew = self.load_crew()
+        crew_available = len(crew)
+        orders = self.load_orders()
+        open_orders = len(orders)
+        pairs = self.plan(orders, crew)
+
+        assigned, batches, waits = 0, 0, []
+        for i in range(0, len(pairs), self.batch_size):
+            batch = pairs[i:i + self.batch_size]
+            ids = self.commit(batch)
+            assigned += len(ids)
+            batches += 1
+            now = timezone.now()
+            waits.extend((now - date).total_seconds() for order_id, _, date in batch if order_id in ids)
+
+        elapsed = time.perf_counter() - started
+        stats = {
+            "open_orders": open_orders,
+            "crew_available": crew_available,
+            "assigned": assigned,
+            "skipped": len(pairs) - assigned,
+            "unassigned": open_orders - assigned,
+            "batches": batches,
+            "duration_ms": round(elapsed * 1000, 3),
+            "throughput_per_s": round(assigned / elapsed, 1) if elapsed else None,
+            # от оформления заказа до назначения курьера
+            "latency_s": {
+                "p50": round(percentile(waits, 50), 3),
+                "p95": round(percentile(waits, 95), 3),
+                "max": round(max(waits), 3) if waits else 0.0,
+            },
+        }
+        return stats
+
+
+def dispatch(**kwargs):
+    return Dispatcher(**kwargs).run()
@@ -0,0 +1,130 @@
+"""
+In-process order event broker behind the SSE stream (/api/orders/events).
+
+Order saves publish small events after commit into a ring buffer; every open
+stream waits on the broker instead of polling the database, and replays from
+the buffer when it reconnects with Last-Event-ID. Ids start from a millisecond
+timestamp, so after a restart they keep growing and an old Last-Event-ID is
+detected as "too old" (the client gets a ``reset`` event and refetches).
+
+The broker lives in one process: run the stream under a single ASGI worker,
+or put a shared bus in front of publish() when scaling out.
+"""
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.conf import settings
+
+CREATED = "order.created"
+STATUS = "order.status"
+ASSIGNED = "order.assigned"
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    type: str
+    data: dict
+    # кому видно: владелец заказа и курьеры (текущий + предыдущий при переназначении)
+    user_id: int
+    crew_ids: frozenset = field(default_factory=frozenset)
+
+
+class Broker:
+    def __init__(self, size=1000):
+        self._events = deque(maxlen=size)
+        start = int(time.time() * 1000)
+        self._ids = itertools.count(start)
+        self._last_id = start - 1
+        self.origin = start - 1  # всё, что новее, есть или было в буфере этого процесса
+        self._cond = threading.Condition()
+        self._waiters = set()  # (loop, asyncio.Event) асинхронных потоков
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def publish(self, type, data, user_id, crew_ids=()):
+        with self._cond:
+            event = Event(next(self._ids), type, data, user_id, frozenset(filter(None, crew_ids)))
+            self._events.append(event)
+            self._last_id = event.id
+            self._cond.notify_all()
+            waiters = list(self._waiters)
+        for loop, flag in waiters:
+            try:
+                loop.call_soon_threadsafe(flag.set)
+            except RuntimeError:  # цикл уже закрыт
+                pass
+        return event
+
+    def since(self, last_id):
+        """
+        -> (events after ``last_id``, False if some may be missing: evicted, or
+        published before this process started, e.g. a reconnect after a restart).
+        """
+        with self._cond:
+            events = list(self._events)
+        oldest = events[0].id if events else self.origin + 1
+        complete = last_id >= oldest - 1
+        if not events or last_id >= events[-1].id:
+            return [], complete
+        return [e for e in events if e.id > last_id], complete
+
+    def wait(self, last_id, timeout):
+        """Block the calling thread until an event newer than ``last_id`` (WSGI)."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._last_id > last_id, timeout)
+
+    async def await_new(self, last_id, timeout):
+        """Same as wait() without holding a thread (ASGI)."""
+        flag = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), flag)
+        with self._cond:
+            if self._last_id > last_id:
+                return True
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(flag.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._cond:
+                self._waiters.discard(waiter)
+
+    def clear(self):
+        with self._cond:
+            self._events.clear()
+
+
+broker = Broker(getattr(settings, "ORDER_EVENTS_BUFFER", 1000))
+
+
+def visible_to(user, roles):
+    """-> predicate(event) for what ``user`` may see (roles from get_roles())."""
+    from apps.accounts.roles import MANAGER, DELIVERY
+
+    if user.is_superuser or MANAGER in roles:
+        return lambda event: True
+    if DELIVERY in roles:
+        return lambda event: user.pk in event.crew_ids
+    return lambda event: event.user_id == user.pk
+
+
+def order_payload(order):
+    deferred = order.get_deferred_fields()
+    data = {"id": order.pk}
+    for name in ("status", "delivery_crew_id", "total", "date"):
+        if name not in deferred:
+            value = getattr(order, name)
+            data[name] = value.isoformat() if hasattr(value, "isoformat") else value
+    if "total" in data:
+        places = order._meta.get_field("total").decimal_places
+        data["total"] = str(Decimal(data["total"]).quantize(Decimal(10) ** -places))
+    return data
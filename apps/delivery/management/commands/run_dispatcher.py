@@ -0,0 +1,27 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.delivery.dispatch import Dispatcher
+
+
+class Command(BaseCommand):
+    help = "Assign open orders to the least loaded delivery crew (once, or every --interval seconds)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0, help="Seconds between runs (0 = run once)")
+        parser.add_argument("--batch-size", type=int, help="Orders per UPDATE (default: DISPATCH_BATCH_SIZE)")
+        parser.add_argument("--max-per-crew", type=int, help="Open orders cap per courier, 0 = no cap")
+        parser.add_argument("--limit", type=int, help="Orders considered per run")
+
+    def handle(self, *args, **opts):
+        dispatcher = Dispatcher(
+            batch_size=opts["batch_size"], max_per_crew=opts["max_per_crew"], limit=opts["limit"]
+        )
+        while True:
+            stats = dispatcher.run()
+            self.stdout.write(json.dumps(stats))
+            if not opts["interval"]:
+                return
+            time.sleep(opts["interval"])
@@ -0,0 +1,48 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from apps.orders.models import Order
+from apps.orders.signals import orders_bulk_updated
+from .events import broker, order_payload, CREATED, STATUS, ASSIGNED
+
+
+def publish_changes(order, before, created=False):
+    """Queue (on commit) the events for ``order`` compared with the ``before`` state."""
+    state = order.tracked_state()
+
+    events = []
+    if created:
+        events.append(CREATED)
+    else:
+        if "status" in before and before["status"] != state.get("status", before["status"]):
+            events.append(STATUS)
+        if "delivery_crew_id" in before and before["delivery_crew_id"] != state.get(
+            "delivery_crew_id", before["delivery_crew_id"]
+        ):
+            events.append(ASSIGNED)
+    if not events:
+        return
+
+    data = order_payload(order)
+    crew_ids = {state.get("delivery_crew_id"), before.get("delivery_crew_id")}
+    for kind in events:
+        payload = dict(data, previous_delivery_crew_id=before["delivery_crew_id"]) if kind == ASSIGNED else data
+        transaction.on_commit(partial(broker.publish, kind, payload, order.user_id, crew_ids))
+
+
+@receiver(post_save, sender=Order)
+def publish_order_events(sender, instance, created, **kwargs):
+    before = getattr(instance, "_loaded", {})  # Order.save() обновит его после всех приёмников
+    publish_changes(instance, before, created)
+
+
+@receiver(orders_bulk_updated, sender=Order)
+def publish_bulk_order_events(sender, before, **kwargs):
+    if not before:
+        return
+    fields = ("id", "user", "total", "date", "status", "delivery_crew")
+    for order in Order.objects.filter(pk__in=list(before)).only(*fields):
+        publish_changes(order, before[order.pk])
@@ -1,3 +1,195 @@
-from django.test import TestCase
+import io
+import json
 
-# Create your tests here.
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.accounts.roles import MANAGER, DELIVERY
+from apps.orders.models import Order
+from .dispatch import Dispatcher
+from .events import Broker, broker
+
+
+def parse(body):
+    """SSE body -> [(event, data)] of dispatched events."""
+    out = []
+    for block in body.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if "event" in fields:
+            out.append((fields["event"], json.loads(fields["data"])))
+    return out
+
+
+class BrokerTests(TestCase):
+    def test_replay_and_eviction(self):
+        b = Broker(size=3)
+        start = b.last_id
+        first = b.publish("x", {"n": 0}, user_id=1)
+        for n in range(1, 5):
+            b.publish("x", {"n": n}, user_id=1)
+        events, complete = b.since(b.last_id - 2)
+        self.assertTrue(complete)
+        self.assertEqual([e.data["n"] for e in events], [3, 4])
+        events, complete = b.since(first.id)
+        self.assertFalse(complete)
+        self.assertEqual(len(events), 3)
+        self.assertEqual(b.since(b.last_id), ([], True))
+        self.assertFalse(b.wait(b.last_id, timeout=0))
+        self.assertTrue(b.wait(start, timeout=0))
+
+    def test_reconnect_after_restart_is_incomplete(self):
+        restarted = Broker()  # пустой буфер, id от текущего времени
+        old_id = restarted.origin - 5000  # id, выданный до перезапуска
+        self.assertEqual(restarted.since(old_id), ([], False))
+        self.assertEqual(restarted.since(restarted.origin), ([], True))
+        event = restarted.publish("x", {}, user_id=1)
+        self.assertEqual(restarted.since(old_id), ([event], False))
+        self.assertEqual(restarted.since(restarted.origin), ([event], True))
+
+
+@override_settings(ORDER_EVENTS_STREAM_MAX=0)
+class OrderEventStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("boss")
+        cls.manager.groups.add(Group.objects.create(name=MANAGER))
+        cls.crew = User.objects.create_user("crew")
+        cls.crew.groups.add(Group.objects.create(name=DELIVERY))
+        cls.alice = User.objects.create_user("alice")
+        cls.bob = User.objects.create_user("bob")
+
+    def setUp(self):
+        cache.clear()
+        self.mark = broker.last_id
+
+    def stream(self, user, last_id=None):
+        c = APIClient()
+        c.force_authenticate(user)
+        headers = {"Last-Event-ID": str(self.mark if last_id is None else last_id)}
+        r = c.get("/api/orders/events", HTTP_ACCEPT="text/event-stream", headers=headers)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["Content-Type"], "text/event-stream")
+        body = b"".join(r.streaming_content)
+        return parse(body)
+
+    def test_events_are_scoped_by_role(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            mine = Order.objects.create(user=self.alice, total=5)
+            Order.objects.create(user=self.bob, total=7)
+        order = Order.objects.get(pk=mine.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.delivery_crew = self.crew
+            order.status = 1
+            order.save()
+            order.save()  # без изменений -> без событий
+
+        self.assertEqual(
+            [(kind, data["id"]) for kind, data in self.stream(self.alice)],
+            [("order.created", mine.pk), ("order.status", mine.pk), ("order.assigned", mine.pk)],
+        )
+        self.assertEqual(len(self.stream(self.manager)), 4)
+        crew_events = self.stream(self.crew)
+        self.assertEqual([kind for kind, _ in crew_events], ["order.status", "order.assigned"])
+        self.assertEqual(crew_events[-1][1]["delivery_crew_id"], self.crew.pk)
+
+    def test_resume_and_reset(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.create(user=self.alice, total=1)
+            Order.objects.create(user=self.alice, total=2)
+        self.assertEqual([d["total"] for _, d in self.stream(self.alice, self.mark + 1)], ["2.00"])
+        self.assertEqual(self.stream(self.alice, broker.last_id), [])
+        self.assertEqual(self.stream(self.alice, 1)[0][0], "reset")
+
+    def test_reconnect_after_restart_gets_one_reset(self):
+        from unittest import mock
+        from apps.delivery import views
+        restarted = Broker()
+        with mock.patch.object(views, "broker", restarted):
+            self.assertEqual(self.stream(self.alice, restarted.origin - 5000), [("reset", {})])
+            self.assertEqual(self.stream(self.alice, restarted.origin), [])
+
+    def test_token_in_query_string(self):
+        self.assertEqual(APIClient().get("/api/orders/events").status_code, 401)
+        token = AccessToken.for_user(self.alice)
+        r = APIClient().get(f"/api/orders/events?token={token}", HTTP_ACCEPT="text/event-stream")
+        self.assertEqual(r.status_code, 200)
+        b"".join(r.streaming_content)
+
+    async def test_asgi_stream_does_not_block(self):
+        token = AccessToken.for_user(self.alice)
+        r = await self.async_client.get(
+            f"/api/orders/events?token={token}", headers={"Accept": "text/event-stream"}
+        )
+        self.assertTrue(r.is_async)
+        body = b"".join([chunk async for chunk in r.streaming_content])
+        self.assertTrue(body.startswith(b"retry:"))
+
+
+class DispatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("boss")
+        cls.manager.groups.add(Group.objects.create(name=MANAGER))
+        crew = Group.objects.create(name=DELIVERY)
+        cls.busy, cls.idle = User.objects.create_user("busy"), User.objects.create_user("idle")
+        crew.user_set.add(cls.busy, cls.idle)
+        cls.customer = User.objects.create_user("cust")
+        Order.objects.bulk_create(Order(user=cls.customer, delivery_crew=cls.busy, total=1) for _ in range(2))
+
+    def setUp(self):
+        cache.clear()
+
+    def open_orders(self, n):
+        return Order.objects.bulk_create(Order(user=self.customer, total=1) for _ in range(n))
+
+    def load(self, crew):
+        return Order.objects.filter(delivery_crew=crew, status=0).count()
+
+    def test_balances_by_open_load(self):
+        self.open_orders(4)
+        stats = Dispatcher(max_per_crew=0).run()
+        self.assertEqual((stats["assigned"], stats["unassigned"]), (4, 0))
+        self.assertEqual((self.load(self.busy), self.load(self.idle)), (3, 3))
+
+    def test_cap_leaves_orders_for_next_run(self):
+        orders = self.open_orders(5)
+        stats = Dispatcher(max_per_crew=3).run()
+        self.assertEqual((stats["assigned"], stats["unassigned"]), (4, 1))
+        # старейшие назначены первыми
+        self.assertIsNone(Order.objects.get(pk=orders[-1].pk).delivery_crew_id)
+
+    def test_one_update_per_batch(self):
+        self.open_orders(30)
+        with self.assertNumQueries(2 + 3 * 4 + 4 * 2):  # crew, orders; per batch: lock, update, events + savepoints
+            stats = Dispatcher(batch_size=8, max_per_crew=0).run()
+        self.assertEqual((stats["assigned"], stats["batches"]), (30, 4))
+
+    def test_events_and_manual_assignment_win(self):
+        first, second = self.open_orders(2)
+        Order.objects.filter(pk=first.pk).update(delivery_crew=self.busy)
+        mark = broker.last_id
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = Dispatcher(max_per_crew=0).run()
+        self.assertEqual(stats["assigned"], 1)
+        events, _ = broker.since(mark)
+        self.assertEqual([(e.type, e.data["id"], e.data["delivery_crew_id"]) for e in events],
+                         [("order.assigned", second.pk, self.idle.pk)])
+
+    def test_endpoint_and_command(self):
+        self.open_orders(1)
+        c = APIClient()
+        c.force_authenticate(self.customer)
+        self.assertEqual(c.post("/api/delivery/dispatch").status_code, 403)
+        c.force_authenticate(self.manager)
+        r = c.post("/api/delivery/dispatch", {"max_per_crew": 0}, format="json")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()["assigned"], 1)
+
+        self.open_orders(1)
+        out = io.StringIO()
+        call_command("run_dispatcher", "--max-per-crew", "0", stdout=out)
+        self.assertEqual(json.loads(out.getvalue())["assigned"], 1)
@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import OrderEventsView, DispatchView
+
+urlpatterns = [
+    path("orders/events", OrderEventsView.as_view()),
+    path("delivery/dispatch", DispatchView.as_view()),
+]
@@ -1,3 +1,138 @@
-from django.shortcuts import render
+import json
+import time
 
-# Create your views here.
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework import permissions, serializers
+from rest_framework.response import Response
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.views import APIView
+
+from apps.accounts.authentication import ClaimsJWTAuthentication
+from apps.accounts.permissions import IsManager
+from apps.accounts.roles import get_roles
+from .dispatch import dispatch
+from .events import broker, visible_to
+
+
+class QueryTokenJWTAuthentication(ClaimsJWTAuthentication):
+    """Bearer header, or ?token=<access> — EventSource cannot send headers."""
+
+    def get_header(self, request):
+        header = super().get_header(request)
+        if header is None and request.GET.get("token"):
+            header = f"Bearer {request.GET['token']}".encode()
+        return header
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets DRF accept ``Accept: text/event-stream``; errors go out as an ``error`` event."""
+    media_type = "text/event-stream"
+    format = "event-stream"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return f"event: error\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def _frame(event):
+    return f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data)}\n\n"
+
+
+class OrderEventsView(APIView):
+    """
+    GET /api/orders/events   (text/event-stream)
+
+    Pushes order.created / order.status / order.assigned for the orders the
+    caller may see: managers all, delivery crew their assigned orders,
+    customers their own. Reconnects resume after Last-Event-ID (header or
+    ?last_event_id=); if those events already left the buffer a ``reset``
+    event tells the client to refetch /api/orders. Nothing touches the
+    database after the permission check.
+    """
+    authentication_classes = [QueryTokenJWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def get(self, request):
+        visible = visible_to(request.user, get_roles(request.user))
+        raw = request.headers.get("Last-Event-ID") or request.query_params.get("last_event_id")
+        try:
+            last_id = int(raw)
+        except (TypeError, ValueError):
+            last_id = broker.last_id
+
+        heartbeat = getattr(settings, "ORDER_EVENTS_HEARTBEAT", 15)
+        lifetime = getattr(settings, "ORDER_EVENTS_STREAM_MAX", 300)
+        # под ASGI поток отдаётся корутиной и не держит поток; под WSGI — обычный генератор
+        stream = _astream if isinstance(request._request, ASGIRequest) else _stream
+        response = StreamingHttpResponse(
+            stream(last_id, visible, heartbeat, lifetime), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+def _drain(last_id, visible):
+    events, complete = broker.since(last_id)
+    frames = [] if complete else ["event: reset\ndata: {}\n\n"]
+    frames += [_frame(e) for e in events if visible(e)]
+    if events and not visible(events[-1]):
+        # сдвигаем Last-Event-ID клиента и без видимых событий
+        frames.append(f"id: {events[-1].id}\n\n")
+    if events:
+        return events[-1].id, frames
+    # после reset клиент перечитывает всё — дальше ждём с начала буфера, а не шлём reset снова
+    return (last_id if complete else broker.origin), frames
+
+
+def _stream(last_id, visible, heartbeat, lifetime):
+    deadline = time.monotonic() + lifetime
+    yield "retry: 3000\n\n"
+    while True:
+        last_id, frames = _drain(last_id, visible)
+        yield from frames
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if not broker.wait(last_id, min(heartbeat, remaining)):
+            yield ": ping\n\n"
+
+
+async def _astream(last_id, visible, heartbeat, lifetime):
+    deadline = time.monotonic() + lifetime
+    yield "retry: 3000\n\n"
+    while True:
+        last_id, frames = _drain(last_id, visible)
+        for frame in frames:
+            yield frame
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if not await broker.await_new(last_id, min(heartbeat, remaining)):
+            yield ": ping\n\n"
+
+
+class DispatchSerializer(serializers.Serializer):
+    batch_size = serializers.IntegerField(min_value=1, max_value=5000, required=False)
+    max_per_crew = serializers.IntegerField(min_value=0, required=False)
+    limit = serializers.IntegerField(min_value=1, required=False)
+
+
+class DispatchView(APIView):
+    """
+    POST /api/delivery/dispatch   { "batch_size"?, "max_per_crew"?, "limit"? }
+      Manager: assign every unassigned open order to the least loaded courier
+      now (same engine as ``manage.py run_dispatcher``) -> run stats.
+    """
+    def get_permissions(self):
+        if self.request.user and self.request.user.is_superuser:
+            return [permissions.IsAuthenticated()]
+        return [permissions.IsAuthenticated(), IsManager()]
+
+    def post(self, request):
+        ser = DispatchSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        return Response(dispatch(**ser.validated_data))
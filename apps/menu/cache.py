@@ -0,0 +1,139 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+VERSION_KEY = "menu:version"
+HITS_KEY = "menu:stats:hits"
+MISSES_KEY = "menu:stats:misses"
+
+
+def _ttl():
+    return getattr(settings, "MENU_CACHE_TTL", 300)
+
+
+def _incr(key, delta=1):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # ключа нет (первый запуск / вытеснен) -> создаём
+        if cache.add(key, delta, None):
+            return delta
+        return cache.incr(key, delta)
+
+
+async def _aincr(key, delta=1):
+    try:
+        return await cache.aincr(key, delta)
+    except ValueError:
+        if await cache.aadd(key, delta, None):
+            return delta
+        return await cache.aincr(key, delta)
+
+
+def get_version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # стартуем с метки времени, чтобы после вытеснения версии
+        # старые ключи никогда не совпали с новыми
+        cache.add(VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def aget_version() -> int:
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, int(time.time() * 1000), None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """O(1) invalidation: every key embeds the version, old ones just expire."""
+    get_version()
+    return _incr(VERSION_KEY)
+
+
+def _digest(request) -> str:
+    query = sorted((k, v) for k, values in request.query_params.lists() for v in values)
+    raw = f"{request.get_host()}{request.path}?{query!r}"
+    return hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def key_for(request) -> str:
+    return f"menu:v{get_version()}:{_digest(request)}"
+
+
+def stats() -> dict:
+    hits = cache.get(HITS_KEY) or 0
+    misses = cache.get(MISSES_KEY) or 0
+    total = hits + misses
+    return {
+        "version": get_version(),
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else None,
+    }
+
+
+def reset_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
+
+
+def lookup(request):
+    """-> (key, cached data or None); counts the hit/miss."""
+    key = key_for(request)
+    data = cache.get(key)
+    _incr(HITS_KEY if data is not None else MISSES_KEY)
+    return key, data
+
+
+def store(key, data):
+    cache.set(key, data, _ttl())
+
+
+async def alookup(request):
+    key = f"menu:v{await aget_version()}:{_digest(request)}"
+    data = await cache.aget(key)
+    await _aincr(HITS_KEY if data is not None else MISSES_KEY)
+    return key, data
+
+
+async def astore(key, data):
+    await cache.aset(key, data, _ttl())
+
+
+class MenuCacheMixin:
+    """
+    Serves GET from the versioned menu cache. Permission checks and throttles
+    still run (they happen in initial()), only queryset + serializer are skipped.
+    """
+
+    def get(self, request, *args, **kwargs):
+        key, data = lookup(request)
+        if data is not None:
+            return Response(data, headers={"X-Cache": "HIT"})
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            store(key, response.data)
+        response["X-Cache"] = "MISS"
+        return response
+
+
+class AsyncMenuCacheMixin:
+    """MenuCacheMixin for the async read views (apps.common.async_views)."""
+
+    async def get(self, request, *args, **kwargs):
+        key, data = await alookup(request)
+        if data is not None:
+            return self.render(data, headers={"X-Cache": "HIT"})
+
+        response = await super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            await astore(key, self.rendered_data)
+        response["X-Cache"] = "MISS"
+        return response
@@ -0,0 +1,12 @@
+import django_filters
+
+from .models import MenuItem
+
+
+class MenuItemFilter(django_filters.FilterSet):
+    # по id без ModelChoiceFilter: валидация не ходит в БД (нужно async-чтению)
+    category = django_filters.NumberFilter(field_name="category_id")
+
+    class Meta:
+        model = MenuItem
+        fields = ["category", "featured", "price"]
@@ -0,0 +1,196 @@
+"""
+Resized variants of menu item photos.
+
+For every uploaded MenuItem.image a worker renders each size in
+MENU_IMAGE_VARIANTS as WebP and JPEG and stores them next to the upload:
+
+    menu/variants/<stem>.<variant>.<sha256[:12]>.<ext>
+
+Names are content-hashed, so files can be served with a far-future cache and
+re-rendering the same photo is a no-op. The result is kept in
+MenuItem.image_variants:
+
+    {"source": "menu/photo.png",
+     "thumb": {"width": 160, "height": 120, "webp": "menu/variants/...", "jpeg": "..."},
+     "card": {...}, "full": {...}}
+
+Uploads are processed after commit on a small thread pool, off the request
+thread; ``manage.py backfill_menu_images`` renders existing photos with a
+process pool. Once an item's variants are replaced, its image cleared or the
+item deleted, the old variant files are removed after commit unless another
+item still lists them.
+"""
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from .models import MenuItem
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VARIANTS = {"thumb": 160, "card": 480, "full": 1280}  # максимальная ширина, px
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+VARIANTS_DIR = "menu/variants"
+
+_executor = None
+
+
+def variant_sizes():
+    return getattr(settings, "MENU_IMAGE_VARIANTS", DEFAULT_VARIANTS)
+
+
+def _encode(image, fmt):
+    pil_format, options = FORMATS[fmt]
+    buf = io.BytesIO()
+    image.save(buf, pil_format, **options)
+    return buf.getvalue()
+
+
+def _flatten(image):
+    """-> RGB; transparent pixels go on white (JPEG has no alpha)."""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        flat = Image.new("RGB", rgba.size, "white")
+        flat.paste(rgba, mask=rgba.getchannel("A"))
+        return flat
+    return image.convert("RGB")
+
+
+def render_variants(name, storage=None):
+    """Render and store every variant of the stored image ``name`` -> variants dict."""
+    storage = storage or default_storage
+    with storage.open(name, "rb") as fh:
+        source = Image.open(fh)
+        source = ImageOps.exif_transpose(source)
+        source = _flatten(source)
+
+    stem = PurePosixPath(name).stem
+    variants = {"source": name}
+    for variant, max_width in variant_sizes().items():
+        image = source.copy()
+        image.thumbnail((max_width, max_width * 4), Image.Resampling.LANCZOS)  # не увеличиваем
+        entry = {"width": image.width, "height": image.height}
+        for fmt in FORMATS:
+            payload = _encode(image, fmt)
+            digest = hashlib.sha256(payload).hexdigest()[:12]
+            path = f"{VARIANTS_DIR}/{stem}.{variant}.{digest}.{fmt}"
+            if not storage.exists(path):
+                storage.save(path, ContentFile(payload))
+            entry[fmt] = path
+        variants[variant] = entry
+    return variants
+
+
+def matches(name, variants):
+    """Were ``variants`` rendered from the stored image ``name``?"""
+    return bool(name) and (variants or {}).get("source") == name
+
+
+def is_current(item):
+    return matches(item.image.name if item.image else None, item.image_variants)
+
+
+def variant_paths(variants):
+    return {
+        entry[fmt]
+        for variant, entry in (variants or {}).items() if variant != "source"
+        for fmt in FORMATS if fmt in entry
+    }
+
+
+def delete_variants(variants, storage=None):
+    """After commit, delete the files of ``variants`` that no item lists any more."""
+    source = (variants or {}).get("source")
+    paths = variant_paths(variants)
+    if not source or not paths:
+        return
+
+    def remove():
+        storage_ = storage or default_storage
+        # та же картинка у другого пункта -> те же файлы
+        for used in MenuItem.objects.filter(image_variants__source=source).values_list("image_variants", flat=True):
+            paths.difference_update(variant_paths(used))
+        for path in paths:
+            try:
+                storage_.delete(path)
+            except OSError:
+                logger.warning("Could not delete image variant %s", path, exc_info=True)
+
+    transaction.on_commit(remove)
+
+
+def generate_for(item_id):
+    """Render variants for one item and store them unless the image changed meanwhile."""
+    item = MenuItem.objects.filter(pk=item_id).only("id", "image", "image_variants").first()
+    if item is None or not item.image or is_current(item):
+        return False
+    variants = render_variants(item.image.name)
+    updated = MenuItem.objects.filter(pk=item_id, image=item.image.name).update(image_variants=variants)
+    if updated:
+        delete_variants(item.image_variants)  # варианты прежней картинки
+        variants_changed()
+    return bool(updated)
+
+
+def variants_changed():
+    """update() skips post_save: drop cached menu responses and the snapshot by hand."""
+    from . import cache as menu_cache
+    from . import snapshot
+
+    menu_cache.bump_version()
+    snapshot.schedule_rebuild()
+
+
+def _run(item_id):
+    try:
+        generate_for(item_id)
+    except Exception:
+        logger.exception("Image variants failed for menu item %s", item_id)
+    finally:
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "MENU_IMAGE_WORKERS", 2), thread_name_prefix="menu-images"
+        )
+    return _executor
+
+
+def schedule(item_id):
+    """After commit, render the item's variants (on the pool unless MENU_IMAGE_ASYNC is off)."""
+    if getattr(settings, "MENU_IMAGE_ASYNC", True):
+        transaction.on_commit(lambda: _get_executor().submit(_run, item_id))
+    else:
+        transaction.on_commit(lambda: generate_for(item_id))
+
+
+def srcset(variants, url=None):
+    """variants dict -> {"thumb": {...urls}, ..., "srcset": {"webp": "u 160w, ...", "jpeg": ...}}."""
+    if not variants:
+        return None
+    url = url or (lambda path: f"{settings.MEDIA_URL}{path}")
+    out, sets = {}, {fmt: [] for fmt in FORMATS}
+    for variant, entry in variants.items():
+        if variant == "source":
+            continue
+        out[variant] = {"width": entry["width"], "height": entry["height"]}
+        for fmt in FORMATS:
+            if fmt in entry:
+                out[variant][fmt] = url(entry[fmt])
+                sets[fmt].append(f"{out[variant][fmt]} {entry['width']}w")
+    out["srcset"] = {fmt: ", ".join(parts) for fmt, parts in sets.items() if parts}
+    return out
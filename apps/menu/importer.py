@@ -0,0 +1,169 @@
+"""
+Bulk menu import: many items from CSV or JSON in a few statements.
+
+    id?, title, price, featured?, category? (title), category_id?
+
+A row with ``id`` updates that item; otherwise it updates the item with the
+same title in the same category, or creates one. Categories named by title are
+matched on their slug and created if missing, all in one pass. Items are
+written with bulk_create / bulk_update in batches, in one transaction, and the
+caches are invalidated once at the end through ``menu_bulk_changed`` (the
+per-row post_save receivers do not run for bulk writes).
+
+Every row is validated before anything is written; an invalid file writes
+nothing and reports the errors by row number.
+"""
+import csv
+import io
+import json
+
+from django.db import transaction
+from django.utils.text import slugify
+from rest_framework import serializers
+
+from .models import Category, MenuItem
+from .signals import menu_bulk_changed
+
+BATCH_SIZE = 500
+FIELDS = ("title", "price", "featured", "category_id")
+
+
+class MenuImportError(Exception):
+    """The file could not be read or has invalid rows; ``errors`` says which."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+class ImportRowSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False, allow_null=True)
+    title = serializers.CharField(max_length=225)
+    price = serializers.DecimalField(max_digits=6, decimal_places=2, min_value=0)
+    featured = serializers.BooleanField(required=False)
+    category = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    category_id = serializers.IntegerField(required=False, allow_null=True)
+
+    def to_internal_value(self, data):
+        # пустые ячейки CSV = поле не задано
+        data = {key: value for key, value in data.items() if value not in ("", None)}
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        if attrs.get("category") and attrs.get("category_id"):
+            raise serializers.ValidationError("Pass either category or category_id")
+        if not attrs.get("id") and not attrs.get("category") and not attrs.get("category_id"):
+            raise serializers.ValidationError({"category": "Required for new items"})
+        return attrs
+
+
+def parse(data, fmt):
+    """``data`` (str/bytes) in ``fmt`` ("csv" or "json") -> list of row dicts."""
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig")
+    try:
+        if fmt == "csv":
+            return list(csv.DictReader(io.StringIO(data)))
+        rows = json.loads(data)
+    except (csv.Error, ValueError) as exc:
+        raise MenuImportError({"file": str(exc)})
+    if isinstance(rows, dict):
+        rows = rows.get("items")
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise MenuImportError({"file": 'Expected a list of items or {"items": [...]}'})
+    return rows
+
+
+def _validate(rows):
+    if not all(isinstance(row, dict) for row in rows):
+        raise MenuImportError({"file": "Every item must be an object"})
+    ser = ImportRowSerializer(data=rows, many=True)
+    if not ser.is_valid():
+        # номера строк с 1, как их видит человек
+        raise MenuImportError({"rows": {n: err for n, err in enumerate(ser.errors, 1) if err}})
+    return ser.validated_data
+
+
+def _resolve_categories(rows):
+    """Category title -> id for every row, creating the missing ones; -> number created."""
+    by_slug = {slugify(row["category"]): row["category"] for row in rows if row.get("category")}
+    ids = {row["category_id"] for row in rows if row.get("category_id")}
+
+    known = set(Category.objects.filter(pk__in=ids).values_list("id", flat=True))
+    if ids - known:
+        raise MenuImportError({"category_id": f"Unknown categories: {sorted(ids - known)}"})
+
+    slugs = dict(Category.objects.filter(slug__in=by_slug).values_list("slug", "id"))
+    missing = [Category(slug=slug, title=title) for slug, title in by_slug.items() if slug not in slugs]
+    for category in Category.objects.bulk_create(missing, batch_size=BATCH_SIZE):
+        slugs[category.slug] = category.id
+    for row in rows:
+        if row.get("category"):
+            row["category_id"] = slugs[slugify(row.pop("category"))]
+    return len(missing)
+
+
+def _chunks(values):
+    values = list(values)
+    for start in range(0, len(values), BATCH_SIZE):
+        yield values[start:start + BATCH_SIZE]
+
+
+def _existing(rows):
+    """Items the rows refer to, by id and by (category_id, title)."""
+    ids = {row["id"] for row in rows if row.get("id")}
+    titles = {row["title"] for row in rows if not row.get("id")}
+    by_id, by_title = {}, {}
+    # списками по BATCH_SIZE: у IN в SQLite есть предел числа параметров
+    lookups = [("pk__in", chunk) for chunk in _chunks(ids)] + [("title__in", chunk) for chunk in _chunks(titles)]
+    for lookup, chunk in lookups:
+        for item in MenuItem.objects.filter(**{lookup: chunk}).only(*FIELDS):
+            by_id[item.pk] = item
+            by_title.setdefault((item.category_id, item.title), item)
+    unknown = sorted(set(ids) - by_id.keys())
+    if unknown:
+        raise MenuImportError({"id": f"Unknown menu items: {unknown}"})
+    return by_id, by_title
+
+
+def import_menu(rows, dry_run=False):
+    """
+    Upsert ``rows`` (dicts as from ``parse``) -> {"created", "updated",
+    "unchanged", "categories_created"}. ``dry_run`` reports without writing.
+    """
+    rows = _validate(rows)
+    with transaction.atomic():
+        categories_created = _resolve_categories(rows)
+        by_id, by_title = _existing(rows)
+
+        created, updated, seen = [], {}, set()
+        for row in rows:
+            item = by_id.get(row["id"]) if row.get("id") else by_title.get((row["category_id"], row["title"]))
+            if item is None:
+                item = MenuItem(**{f: row[f] for f in FIELDS if f in row})
+                created.append(item)
+                # повтор строки в файле попадёт в этот же объект, а не создаст второй
+                by_title[(item.category_id, item.title)] = item
+                continue
+            for field in FIELDS:
+                if field in row and getattr(item, field) != row[field]:
+                    setattr(item, field, row[field])
+                    if item.pk is not None:
+                        updated[item.pk] = item
+            if item.pk is not None:
+                seen.add(item.pk)
+
+        report = {
+            "created": len(created),
+            "updated": len(updated),
+            "unchanged": len(seen - updated.keys()),
+            "categories_created": categories_created,
+        }
+        if dry_run:
+            transaction.set_rollback(True)
+            return report
+        MenuItem.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        MenuItem.objects.bulk_update(updated.values(), FIELDS, batch_size=BATCH_SIZE)
+        if created or updated or categories_created:
+            menu_bulk_changed.send(sender=MenuItem, ids=[item.pk for item in created] + list(updated))
+    return report
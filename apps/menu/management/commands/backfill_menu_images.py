@@ -0,0 +1,58 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from apps.menu import images
+from apps.menu.models import MenuItem
+
+
+def _init_worker():
+    # spawn (macOS/Windows) стартует чистый интерпретатор
+    if not apps.ready:
+        django.setup()
+
+
+def _render(item_id, name):
+    return item_id, name, images.render_variants(name)
+
+
+class Command(BaseCommand):
+    help = "Render resized WebP/JPEG variants for menu photos that do not have them yet (process pool)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count)")
+        parser.add_argument("--force", action="store_true", help="Re-render items that already have variants")
+
+    def handle(self, *args, **opts):
+        rows = MenuItem.objects.exclude(image="").exclude(image__isnull=True).values_list("id", "image", "image_variants")
+        todo = {
+            pk: (name, variants) for pk, name, variants in rows
+            if opts["force"] or (variants or {}).get("source") != name
+        }
+        if not todo:
+            self.stdout.write("Nothing to do")
+            return
+
+        if not connection.in_atomic_block:
+            connections.close_all()  # открытые соединения не должны уехать в fork
+        done, failed = 0, 0
+        with ProcessPoolExecutor(max_workers=opts["workers"], initializer=_init_worker) as pool:
+            futures = [pool.submit(_render, pk, name) for pk, (name, _) in todo.items()]
+            for future in as_completed(futures):
+                try:
+                    pk, name, variants = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"failed: {exc}")
+                    continue
+                # пока рендерили, картинку могли заменить — тогда её обработает сигнал
+                if MenuItem.objects.filter(pk=pk, image=name).update(image_variants=variants):
+                    done += 1
+                    images.delete_variants(todo[pk][1])
+
+        if done:
+            images.variants_changed()
+        self.stdout.write(self.style.SUCCESS(f"Variants rendered for {done} item(s), {failed} failed"))
@@ -0,0 +1,65 @@
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework import filters
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.common.bench import measure, scratch_database
+from apps.menu.models import Category, MenuItem
+from apps.menu.search import MenuSearchFilter, rebuild
+from apps.menu.views import MenuItemsView
+
+WORDS = (
+    "grilled fried roasted smoked spicy sweet lemon garlic herb olive tomato basil "
+    "chicken lamb beef salmon tuna shrimp octopus feta halloumi falafel hummus "
+    "salad soup pasta risotto pita wrap bowl tart cake sorbet baklava"
+).split()
+
+
+class Command(BaseCommand):
+    help = "Compare ?search= via the full-text index with the old icontains SearchFilter on a scratch database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+        parser.add_argument("--terms", nargs="+", default=["salmon", "gri", "lemon chicken", "zzz"])
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **opts):
+        rng = random.Random(42)
+        backends = [("icontains", filters.SearchFilter()), ("index", MenuSearchFilter())]
+        with scratch_database():
+            cats = [Category.objects.create(slug=f"c{i}", title=f"{WORDS[i]} dishes") for i in range(20)]
+            created = 0
+            self.stdout.write(
+                f"{'items':>7} {'term':<14} {'backend':<10} {'rows':>6} {'p50 ms':>9} {'p95 ms':>9} {'rps':>8}"
+            )
+            for size in sorted(opts["sizes"]):
+                while created < size:
+                    batch = min(5000, size - created)
+                    MenuItem.objects.bulk_create(
+                        MenuItem(
+                            title=" ".join(rng.sample(WORDS, 3)).title(),
+                            price=Decimal(rng.randint(300, 3000)) / 100,
+                            category=cats[rng.randrange(len(cats))],
+                        )
+                        for _ in range(batch)
+                    )
+                    created += batch
+                rebuild()  # bulk_create идёт мимо сигналов
+
+                for term in opts["terms"]:
+                    request = Request(APIRequestFactory().get("/api/menu-items", {"search": term}))
+                    view = MenuItemsView(request=request, format_kwarg=None)
+                    for name, backend in backends:
+                        def run():
+                            qs = backend.filter_queryset(request, MenuItem.objects.all(), view)
+                            run.rows = qs.count()
+                            list(qs[:10])
+
+                        r = measure(run, repeat=opts["repeat"])
+                        self.stdout.write(
+                            f"{size:>7} {term:<14} {name:<10} {run.rows:>6} "
+                            f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['rps']:>8}"
+                        )
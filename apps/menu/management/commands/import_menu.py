@@ -0,0 +1,35 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.menu.importer import MenuImportError, import_menu, parse
+
+
+class Command(BaseCommand):
+    help = "Create or update menu items from a CSV or JSON file in bulk (see apps/menu/importer.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help='CSV or JSON file, "-" for stdin')
+        parser.add_argument("--format", choices=["csv", "json"], help="Default: from the file extension")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would change, write nothing")
+
+    def handle(self, *args, path, **opts):
+        fmt = opts["format"] or Path(path).suffix.lstrip(".").lower()
+        if fmt not in ("csv", "json"):
+            raise CommandError("Cannot tell the format from the file name, pass --format")
+        try:
+            data = sys.stdin.read() if path == "-" else Path(path).read_bytes()
+        except OSError as exc:
+            raise CommandError(exc)
+
+        try:
+            report = import_menu(parse(data, fmt), dry_run=opts["dry_run"])
+        except MenuImportError as exc:
+            raise CommandError(f"Nothing imported: {exc.errors}")
+
+        prefix = "Would import" if opts["dry_run"] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}: {report['created']} created, {report['updated']} updated, "
+            f"{report['unchanged']} unchanged, {report['categories_created']} new categories"
+        ))
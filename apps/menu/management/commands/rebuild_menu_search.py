@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.menu.search import rebuild
+
+
+class Command(BaseCommand):
+    help = "Refill the menu full-text search index from the menu tables (after bulk writes)."
+
+    def handle(self, *args, **opts):
+        if rebuild():
+            self.stdout.write(self.style.SUCCESS("Menu search index rebuilt"))
+        else:
+            self.stdout.write(self.style.WARNING("No search index on this database (icontains search is used)"))
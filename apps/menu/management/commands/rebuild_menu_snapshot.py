@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.menu.snapshot import write_snapshot
+
+
+class Command(BaseCommand):
+    help = "Render the static menu snapshot from scratch (drops old snapshot files)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--root", help="Output directory (default: MENU_SNAPSHOT_ROOT)")
+
+    def handle(self, *args, **opts):
+        path = write_snapshot(root=opts["root"], clean=True)
+        self.stdout.write(self.style.SUCCESS(f"Menu snapshot written: {path}"))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['category', 'price'], name='menuitem_category_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['featured', 'price'], name='menuitem_featured_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['price'], name='menuitem_price_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+import sqlite3
+
+from django.db import migrations
+
+# DDL зафиксирован здесь, а не взят из apps.menu.search: миграция не должна меняться вместе с кодом
+FTS_TABLE = "menu_menuitem_fts"
+PG_TABLE = "menu_menuitem_search"
+
+SQLITE_CREATE = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    "title, category, prefix='2 3', tokenize='unicode61 remove_diacritics 2')",
+    f"INSERT INTO {FTS_TABLE} (rowid, title, category) "
+    "SELECT m.id, m.title, COALESCE(c.title, '') "
+    "FROM menu_menuitem m LEFT JOIN menu_category c ON c.id = m.category_id",
+]
+POSTGRES_CREATE = [
+    f"CREATE TABLE {PG_TABLE} ("
+    "menuitem_id bigint PRIMARY KEY REFERENCES menu_menuitem (id) ON DELETE CASCADE "
+    "DEFERRABLE INITIALLY DEFERRED, document tsvector NOT NULL)",
+    f"CREATE INDEX {PG_TABLE}_document_idx ON {PG_TABLE} USING GIN (document)",
+    f"INSERT INTO {PG_TABLE} (menuitem_id, document) "
+    "SELECT m.id, setweight(to_tsvector('simple', m.title), 'A') "
+    "|| setweight(to_tsvector('simple', COALESCE(c.title, '')), 'B') "
+    "FROM menu_menuitem m LEFT JOIN menu_category c ON c.id = m.category_id",
+]
+
+
+def _sqlite_has_fts5():
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE t USING fts5(a)")
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def _statements(connection):
+    if connection.vendor == "sqlite":
+        return (SQLITE_CREATE, FTS_TABLE) if _sqlite_has_fts5() else ([], None)
+    if connection.vendor == "postgresql":
+        return POSTGRES_CREATE, PG_TABLE
+    return [], None
+
+
+def create_index(apps, schema_editor):
+    for sql in _statements(schema_editor.connection)[0]:
+        schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    table = _statements(schema_editor.connection)[1]
+    if table:
+        schema_editor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_menuitem_menuitem_category_price_idx_and_more'),
+    ]
+
+    operations = [
+        # FTS5 (SQLite) / tsvector + GIN (PostgreSQL); other backends keep icontains
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -16,9 +16,16 @@ class MenuItem(models.Model):
     featured = models.BooleanField(default=False)
     category = models.ForeignKey(Category, on_delete=models.PROTECT, default=1)
     image = models.ImageField(upload_to="menu/", blank=True, null=True)
+    # resized WebP/JPEG copies of image, filled off-request (see images.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         ordering = ["id"]
+        indexes = [
+            models.Index(fields=["category", "price"], name="menuitem_category_price_idx"),
+            models.Index(fields=["featured", "price"], name="menuitem_featured_price_idx"),
+            models.Index(fields=["price"], name="menuitem_price_idx"),
+        ]
 
     def __str__(self):
         return self.title
\ No newline at end of file
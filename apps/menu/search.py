@@ -0,0 +1,162 @@
+"""
+Full-text index for menu items behind ?search=.
+
+    SQLite      FTS5 table menu_menuitem_fts(title, category), rowid = item id,
+                prefix indexes for 2/3 chars, ranked by bm25 (title x5)
+    PostgreSQL  menu_menuitem_search(menuitem_id, document tsvector) + GIN,
+                document = title (weight A) || category title (weight B),
+                ranked by ts_rank
+
+Each search word becomes a prefix term and all of them must match, so "gri
+fi" finds "Grilled Fish". The index is one row per item, written by the menu
+signals inside the same transaction as the change; ``rebuild()`` (or
+``manage.py rebuild_menu_search``) refills it after bulk writes. The tables
+are created by migration menu/0003. Databases without the index keep the plain
+icontains SearchFilter.
+"""
+import functools
+import re
+import sqlite3
+
+from django.db import connection
+from rest_framework import filters
+
+from .models import MenuItem, Category
+
+FTS_TABLE = "menu_menuitem_fts"
+PG_TABLE = "menu_menuitem_search"
+RANK = "search_rank"
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _table(conn=None):
+    conn = conn or connection
+    return {"sqlite": FTS_TABLE, "postgresql": PG_TABLE}.get(conn.vendor)
+
+
+@functools.cache
+def _sqlite_has_fts5():
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE t USING fts5(a)")
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def available(conn=None):
+    """Does this database have the index? Decided without a query, so it is
+    safe to call from the async read views."""
+    conn = conn or connection
+    if conn.vendor == "sqlite":
+        return _sqlite_has_fts5()
+    return conn.vendor == "postgresql"
+
+
+# ---- keeping it in sync -----------------------------------------------
+
+def _reindex(conn, where, params):
+    """Rewrite the index rows of the items matched by ``where`` (SQL on m/c)."""
+    qn = conn.ops.quote_name
+    items, cats = qn(MenuItem._meta.db_table), qn(Category._meta.db_table)
+    source = f"FROM {items} m LEFT JOIN {cats} c ON c.id = m.category_id WHERE {where}"
+    with conn.cursor() as cursor:
+        if conn.vendor == "sqlite":
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT m.id {source})", params)
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, category) SELECT m.id, m.title, COALESCE(c.title, '') {source}",
+                params,
+            )
+        else:
+            cursor.execute(
+                f"INSERT INTO {PG_TABLE} (menuitem_id, document) "
+                "SELECT m.id, setweight(to_tsvector('simple', m.title), 'A') "
+                f"|| setweight(to_tsvector('simple', COALESCE(c.title, '')), 'B') {source} "
+                "ON CONFLICT (menuitem_id) DO UPDATE SET document = EXCLUDED.document",
+                params,
+            )
+
+
+def index_items(ids, conn=None):
+    conn = conn or connection
+    ids = list(ids)
+    if ids and available(conn):
+        _reindex(conn, f"m.id IN ({', '.join(['%s'] * len(ids))})", ids)
+
+
+def index_category(category_id, conn=None):
+    conn = conn or connection
+    if available(conn):
+        _reindex(conn, "m.category_id = %s", [category_id])
+
+
+def remove_items(ids, conn=None):
+    conn = conn or connection
+    ids = list(ids)
+    if not ids or not available(conn):
+        return
+    marks = ", ".join(["%s"] * len(ids))
+    with conn.cursor() as cursor:
+        if conn.vendor == "sqlite":
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({marks})", ids)
+        else:
+            cursor.execute(f"DELETE FROM {PG_TABLE} WHERE menuitem_id IN ({marks})", ids)
+
+
+def rebuild(conn=None):
+    conn = conn or connection
+    if not available(conn):
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {_table(conn)}")
+    _reindex(conn, "1 = 1", [])
+    return True
+
+
+# ---- querying ---------------------------------------------------------
+
+def match_expression(terms, vendor):
+    words = [w for term in terms for w in _WORD.findall(term.lower())]
+    if not words:
+        return None
+    if vendor == "sqlite":
+        return " AND ".join(f'"{w}"*' for w in words)
+    return " & ".join(f"{w}:*" for w in words)
+
+
+def search(queryset, terms, conn=None):
+    """Narrow a MenuItem queryset to the items matching ``terms``, annotated with
+    ``search_rank`` (higher is better). Returns None when there is no usable term."""
+    conn = conn or connection
+    expr = match_expression(terms, conn.vendor)
+    if expr is None:
+        return None
+    items = conn.ops.quote_name(MenuItem._meta.db_table)
+    if conn.vendor == "sqlite":
+        return queryset.extra(
+            select={RANK: f"-bm25({FTS_TABLE}, 5.0, 1.0)"},
+            tables=[FTS_TABLE],
+            where=[f"{FTS_TABLE}.rowid = {items}.id", f"{FTS_TABLE} MATCH %s"],
+            params=[expr],
+        )
+    return queryset.extra(
+        select={RANK: f"ts_rank({PG_TABLE}.document, to_tsquery('simple', %s))"},
+        select_params=[expr],
+        tables=[PG_TABLE],
+        where=[f"{PG_TABLE}.menuitem_id = {items}.id", f"{PG_TABLE}.document @@ to_tsquery('simple', %s)"],
+        params=[expr],
+    )
+
+
+class MenuSearchFilter(filters.SearchFilter):
+    """?search= through the full-text index (best match first unless ?ordering=);
+    falls back to SearchFilter's icontains where there is no index."""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or queryset.model is not MenuItem or not available():
+            return super().filter_queryset(request, queryset, view)
+        found = search(queryset, terms)
+        if found is None:  # только знаки препинания — индексу нечего искать
+            return super().filter_queryset(request, queryset, view)
+        return found.order_by(f"-{RANK}", "id")
@@ -1,5 +1,7 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import MenuItem, Category
+from .images import is_current, srcset
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -8,14 +10,29 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'title']
 
 
+class ImageVariantsField(serializers.ReadOnlyField):
+    """image_variants -> absolute URLs per variant/format + ready-made srcset strings."""
+
+    def to_representation(self, item):
+        # варианты старой картинки не отдаём: пока новые не готовы — None
+        if not is_current(item):
+            return None
+        request = self.context.get("request")
+        url = None
+        if request is not None:
+            url = lambda path: request.build_absolute_uri(f"{settings.MEDIA_URL}{path}")
+        return srcset(item.image_variants, url)
+
+
 class MenuItemSerializer(serializers.ModelSerializer):
     category_id = serializers.IntegerField(write_only=True, required=False)
     category    = CategorySerializer(read_only=True)
     image       = serializers.ImageField(required=False, allow_null=True)
+    images      = ImageVariantsField(source="*")
 
     class Meta:
         model  = MenuItem
-        fields = ["id", "title", "price", "featured", "category", "category_id", "image"]
+        fields = ["id", "title", "price", "featured", "category", "category_id", "image", "images"]
 
     def _apply_category(self, validated):
         cid = (self.initial_data or {}).get("category_id")
@@ -0,0 +1,77 @@
+from django.db import connections, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from .models import MenuItem, Category
+from . import cache as menu_cache
+from . import images
+from . import search
+from . import snapshot
+
+# bulk_create / bulk_update пунктов меню не шлют post_save — отправитель шлёт
+# это один раз на всю пачку, внутри своей транзакции:
+#   menu_bulk_changed.send(sender=MenuItem, ids=[созданные и изменённые id])
+menu_bulk_changed = Signal()
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_menu_version(sender, **kwargs):
+    # сразу + после коммита: запрос между ними мог закэшировать старые данные
+    menu_cache.bump_version()
+    transaction.on_commit(menu_cache.bump_version)
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def rebuild_menu_snapshot(sender, using, **kwargs):
+    snapshot.schedule_rebuild(using)
+
+
+# индекс поиска пишется в той же транзакции, что и само изменение
+@receiver(post_save, sender=MenuItem)
+def index_menu_item(sender, instance, using, **kwargs):
+    search.index_items([instance.pk], conn=connections[using])
+
+
+@receiver(post_delete, sender=MenuItem)
+def unindex_menu_item(sender, instance, using, **kwargs):
+    search.remove_items([instance.pk], conn=connections[using])
+
+
+@receiver(post_save, sender=Category)
+def reindex_category(sender, instance, using, created, **kwargs):
+    if not created:
+        search.index_category(instance.pk, conn=connections[using])
+
+
+@receiver(post_save, sender=MenuItem)
+def render_image_variants(sender, instance, **kwargs):
+    if "image_variants" in instance.get_deferred_fields():
+        return
+    if instance.image and not images.is_current(instance):
+        images.schedule(instance.pk)
+    elif not instance.image and instance.image_variants:
+        MenuItem.objects.filter(pk=instance.pk).update(image_variants={})
+        images.delete_variants(instance.image_variants)
+        instance.image_variants = {}
+
+
+@receiver(post_delete, sender=MenuItem)
+def delete_image_variants(sender, instance, **kwargs):
+    images.delete_variants(instance.image_variants)
+
+
+@receiver(menu_bulk_changed)
+def menu_bulk_written(sender, ids, using="default", **kwargs):
+    # то же, что делают приёмники выше для одной строки — один раз на пачку
+    bump_menu_version(sender)
+    snapshot.schedule_rebuild(using)
+    conn = connections[using]
+    ids = list(ids)
+    for start in range(0, len(ids), 500):
+        search.index_items(ids[start:start + 500], conn=conn)
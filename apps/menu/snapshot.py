@@ -0,0 +1,117 @@
+"""
+Static menu snapshot: the whole menu grouped by category, rendered to
+compact JSON under MENU_SNAPSHOT_ROOT so a plain file server can serve it.
+
+    <root>/menu.<sha256[:16]>.json   immutable, content-addressed
+    <root>/menu.json                 same content, stable name (short cache)
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+
+from .images import matches, srcset
+from .models import Category, MenuItem
+
+logger = logging.getLogger(__name__)
+
+LATEST_NAME = "menu.json"
+KEEP_SNAPSHOTS = 5
+
+
+def snapshot_root() -> Path:
+    root = getattr(settings, "MENU_SNAPSHOT_ROOT", None)
+    return Path(root) if root else Path(settings.MEDIA_ROOT) / "snapshots"
+
+
+def build_snapshot() -> dict:
+    groups = {
+        c["id"]: {**c, "items": []}
+        for c in Category.objects.order_by("title", "id").values("id", "slug", "title")
+    }
+    rows = MenuItem.objects.order_by("id").values_list(
+        "id", "title", "price", "featured", "category_id", "image", "image_variants"
+    )
+    for pk, title, price, featured, category_id, image, variants in rows:
+        groups[category_id]["items"].append({
+            "id": pk,
+            "title": title,
+            "price": str(price),
+            "featured": featured,
+            "image": f"{settings.MEDIA_URL}{image}" if image else None,
+            "images": srcset(variants) if matches(image, variants) else None,
+        })
+    return {"categories": list(groups.values())}
+
+
+def render_snapshot() -> bytes:
+    data = build_snapshot()
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def _atomic_write(path: Path, payload: bytes):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".menu-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(payload)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _prune(root: Path, keep: Path):
+    old = sorted(
+        (p for p in root.glob("menu.*.json") if p != keep and p.name != LATEST_NAME),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    for p in old[KEEP_SNAPSHOTS - 1:]:
+        p.unlink(missing_ok=True)
+
+
+def write_snapshot(root=None, clean=False) -> Path:
+    """Render and publish the snapshot. Returns the content-hashed file path."""
+    root = Path(root) if root else snapshot_root()
+    root.mkdir(parents=True, exist_ok=True)
+    if clean:
+        for p in root.glob("menu.*.json"):
+            p.unlink(missing_ok=True)
+
+    payload = render_snapshot()
+    digest = hashlib.sha256(payload).hexdigest()[:16]
+    hashed = root / f"menu.{digest}.json"
+    if not hashed.exists():
+        _atomic_write(hashed, payload)
+    _atomic_write(root / LATEST_NAME, payload)
+    _prune(root, hashed)
+    return hashed
+
+
+def _rebuild_after_commit():
+    try:
+        write_snapshot()
+    except OSError:
+        logger.exception("menu snapshot write failed")
+
+
+def schedule_rebuild(using=None):
+    """Rebuild after the current transaction commits, once however many rows it
+    changed; unchanged content is not rewritten."""
+    if not getattr(settings, "MENU_SNAPSHOT_ENABLED", True):
+        return
+    conn = transaction.get_connection(using)
+    # уже ждёт коммита на тех же savepoint'ах (откатится только вместе с нашим) — второй не нужен
+    sids = set(conn.savepoint_ids)
+    if any(func is _rebuild_after_commit and ids == sids for ids, func, *_ in conn.run_on_commit):
+        return
+    transaction.on_commit(_rebuild_after_commit, using=using)
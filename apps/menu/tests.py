@@ -1,3 +1,474 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.accounts.roles import MANAGER
+from .models import Category, MenuItem
+from . import cache as menu_cache
+from . import search
+from .snapshot import write_snapshot
+
+
+class MenuCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cat = Category.objects.create(slug="main", title="Main")
+        cls.item = MenuItem.objects.create(title="Pizza", price=Decimal("12.50"), category=cls.cat)
+        cls.manager = User.objects.create_user("boss", password="pass")
+        cls.manager.groups.add(Group.objects.create(name=MANAGER))
+
+    def setUp(self):
+        cache.clear()
+        self.c = APIClient()
+
+    def test_second_get_is_served_from_cache(self):
+        r1 = self.c.get("/api/menu-items")
+        self.assertEqual(r1["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            r2 = self.c.get("/api/menu-items")
+        self.assertEqual(r2["X-Cache"], "HIT")
+        self.assertEqual(r1.json(), r2.json())
+
+    def test_query_string_is_part_of_key(self):
+        self.c.get("/api/menu-items?ordering=price&search=piz")
+        r = self.c.get("/api/menu-items?search=piz&ordering=price")
+        self.assertEqual(r["X-Cache"], "HIT")
+        r = self.c.get("/api/menu-items?search=pas")
+        self.assertEqual(r["X-Cache"], "MISS")
+        self.assertEqual(r.json()["count"], 0)
+
+    def test_save_bumps_version(self):
+        self.c.get(f"/api/menu-items/{self.item.id}")
+        version = menu_cache.get_version()
+        MenuItem.objects.filter(pk=self.item.pk).first().save()
+        self.assertGreater(menu_cache.get_version(), version)
+        self.item.title = "Calzone"
+        self.item.save()
+        r = self.c.get(f"/api/menu-items/{self.item.id}")
+        self.assertEqual(r["X-Cache"], "MISS")
+        self.assertEqual(r.json()["title"], "Calzone")
+
+    def test_stats_for_managers(self):
+        self.c.get("/api/menu-items")
+        self.c.get("/api/menu-items")
+        self.c.force_authenticate(self.manager)
+        data = self.c.get("/api/menu-cache/stats").json()
+        self.assertEqual((data["hits"], data["misses"]), (1, 1))
+        self.assertEqual(data["hit_ratio"], 0.5)
+
+
+class MenuSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cat = Category.objects.create(slug="main", title="Main")
+        MenuItem.objects.create(title="Pizza", price=Decimal("12.50"), category=cls.cat)
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+
+    def test_write_is_content_addressed(self):
+        path = write_snapshot(root=self.root)
+        payload = path.read_bytes()
+        self.assertEqual(path.name, f"menu.{hashlib.sha256(payload).hexdigest()[:16]}.json")
+        self.assertEqual((self.root / "menu.json").read_bytes(), payload)
+        data = json.loads(payload)
+        self.assertEqual(data["categories"][0]["title"], "Main")
+        self.assertEqual(data["categories"][0]["items"][0]["price"], "12.50")
+        # ничего не изменилось -> тот же файл
+        self.assertEqual(write_snapshot(root=self.root), path)
+
+    def test_menu_change_rewrites_snapshot_on_commit(self):
+        with override_settings(MENU_SNAPSHOT_ROOT=self.root):
+            with self.captureOnCommitCallbacks(execute=True):
+                MenuItem.objects.create(title="Pasta", price=Decimal("10.00"), category=self.cat)
+        data = json.loads((self.root / "menu.json").read_bytes())
+        self.assertEqual([i["title"] for i in data["categories"][0]["items"]], ["Pizza", "Pasta"])
+
+    def test_one_rebuild_per_transaction(self):
+        with override_settings(MENU_SNAPSHOT_ROOT=self.root), \
+                mock.patch("apps.menu.snapshot.write_snapshot") as write:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    for i in range(3):
+                        MenuItem.objects.create(title=f"Dish {i}", price=Decimal("5.00"), category=self.cat)
+                    self.cat.title = "Mains"
+                    self.cat.save()
+            self.assertEqual(write.call_count, 1)
+
+            # откат savepoint снимает колбэк — следующее изменение ставит его заново
+            write.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        MenuItem.objects.create(title="Gone", price=Decimal("1.00"), category=self.cat)
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+                MenuItem.objects.create(title="Kept", price=Decimal("1.00"), category=self.cat)
+            self.assertEqual(write.call_count, 1)
+
+    def test_rebuild_command(self):
+        (self.root / "menu.deadbeef.json").write_text("{}")
+        call_command("rebuild_menu_snapshot", root=str(self.root), stdout=io.StringIO())
+        names = sorted(p.name for p in self.root.iterdir())
+        self.assertEqual(len(names), 2)
+        self.assertNotIn("menu.deadbeef.json", names)
+
+
+class AsyncReadPathTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cat = Category.objects.create(slug="main", title="Main")
+        cls.other = Category.objects.create(slug="side", title="Side")
+        for i in range(3):
+            MenuItem.objects.create(title=f"Dish {i}", price=Decimal(i + 1), category=cls.cat)
+        MenuItem.objects.create(title="Fries", price=Decimal("3.00"), category=cls.other)
+        cls.manager = User.objects.create_user("boss", password="pass")
+        cls.manager.groups.add(Group.objects.create(name=MANAGER))
+
+    def setUp(self):
+        cache.clear()
+
+    def drf(self, view, path, **kwargs):
+        from rest_framework.test import APIRequestFactory
+        request = APIRequestFactory().get(path)
+        return view.as_view()(request, **kwargs).render()
+
+    async def test_same_json_as_drf_views(self):
+        from .views import MenuItemsView, MenuItemDetailView
+        item = await MenuItem.objects.afirst()
+        cases = [
+            (MenuItemsView, "/api/menu-items?ordering=-price&page_size=2&page=2", {}),
+            (MenuItemsView, f"/api/menu-items?category={self.cat.id}&fields=id,title", {}),
+            (MenuItemDetailView, f"/api/menu-items/{item.id}", {"pk": item.id}),
+        ]
+        for view, path, kwargs in cases:
+            with self.subTest(path=path):
+                expected = await sync_to_async(self.drf)(view, path, **kwargs)
+                await cache.aclear()
+                r = await self.async_client.get(path)
+                self.assertEqual(r.status_code, 200)
+                self.assertEqual(r["X-Cache"], "MISS")
+                self.assertEqual(r.json(), json.loads(expected.content))
+
+    async def test_categories_need_a_token(self):
+        r = await self.async_client.get("/api/categories")
+        self.assertEqual(r.status_code, 401)
+        self.assertIn("Bearer", r["WWW-Authenticate"])
+
+        token = str(AccessToken.for_user(self.manager))
+        r = await self.async_client.get("/api/categories", headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()["count"], 2)
+
+    async def test_bad_filter_and_missing_item(self):
+        r = await self.async_client.get("/api/menu-items?category=abc")
+        self.assertEqual(r.status_code, 400)
+        r = await self.async_client.get("/api/menu-items/999999")
+        self.assertEqual(r.status_code, 404)
+
+    async def test_locked_throttle_store_does_not_block_the_loop(self):
+        fd, path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.05)
+                ticks += 1
+
+        with override_settings(THROTTLE_STORE=path):
+            await self.async_client.get("/api/menu-items")  # создаёт таблицу корзин
+            other = sqlite3.connect(path, isolation_level=None)  # другой воркер держит запись
+            other.execute("BEGIN IMMEDIATE")
+            try:
+                task = asyncio.ensure_future(ticker())
+                with self.assertLogs("apps.common.throttling", "WARNING"):
+                    r = await self.async_client.get("/api/menu-items")
+                task.cancel()
+            finally:
+                other.execute("ROLLBACK")
+                other.close()
+        # хранилище недоступно -> запрос пропущен, а цикл всё это время работал
+        self.assertEqual(r.status_code, 200)
+        self.assertGreater(ticks, 5)
+
+    def test_writes_still_go_through_drf(self):
+        c = APIClient()
+        c.force_authenticate(self.manager)
+        r = c.post("/api/menu-items", {"title": "Soup", "price": "4.00", "category_id": self.cat.id})
+        self.assertEqual(r.status_code, 201, r.content)
+        r = c.delete(f"/api/menu-items/{r.json()['id']}")
+        self.assertEqual(r.status_code, 204)
+        self.assertEqual(APIClient().post("/api/menu-items", {}).status_code, 401)
+
+
+@skipUnless(search.available(), "no full-text index on this database")
+class MenuSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mains = Category.objects.create(slug="mains", title="Mains")
+        cls.fish = Category.objects.create(slug="fish", title="Fish dishes")
+        cls.grilled = MenuItem.objects.create(title="Grilled Fish", price=Decimal("14.00"), category=cls.mains)
+        cls.soup = MenuItem.objects.create(title="Lemon Soup", price=Decimal("6.00"), category=cls.fish)
+        cls.salad = MenuItem.objects.create(title="Greek Salad", price=Decimal("8.00"), category=cls.mains)
+
+    def setUp(self):
+        cache.clear()
+        self.c = APIClient()
+
+    def titles(self, query):
+        r = self.c.get("/api/menu-items", {"search": query})
+        self.assertEqual(r.status_code, 200)
+        return [i["title"] for i in r.json()["results"]]
+
+    def test_prefix_words_and_ranking(self):
+        self.assertEqual(self.titles("gri fi"), ["Grilled Fish"])
+        self.assertEqual(self.titles("GRE"), ["Greek Salad"])
+        # совпадение в названии выше совпадения только в категории
+        self.assertEqual(self.titles("fish"), ["Grilled Fish", "Lemon Soup"])
+        self.assertEqual(self.titles("nothing"), [])
+        r = self.c.get("/api/menu-items", {"search": "fish", "ordering": "price"})
+        self.assertEqual([i["title"] for i in r.json()["results"]], ["Lemon Soup", "Grilled Fish"])
+
+    def test_index_follows_writes(self):
+        self.soup.title = "Lentil Soup"
+        self.soup.save()
+        self.assertEqual(self.titles("lent"), ["Lentil Soup"])
+        self.assertEqual(self.titles("lemon"), [])
+
+        self.mains.title = "Grill"
+        self.mains.save()
+        self.assertEqual(self.titles("grill"), ["Grilled Fish", "Greek Salad"])
+
+        self.salad.delete()
+        self.assertEqual(self.titles("greek"), [])
+
+    def test_rebuild_after_bulk_create(self):
+        MenuItem.objects.bulk_create([MenuItem(title="Baklava", price=Decimal("5.00"), category=self.mains)])
+        self.assertEqual(self.titles("bakl"), [])
+        call_command("rebuild_menu_search", stdout=io.StringIO())
+        cache.clear()
+        self.assertEqual(self.titles("bakl"), ["Baklava"])
+
+
+def png(width, height, color=(200, 40, 40, 255)):
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new("RGBA", (width, height), color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+@override_settings(MENU_IMAGE_ASYNC=False, MENU_SNAPSHOT_ENABLED=False)
+class MenuImageVariantTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cat = Category.objects.create(slug="main", title="Main")
+        cls.manager = User.objects.create_user("boss", password="pass")
+        cls.manager.groups.add(Group.objects.create(name=MANAGER))
+
+    def setUp(self):
+        cache.clear()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.media = Path(tmp.name)
+        media = override_settings(MEDIA_ROOT=tmp.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def upload(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        c = APIClient()
+        c.force_authenticate(self.manager)
+        photo = SimpleUploadedFile("pizza.png", png(2000, 1000), content_type="image/png")
+        with self.captureOnCommitCallbacks(execute=True):
+            r = c.post("/api/menu-items", {
+                "title": "Pizza", "price": "9.00", "category_id": self.cat.id, "image": photo,
+            }, format="multipart")
+        self.assertEqual(r.status_code, 201, r.content)
+        return MenuItem.objects.get(pk=r.json()["id"])
+
+    def test_upload_renders_variants(self):
+        item = self.upload()
+        variants = item.image_variants
+        self.assertEqual(variants["source"], item.image.name)
+        self.assertEqual((variants["thumb"]["width"], variants["thumb"]["height"]), (160, 80))
+        self.assertEqual(variants["full"]["width"], 1280)
+        for name in ("thumb", "card", "full"):
+            for fmt in ("webp", "jpeg"):
+                path = self.media / variants[name][fmt]
+                self.assertTrue(path.exists(), path)
+                self.assertRegex(path.name, rf"^pizza\w*\.{name}\.[0-9a-f]{{12}}\.{fmt}$")
+        self.assertLess((self.media / variants["thumb"]["webp"]).stat().st_size, item.image.size)
+
+        data = APIClient().get(f"/api/menu-items/{item.id}").json()
+        self.assertTrue(data["images"]["thumb"]["webp"].startswith("http://testserver/media/menu/variants/"))
+        self.assertEqual(len(data["images"]["srcset"]["jpeg"].split(", ")), 3)
+        self.assertTrue(data["images"]["srcset"]["webp"].endswith(" 1280w"))
+
+    def test_replaced_and_deleted_images_leave_no_variant_files(self):
+        from .images import variant_paths
+        item = self.upload()
+        old = variant_paths(item.image_variants)
+        c = APIClient()
+        c.force_authenticate(self.manager)
+        photo = SimpleUploadedFile("pasta.png", png(800, 600, (40, 200, 40, 255)), content_type="image/png")
+        with self.captureOnCommitCallbacks(execute=True):
+            r = c.patch(f"/api/menu-items/{item.id}", {"image": photo}, format="multipart")
+        self.assertEqual(r.status_code, 200, r.content)
+        new = variant_paths(MenuItem.objects.get(pk=item.pk).image_variants)
+        self.assertTrue(new and not new & old)
+        self.assertFalse(any((self.media / path).exists() for path in old))
+        self.assertTrue(all((self.media / path).exists() for path in new))
+
+        item = MenuItem.objects.get(pk=item.pk)
+        [twin] = MenuItem.objects.bulk_create([MenuItem(
+            title="Twin", price=1, category=self.cat, image=item.image.name, image_variants=item.image_variants,
+        )])
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        self.assertTrue(all((self.media / path).exists() for path in new))  # ещё нужны близнецу
+        with self.captureOnCommitCallbacks(execute=True):
+            twin.delete()
+        self.assertFalse(any((self.media / path).exists() for path in new))
+
+    def test_resave_does_not_rerender_and_clear_drops_variants(self):
+        item = self.upload()
+        with mock.patch("apps.menu.images.render_variants") as render:
+            with self.captureOnCommitCallbacks(execute=True):
+                item.title = "Margherita"
+                item.save()
+        render.assert_not_called()
+        item.image = None
+        item.save()
+        self.assertEqual(MenuItem.objects.get(pk=item.pk).image_variants, {})
+
+    def test_stale_variants_are_not_served(self):
+        item = self.upload()
+        # картинку заменили, а варианты ещё от старой (рендер не успел или упал)
+        MenuItem.objects.filter(pk=item.pk).update(image="menu/replaced.png")
+        self.assertIsNone(APIClient().get(f"/api/menu-items/{item.id}").json()["images"])
+        from .snapshot import build_snapshot
+        [entry] = build_snapshot()["categories"][0]["items"]
+        self.assertEqual(entry["image"], "/media/menu/replaced.png")
+        self.assertIsNone(entry["images"])
+
+    def test_backfill_command(self):
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        name = default_storage.save("menu/old.png", ContentFile(png(600, 600)))
+        MenuItem.objects.bulk_create([MenuItem(title="Old", price=1, category=self.cat, image=name)])
+        out = io.StringIO()
+        call_command("backfill_menu_images", "--workers", "1", stdout=out)
+        self.assertIn("for 1 item(s)", out.getvalue())
+        variants = MenuItem.objects.get(title="Old").image_variants
+        self.assertEqual(variants["card"]["width"], 480)
+        self.assertEqual(variants["full"]["width"], 600)  # не увеличиваем
+
+
+@override_settings(MENU_SNAPSHOT_ENABLED=False)
+class MenuImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("boss")
+        cls.manager.groups.add(Group.objects.create(name=MANAGER))
+        cls.mains = Category.objects.create(slug="mains", title="Mains")
+        cls.soup = MenuItem.objects.create(title="Lemon Soup", price=Decimal("6.00"), category=cls.mains)
+        cls.salad = MenuItem.objects.create(title="Greek Salad", price=Decimal("8.00"), category=cls.mains)
+
+    def setUp(self):
+        cache.clear()
+        self.c = APIClient()
+        self.c.force_authenticate(self.manager)
+
+    def post(self, payload, query=""):
+        return self.c.post(f"/api/menu-items/import{query}", payload, format="json")
+
+    def test_upserts_and_reports(self):
+        rows = [
+            {"id": self.soup.id, "title": "Lemon Soup", "price": "6.50"},
+            {"title": "Greek Salad", "price": "8.00", "category": "Mains"},
+            {"title": "Baklava", "price": "5.00", "category": "Desserts", "featured": True},
+        ] + [{"title": f"Tea {i}", "price": "2.00", "category": "Drinks"} for i in range(20)]
+        version = menu_cache.get_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            r = self.post(rows)
+        self.assertEqual(r.status_code, 200, r.content)
+        self.assertEqual(r.json(), {"created": 21, "updated": 1, "unchanged": 1, "categories_created": 2})
+        self.assertGreater(menu_cache.get_version(), version)
+
+        self.assertEqual(MenuItem.objects.get(pk=self.soup.pk).price, Decimal("6.50"))
+        baklava = MenuItem.objects.get(title="Baklava")
+        self.assertTrue(baklava.featured)
+        self.assertEqual(baklava.category.slug, "desserts")
+        self.assertEqual(MenuItem.objects.filter(category__title="Drinks").count(), 20)
+        if search.available():
+            r = self.c.get("/api/menu-items", {"search": "bakl"})
+            self.assertEqual([i["title"] for i in r.json()["results"]], ["Baklava"])
+
+        # повторный импорт того же файла ничего не меняет
+        self.assertEqual(self.post(rows).json(), {"created": 0, "updated": 0, "unchanged": 23, "categories_created": 0})
+
+    def test_query_count_does_not_depend_on_size(self):
+        def count(n, prefix):
+            rows = [{"title": f"{prefix} {i}", "price": "3.00", "category_id": self.mains.id} for i in range(n)]
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.post(rows).status_code, 200)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(count(2, "Small"), count(200, "Large"))
+
+    def test_invalid_rows_write_nothing(self):
+        r = self.post([
+            {"title": "Ok", "price": "1.00", "category": "New"},
+            {"title": "No price", "category": "New"},
+            {"title": "No category", "price": "1.00"},
+        ])
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(set(r.json()["rows"]), {"2", "3"})
+        self.assertEqual(self.post([{"id": 999999, "title": "x", "price": "1.00"}]).status_code, 400)
+        self.assertEqual(self.post([{"title": "x", "price": "1.00", "category_id": 999999}]).status_code, 400)
+        self.assertEqual(MenuItem.objects.count(), 2)
+        self.assertFalse(Category.objects.filter(slug="new").exists())
+
+    def test_csv_upload_dry_run_and_command(self):
+        body = f"id,title,price,featured,category\n{self.salad.id},Greek Salad,9.00,,\n,Pita,3.00,1,Sides\n"
+        upload = SimpleUploadedFile("menu.csv", body.encode(), content_type="text/csv")
+        r = self.c.post("/api/menu-items/import?dry_run=1", {"file": upload}, format="multipart")
+        self.assertEqual(r.json(), {"created": 1, "updated": 1, "unchanged": 0, "categories_created": 1})
+        self.assertFalse(MenuItem.objects.filter(title="Pita").exists())
+
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as f:
+            f.write(body)
+            f.flush()
+            out = io.StringIO()
+            call_command("import_menu", f.name, stdout=out)
+        self.assertIn("1 created, 1 updated, 0 unchanged, 1 new categories", out.getvalue())
+        self.assertEqual(MenuItem.objects.get(pk=self.salad.pk).price, Decimal("9.00"))
+        self.assertTrue(MenuItem.objects.get(title="Pita").featured)
+
+    def test_managers_only(self):
+        self.c.force_authenticate(User.objects.create_user("cust"))
+        self.assertEqual(self.post([]).status_code, 403)
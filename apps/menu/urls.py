@@ -1,12 +1,14 @@
 # LittleLemonAPI/urls.py
 from django.urls import path
 from .views import (
-    CategoriesView, MenuItemsView,
-    MenuItemDetailView
+    AsyncCategoriesView, AsyncMenuItemsView,
+    AsyncMenuItemDetailView, MenuCacheStatsView, MenuImportView
 )
 
 urlpatterns = [
-    path("categories", CategoriesView.as_view()),          # ← /api/categories
-    path("menu-items", MenuItemsView.as_view()),
-    path("menu-items/<int:pk>", MenuItemDetailView.as_view()),
+    path("categories", AsyncCategoriesView.as_view()),          # ← /api/categories
+    path("menu-items", AsyncMenuItemsView.as_view()),
+    path("menu-items/<int:pk>", AsyncMenuItemDetailView.as_view()),
+    path("menu-items/import", MenuImportView.as_view()),
+    path("menu-cache/stats", MenuCacheStatsView.as_view()),
 ]
@@ -1,17 +1,29 @@
 from rest_framework import permissions, generics, filters
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 
 from .models import MenuItem, Category
 from .serializers import  MenuItemSerializer, CategorySerializer
+from .cache import MenuCacheMixin, AsyncMenuCacheMixin
+from .filters import MenuItemFilter
+from .search import MenuSearchFilter
+from .importer import MenuImportError, import_menu, parse
+from . import cache as menu_cache
 
 from apps.accounts.permissions import IsManager
+from apps.common.async_views import AsyncListView, AsyncRetrieveView
+from apps.common.sparse import SparseFieldsMixin
 
 # Create your views here.
-class CategoriesView(generics.ListCreateAPIView):
+class CategoriesView(MenuCacheMixin, SparseFieldsMixin, generics.ListCreateAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
+    def get_queryset(self):
+        return self.sparse_queryset(super().get_queryset())
+
     def get_permissions(self):
         if self.request.method in ["GET", "HEAD", "OPTIONS"]:
             return [permissions.IsAuthenticated()]
@@ -19,16 +31,19 @@ class CategoriesView(generics.ListCreateAPIView):
             return [permissions.IsAuthenticated()]
         return [permissions.IsAuthenticated(), IsManager()]
 
-class MenuItemsView(generics.ListCreateAPIView):
+class MenuItemsView(MenuCacheMixin, SparseFieldsMixin, generics.ListCreateAPIView):
     queryset = MenuItem.objects.all()
     serializer_class = MenuItemSerializer
     parser_classes = (MultiPartParser, FormParser, )
 
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ["category", "featured", "price"]  # category = id
+    filter_backends = [DjangoFilterBackend, MenuSearchFilter, filters.OrderingFilter]
+    filterset_class = MenuItemFilter  # category = id
     search_fields   = ["title", "category__title"]
     ordering_fields = ["price", "title", "id"]
 
+    def get_queryset(self):
+        return self.sparse_queryset(super().get_queryset())
+
     def get_permissions(self):
         if self.request.method in ("GET", "HEAD", "OPTIONS"):
             return [permissions.AllowAny()]
@@ -36,13 +51,71 @@ class MenuItemsView(generics.ListCreateAPIView):
             return [permissions.IsAuthenticated()]
         return [permissions.IsAuthenticated(), IsManager()]
     
-class MenuItemDetailView(generics.RetrieveUpdateDestroyAPIView):
+class MenuItemDetailView(MenuCacheMixin, SparseFieldsMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = MenuItem.objects.select_related("category").all()
     serializer_class = MenuItemSerializer
 
+    def get_queryset(self):
+        return self.sparse_queryset(super().get_queryset())
+
     def get_permissions(self):
         if self.request.method in ("GET", "HEAD", "OPTIONS"):
             return [permissions.AllowAny()]
         if self.request.user and self.request.user.is_superuser:
             return [permissions.IsAuthenticated()]
-        return [permissions.IsAuthenticated(), IsManager()]
\ No newline at end of file
+        return [permissions.IsAuthenticated(), IsManager()]
+
+
+# Async GET path for ASGI; POST/PUT/PATCH/DELETE go to the DRF views above.
+class AsyncCategoriesView(AsyncMenuCacheMixin, AsyncListView):
+    drf_view = CategoriesView
+
+class AsyncMenuItemsView(AsyncMenuCacheMixin, AsyncListView):
+    drf_view = MenuItemsView
+
+class AsyncMenuItemDetailView(AsyncMenuCacheMixin, AsyncRetrieveView):
+    drf_view = MenuItemDetailView
+
+class MenuCacheStatsView(APIView):
+    """
+    GET /api/menu-cache/stats  -> { version, hits, misses, hit_ratio }
+    """
+    def get_permissions(self):
+        if self.request.user and self.request.user.is_superuser:
+            return [permissions.IsAuthenticated()]
+        return [permissions.IsAuthenticated(), IsManager()]
+
+    def get(self, request):
+        return Response(menu_cache.stats())
+
+
+class MenuImportView(APIView):
+    """
+    POST /api/menu-items/import[?dry_run=1]   (Manager)
+      JSON body: [{ "id"?, "title", "price", "featured"?, "category"? | "category_id"? }, ...]
+      or multipart "file": .csv / .json with the same columns
+      -> { created, updated, unchanged, categories_created }; 400 { rows: {n: errors} } writes nothing
+    """
+    parser_classes = (JSONParser, MultiPartParser, FormParser)
+
+    def get_permissions(self):
+        if self.request.user and self.request.user.is_superuser:
+            return [permissions.IsAuthenticated()]
+        return [permissions.IsAuthenticated(), IsManager()]
+
+    def post(self, request):
+        dry_run = request.query_params.get("dry_run") in ("1", "true")
+        upload = request.FILES.get("file")
+        try:
+            if upload is not None:
+                fmt = upload.name.rsplit(".", 1)[-1].lower()
+                if fmt not in ("csv", "json"):
+                    return Response({"file": "Expected a .csv or .json file"}, status=400)
+                rows = parse(upload.read(), fmt)
+            else:
+                rows = request.data if isinstance(request.data, list) else request.data.get("items")
+                if not isinstance(rows, list):
+                    return Response({"detail": 'Expected a list of items, {"items": [...]} or a file'}, status=400)
+            return Response(import_menu(rows, dry_run=dry_run))
+        except MenuImportError as exc:
+            return Response(exc.errors, status=400)
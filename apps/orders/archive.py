@@ -0,0 +1,101 @@
+"""
+Hot/cold storage for orders.
+
+Almost every read is about recent or undelivered orders, so delivered orders
+older than ORDER_ARCHIVE_AFTER_DAYS move to ArchivedOrder / ArchivedOrderItem
+(same ids, same columns + archived_at), keeping Order/OrderItem and their
+indexes small. Each batch is its own short transaction:
+
+    SELECT id FROM order WHERE status = 1 AND date < cutoff ORDER BY id LIMIT n  FOR UPDATE SKIP LOCKED
+    INSERT INTO archive order / item  SELECT ... WHERE id IN (batch)
+    DELETE FROM item / order  WHERE id IN (batch)
+
+The DELETEs are plain SQL on purpose: the order has not gone away, so the
+per-order pre_delete receivers (sales rollups, see apps/analytics) must not
+subtract it. rollups.rebuild() reads both tables. Archived orders are served
+read-only by GET /api/orders?archived=1 and /api/orders/<id>?archived=1.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
+
+DELIVERED = 1
+
+
+def cutoff(days=None):
+    days = settings.ORDER_ARCHIVE_AFTER_DAYS if days is None else days
+    return timezone.now() - timedelta(days=days)
+
+
+def candidates(before):
+    return Order.objects.filter(status=DELIVERED, date__lt=before)
+
+
+def _copy(cursor, source, target, key, ids, **extra):
+    """INSERT INTO target SELECT source's columns (+ ``extra`` constants) WHERE key IN ids."""
+    qn = connection.ops.quote_name
+    columns = [qn(f.column) for f in source._meta.concrete_fields]
+    target_columns = ", ".join(columns + [qn(name) for name in extra])
+    values = ", ".join(columns + ["%s"] * len(extra))
+    cursor.execute(
+        f"INSERT INTO {qn(target._meta.db_table)} ({target_columns}) "
+        f"SELECT {values} FROM {qn(source._meta.db_table)} WHERE {qn(key)} IN ({', '.join(['%s'] * len(ids))})",
+        [*extra.values(), *ids],
+    )
+    return cursor.rowcount
+
+
+def _delete(cursor, model, key, ids):
+    qn = connection.ops.quote_name
+    marks = ", ".join(["%s"] * len(ids))
+    cursor.execute(f"DELETE FROM {qn(model._meta.db_table)} WHERE {qn(key)} IN ({marks})", ids)
+
+
+def archive_batch(before, batch_size):
+    """Move up to ``batch_size`` orders delivered before ``before`` -> (orders, items) moved."""
+    with transaction.atomic():
+        ids = candidates(before).order_by("id")
+        if connection.features.has_select_for_update_skip_locked:
+            # строки, которые сейчас кто-то меняет, подождут следующего прогона
+            ids = ids.select_for_update(skip_locked=True)
+        ids = list(ids.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return 0, 0
+        archived_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        item_column = OrderItem._meta.get_field("order").column
+        with connection.cursor() as cursor:
+            _copy(cursor, Order, ArchivedOrder, "id", ids, archived_at=archived_at)
+            items = _copy(cursor, OrderItem, ArchivedOrderItem, item_column, ids)
+            _delete(cursor, OrderItem, item_column, ids)
+            _delete(cursor, Order, "id", ids)
+    return len(ids), items
+
+
+def archive_orders(days=None, batch_size=None, pause=0.0, max_batches=None, progress=None):
+    """
+    Archive every delivered order older than ``days`` in batches of
+    ``batch_size``; ``pause`` seconds between batches let other writers in.
+    Returns {"orders", "items", "batches"}.
+    """
+    before = cutoff(days)
+    batch_size = batch_size or settings.ORDER_ARCHIVE_BATCH_SIZE
+    totals = {"orders": 0, "items": 0, "batches": 0}
+    while max_batches is None or totals["batches"] < max_batches:
+        orders, items = archive_batch(before, batch_size)
+        if not orders:
+            break
+        totals["orders"] += orders
+        totals["items"] += items
+        totals["batches"] += 1
+        if progress:
+            progress(totals)
+        if orders < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return totals
@@ -0,0 +1,41 @@
+from django.db import transaction
+
+from .models import Order
+from .signals import orders_bulk_updated
+
+
+def bulk_update_orders(queryset, changes, ids=None):
+    """
+    Apply ``changes`` ({"status": .., "delivery_crew_id": ..}) to the orders in
+    ``queryset`` (already scoped to what the caller may touch, optionally
+    narrowed to ``ids``) with a single UPDATE:
+
+        SELECT id, status, delivery_crew_id ... FOR UPDATE   <- state before
+        UPDATE ... WHERE id IN (rows that actually change)
+
+    then sends orders_bulk_updated with the old state of the changed rows.
+    Returns {"matched", "updated", "unchanged", "not_found"}.
+    """
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    with transaction.atomic():
+        before = {
+            pk: {"status": status, "delivery_crew_id": crew_id}
+            for pk, status, crew_id in queryset.select_for_update()
+            .order_by()
+            .values_list("id", "status", "delivery_crew_id")
+        }
+        changed = {
+            pk: state for pk, state in before.items()
+            if any(state[field] != value for field, value in changes.items())
+        }
+        if changed:
+            Order.objects.filter(pk__in=list(changed)).update(**changes)
+            orders_bulk_updated.send(sender=Order, before=changed, fields=tuple(changes))
+
+    return {
+        "matched": len(before),
+        "updated": len(changed),
+        "unchanged": len(before) - len(changed),
+        "not_found": sorted(set(ids) - set(before)) if ids is not None else [],
+    }
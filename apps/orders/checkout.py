@@ -0,0 +1,64 @@
+from django.db import transaction, OperationalError
+
+from apps.cart.models import Cart
+from .models import Order, OrderItem
+from .signals import order_placed
+
+
+class CheckoutConflict(Exception):
+    """Another checkout for the same cart won the race."""
+
+
+def checkout(user):
+    """
+    Turn the user's cart into an Order in one transaction with a fixed number
+    of queries whatever the cart size:
+
+        SELECT cart (+ menuitem, category) FOR UPDATE
+        DELETE cart rows just read     <- claims the lines
+        INSERT order
+        INSERT order items (bulk)
+        (+ whatever order_placed receivers write, e.g. the sales rollups)
+
+    Returns None for an empty cart. A concurrent checkout of the same lines
+    either blocks on the row lock and then sees an empty cart (PostgreSQL),
+    or fails to claim them and raises CheckoutConflict (SQLite).
+    """
+    try:
+        with transaction.atomic():
+            lines = list(
+                Cart.objects.select_for_update(of=("self",))
+                .select_related("menuitem__category")
+                .filter(user=user)
+                .order_by("id")
+            )
+            if not lines:
+                return None
+
+            claimed, _ = Cart.objects.filter(pk__in=[c.pk for c in lines]).delete()
+            if claimed != len(lines):
+                raise CheckoutConflict()
+
+            order = Order.objects.create(
+                user=user, status=0, total=sum(c.price for c in lines)
+            )
+            items = OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    menuitem=c.menuitem,
+                    quantity=c.quantity,
+                    unit_price=c.unit_price,
+                    price=c.price,
+                )
+                for c in lines
+            ])
+            order_placed.send(sender=Order, order=order, items=items)
+    except OperationalError as exc:
+        # SQLite: вторая транзакция не может получить блокировку на запись
+        if "locked" not in str(exc):
+            raise
+        raise CheckoutConflict() from exc
+
+    # ответ собирается без повторного чтения items
+    order._prefetched_objects_cache = {"items": items}
+    return order
@@ -0,0 +1,97 @@
+"""
+Streaming export of orders with their items.
+
+One query, read with ``iterator(chunk_size=...)`` (a server-side cursor on
+PostgreSQL, chunked fetches on SQLite) over a flat ``values()`` projection of
+Order LEFT JOIN OrderItem ordered by (order id, item id): no model instances,
+no COUNT, no prefetch. Rows are formatted as they arrive and handed to
+StreamingHttpResponse in batches, so memory stays flat whatever the size.
+
+    csv     one line per item, order columns repeated (an order without items
+            is one line with empty item columns)
+    ndjson  one JSON object per order: {..., "items": [{...}, ...]}
+"""
+import csv
+import io
+import json
+from itertools import groupby
+
+CHUNK_SIZE = 2000
+FLUSH_EVERY = 500  # строк на один кусок ответа
+
+ORDER_FIELDS = {
+    "order_id": "id",
+    "date": "date",
+    "status": "status",
+    "user_id": "user_id",
+    "username": "user__username",
+    "delivery_crew_id": "delivery_crew_id",
+    "delivery_crew": "delivery_crew__username",
+    "total": "total",
+    "shipping_address": "shipping_address",
+}
+ITEM_FIELDS = {
+    "menuitem_id": "items__menuitem_id",
+    "title": "items__menuitem__title",
+    "quantity": "items__quantity",
+    "unit_price": "items__unit_price",
+    "price": "items__price",
+}
+CSV_COLUMNS = [*ORDER_FIELDS, *ITEM_FIELDS]
+
+
+def export_rows(queryset, chunk_size=CHUNK_SIZE):
+    """(order values, item values or None) for every item of every order in ``queryset``."""
+    lookups = [*ORDER_FIELDS.values(), *ITEM_FIELDS.values()]
+    rows = queryset.order_by("id", "items__id").values_list(*lookups).iterator(chunk_size=chunk_size)
+    split = len(ORDER_FIELDS)
+    for row in rows:
+        order, item = row[:split], row[split:]
+        yield order, (item if item[0] is not None else None)
+
+
+def _value(value):
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _json_value(value):
+    if value is None or isinstance(value, (int, str)):
+        return value
+    return _value(value)
+
+
+def iter_csv(queryset, chunk_size=CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for n, (order, item) in enumerate(export_rows(queryset, chunk_size), 1):
+        writer.writerow([_value(v) for v in (*order, *(item or [None] * len(ITEM_FIELDS)))])
+        if n % FLUSH_EVERY == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(queryset, chunk_size=CHUNK_SIZE):
+    lines = []
+    for order, group in groupby(export_rows(queryset, chunk_size), key=lambda row: row[0]):
+        record = dict(zip(ORDER_FIELDS, map(_json_value, order)))
+        record["items"] = [
+            dict(zip(ITEM_FIELDS, map(_json_value, item))) for _, item in group if item is not None
+        ]
+        lines.append(json.dumps(record) + "\n")
+        if len(lines) >= FLUSH_EVERY:
+            yield "".join(lines)
+            lines = []
+    yield "".join(lines)
+
+
+FORMATS = {
+    "csv": (iter_csv, "text/csv; charset=utf-8"),
+    "ndjson": (iter_ndjson, "application/x-ndjson"),
+}
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from apps.orders.archive import archive_orders, candidates, cutoff
+
+
+class Command(BaseCommand):
+    help = "Move delivered orders older than --days to the archive tables, in short batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Age in days (default: ORDER_ARCHIVE_AFTER_DAYS)")
+        parser.add_argument("--batch-size", type=int, help="Orders per transaction (default: ORDER_ARCHIVE_BATCH_SIZE)")
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to wait between batches")
+        parser.add_argument("--max-batches", type=int, help="Stop after this many batches")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the orders that would move")
+
+    def handle(self, *args, **opts):
+        if opts["dry_run"]:
+            count = candidates(cutoff(opts["days"])).count()
+            self.stdout.write(f"{count} order(s) would be archived")
+            return
+
+        verbose = opts["verbosity"] > 1
+        stats = archive_orders(
+            days=opts["days"],
+            batch_size=opts["batch_size"],
+            pause=opts["pause"],
+            max_batches=opts["max_batches"],
+            progress=(lambda t: self.stdout.write(f"  {t['orders']} orders, {t['items']} items")) if verbose else None,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {stats['orders']} order(s) with {stats['items']} item(s) in {stats['batches']} batch(es)"
+        ))
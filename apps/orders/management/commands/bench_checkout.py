@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from apps.cart.models import Cart
+from apps.common.bench import measure, scratch_database
+from apps.menu.models import Category, MenuItem
+from apps.orders.checkout import checkout
+
+
+class Command(BaseCommand):
+    help = "Benchmark checkout (query count + latency) for several cart sizes on a scratch database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100])
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **opts):
+        with scratch_database():
+            cat = Category.objects.create(slug="bench", title="Bench")
+            items = MenuItem.objects.bulk_create(
+                MenuItem(title=f"Dish {i}", price=Decimal("9.50"), category=cat)
+                for i in range(max(opts["sizes"]))
+            )
+            user = User.objects.create_user("bench-customer")
+
+            self.stdout.write(f"{'lines':>6} {'queries':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rps':>8}")
+            for size in opts["sizes"]:
+                def fill_cart():
+                    Cart.objects.bulk_create(
+                        Cart(user=user, menuitem=mi, quantity=2, unit_price=mi.price, price=mi.price * 2)
+                        for mi in items[:size]
+                    )
+
+                r = measure(lambda: checkout(user), repeat=opts["repeat"], setup=fill_cart)
+                self.stdout.write(
+                    f"{size:>6} {r['queries']:>8} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['rps']:>8}"
+                )
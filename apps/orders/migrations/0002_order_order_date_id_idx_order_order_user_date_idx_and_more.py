@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-date', '-id'], name='order_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-date'], name='order_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['delivery_crew', '-date'], name='order_crew_date_idx'),
+        ),
+    ]
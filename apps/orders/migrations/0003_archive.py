@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0004_menuitem_image_variants'),
+        ('orders', '0002_order_order_date_id_idx_order_order_user_date_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.IntegerField(default=1)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('date', models.DateTimeField()),
+                ('shipping_address', models.TextField(blank=True, default='')),
+                ('archived_at', models.DateTimeField()),
+                ('delivery_crew', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_deliveries', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField()),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('menuitem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='menu.menuitem')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='orders.archivedorder')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['-date', '-id'], name='archorder_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['user', '-date'], name='archorder_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['delivery_crew', '-date'], name='archorder_crew_date_idx'),
+        ),
+    ]
@@ -11,9 +11,69 @@ class Order(models.Model):
     date = models.DateTimeField(auto_now_add=True)
     shipping_address = models.TextField(blank=True, default="")
 
+    TRACKED_FIELDS = ("status", "delivery_crew_id")
+
+    class Meta:
+        indexes = [
+            # менеджер: все заказы по -date (+ id для keyset-пагинации)
+            models.Index(fields=["-date", "-id"], name="order_date_id_idx"),
+            # клиент / курьер: свои заказы по -date
+            models.Index(fields=["user", "-date"], name="order_user_date_idx"),
+            models.Index(fields=["delivery_crew", "-date"], name="order_crew_date_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        order = super().from_db(db, field_names, values)
+        # состояние из БД: post_save сравнивает с ним и шлёт только реальные изменения
+        order._loaded = order.tracked_state()
+        return order
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # post_save-приёмники сравнили с прежним _loaded; теперь состояние — текущее
+        self._loaded = self.tracked_state()
+
+    def tracked_state(self):
+        # отложенные (only()) поля не трогаем, иначе лишний запрос
+        deferred = self.get_deferred_fields()
+        return {f: getattr(self, f) for f in self.TRACKED_FIELDS if f not in deferred}
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
     menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
     unit_price = models.DecimalField(max_digits=6, decimal_places=2)
-    price = models.DecimalField(max_digits=8, decimal_places=2)
\ No newline at end of file
+    price = models.DecimalField(max_digits=8, decimal_places=2)
+
+
+# ---- archive: доставленные заказы старше ORDER_ARCHIVE_AFTER_DAYS (archive.py) ----
+
+class ArchivedOrder(models.Model):
+    """A delivered order moved out of Order with its id; read-only."""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_orders")
+    delivery_crew = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="archived_deliveries"
+    )
+    status = models.IntegerField(default=1)
+    total = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    date = models.DateTimeField()
+    shipping_address = models.TextField(blank=True, default="")
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-date", "-id"], name="archorder_date_id_idx"),
+            models.Index(fields=["user", "-date"], name="archorder_user_date_idx"),
+            models.Index(fields=["delivery_crew", "-date"], name="archorder_crew_date_idx"),
+        ]
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name="items")
+    menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name="+")
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=6, decimal_places=2)
+    price = models.DecimalField(max_digits=8, decimal_places=2)
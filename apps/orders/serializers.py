@@ -1,5 +1,8 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Order, OrderItem
+from .models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
 from apps.menu.serializers import MenuItemSerializer
 from django.contrib.auth.models import User
 from apps.accounts.serializers import UserTinySerializer
@@ -33,4 +36,93 @@ class OrderSerializer(serializers.ModelSerializer):
             "items",
             "shipping_address",
         ]
-        read_only_fields = ["user", "total", "date"]
\ No newline at end of file
+        read_only_fields = ["user", "total", "date"]
+
+
+class ArchivedOrderItemSerializer(OrderItemSerializer):
+    class Meta(OrderItemSerializer.Meta):
+        model = ArchivedOrderItem
+
+
+class ArchivedOrderSerializer(OrderSerializer):
+    """Same shape as OrderSerializer plus archived_at; archived orders are read-only."""
+    items = ArchivedOrderItemSerializer(many=True, read_only=True)
+
+    class Meta(OrderSerializer.Meta):
+        model = ArchivedOrder
+        fields = OrderSerializer.Meta.fields + ["archived_at"]
+        read_only_fields = fields
+
+class OrderBulkFilterSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=[0, 1], required=False)
+    user_id = serializers.IntegerField(required=False)
+    delivery_crew_id = serializers.IntegerField(required=False, allow_null=True)
+
+
+class OrderBulkUpdateSerializer(serializers.Serializer):
+    """{ "ids": [..] | "filter": {..}, "status"?: 0|1, "delivery_crew_id"?: id|null }"""
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000, required=False)
+    filter = OrderBulkFilterSerializer(required=False)
+    status = serializers.ChoiceField(choices=[0, 1], required=False)
+    delivery_crew_id = serializers.PrimaryKeyRelatedField(
+        queryset=User.objects.all(), required=False, allow_null=True
+    )
+
+    def validate(self, attrs):
+        if ("ids" in attrs) == ("filter" in attrs):
+            raise serializers.ValidationError("Pass either ids or filter")
+        if "filter" in attrs and not attrs["filter"]:
+            raise serializers.ValidationError({"filter": "At least one condition is required"})
+        if "status" not in attrs and "delivery_crew_id" not in attrs:
+            raise serializers.ValidationError("Nothing to update: pass status and/or delivery_crew_id")
+        return attrs
+
+    def changes(self):
+        data = self.validated_data
+        changes = {}
+        if "status" in data:
+            changes["status"] = data["status"]
+        if "delivery_crew_id" in data:
+            crew = data["delivery_crew_id"]
+            changes["delivery_crew_id"] = crew.pk if crew else None
+        return changes
+
+
+class OrderExportQuerySerializer(serializers.Serializer):
+    """?from=&to= (inclusive TIME_ZONE days) &status=0|1 &delivery_crew=<id>|none &archived=1"""
+    # "from" — ключевое слово, поле объявляется в __init__
+    to = serializers.DateField(required=False)
+    status = serializers.ChoiceField(choices=[0, 1], required=False)
+    delivery_crew = serializers.CharField(required=False)
+    archived = serializers.BooleanField(default=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["from"] = serializers.DateField(required=False)
+
+    def validate_delivery_crew(self, value):
+        if value == "none":
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise serializers.ValidationError('Expected a user id or "none"')
+
+    def validate(self, attrs):
+        if attrs.get("from") and attrs.get("to") and attrs["from"] > attrs["to"]:
+            raise serializers.ValidationError({"from": "must not be after to"})
+        return attrs
+
+    def filters(self):
+        data = self.validated_data
+        filters = {}
+        # границы дней в TIME_ZONE -> полуинтервал по date, индекс order_date_id_idx
+        if "from" in data:
+            filters["date__gte"] = timezone.make_aware(datetime.combine(data["from"], time.min))
+        if "to" in data:
+            filters["date__lt"] = timezone.make_aware(datetime.combine(data["to"] + timedelta(days=1), time.min))
+        if "status" in data:
+            filters["status"] = data["status"]
+        if "delivery_crew" in data:
+            filters["delivery_crew_id"] = data["delivery_crew"]
+        return filters
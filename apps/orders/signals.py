@@ -0,0 +1,12 @@
+from django.dispatch import Signal
+
+# QuerySet.update() по заказам не шлёт post_save — отправитель шлёт это сам:
+#   orders_bulk_updated.send(sender=Order, before={order_id: {"status": ..., "delivery_crew_id": ...}},
+#                            fields=("status",))
+# before — значения Order.TRACKED_FIELDS до UPDATE, fields — какие из них UPDATE писал.
+orders_bulk_updated = Signal()
+
+# checkout() шлёт внутри своей транзакции, когда заказ и его строки уже записаны
+# (post_save(created) приходит раньше, без строк):
+#   order_placed.send(sender=Order, order=order, items=[OrderItem, ...])
+order_placed = Signal()
@@ -1,3 +1,368 @@
+import csv
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.accounts.roles import MANAGER, DELIVERY, get_roles
+from apps.cart.models import Cart
+from apps.common.pagination import KeysetPagination
+from apps.delivery.events import broker
+from apps.menu.models import Category, MenuItem
+from apps.analytics.models import DailySales, ItemDailySales
+from apps.analytics.rollups import rebuild
+from .archive import archive_orders
+from .checkout import checkout
+from .models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("boss", password="pass")
+        cls.manager.groups.add(Group.objects.create(name=MANAGER))
+        cls.customer = User.objects.create_user("cust", password="pass")
+        base = timezone.now()
+        for i in range(25):
+            o = Order.objects.create(user=cls.customer, total=Decimal(i % 7))
+            # по три заказа на одну и ту же дату -> проверяем разрешение ничьих по id
+            Order.objects.filter(pk=o.pk).update(date=base - timedelta(minutes=i // 3))
+
+    def setUp(self):
+        cache.clear()
+        self.c = APIClient()
+        self.c.force_authenticate(self.manager)
+
+    def walk(self, url):
+        ids, pages = [], 0
+        while url:
+            r = self.c.get(url)
+            self.assertEqual(r.status_code, 200, r.content)
+            data = r.json()
+            self.assertNotIn("count", data)
+            ids += [o["id"] for o in data["results"]]
+            url, pages = data["next"], pages + 1
+        return ids, pages
+
+    def test_walks_default_ordering_without_gaps(self):
+        expected = list(Order.objects.order_by("-date", "-id").values_list("id", flat=True))
+        ids, pages = self.walk("/api/orders?pagination=cursor&page_size=4")
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 7)
+
+    def test_other_ordering_field(self):
+        expected = list(Order.objects.order_by("total", "id").values_list("id", flat=True))
+        ids, _ = self.walk("/api/orders?pagination=cursor&page_size=5&ordering=total")
+        self.assertEqual(ids, expected)
+
+    def test_previous_link_and_no_count(self):
+        first = self.c.get("/api/orders?pagination=cursor&page_size=5").json()
+        second = self.c.get(first["next"]).json()
+        with CaptureQueriesContext(connection) as ctx:
+            back = self.c.get(second["previous"]).json()
+        self.assertEqual([o["id"] for o in back["results"]], [o["id"] for o in first["results"]])
+        self.assertFalse(any("COUNT(" in q["sql"] for q in ctx.captured_queries))
+
+    def test_bad_cursor_is_404(self):
+        self.assertEqual(self.c.get("/api/orders?cursor=garbage").status_code, 404)
+        pagination = KeysetPagination()
+        for values in (["abc", 1], [{"x": 1}, 1], ["2024-01-01T00:00:00Z", "zz"], [None, 1]):
+            with self.subTest(values=values):
+                cursor = pagination.encode_cursor(values, False)
+                r = self.c.get(f"/api/orders?pagination=cursor&cursor={cursor}")
+                self.assertEqual(r.status_code, 404)
+
+    def test_page_number_mode_unchanged(self):
+        data = self.c.get("/api/orders").json()
+        self.assertEqual(data["count"], 25)
+
+
+class CheckoutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user("cust", password="pass")
+        cat = Category.objects.create(slug="main", title="Main")
+        cls.items = MenuItem.objects.bulk_create(
+            MenuItem(title=f"Dish {i}", price=Decimal("2.50"), category=cat) for i in range(30)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.c = APIClient()
+        self.c.force_authenticate(self.customer)
+        get_roles(self.customer)
+
+    def fill(self, n):
+        Cart.objects.bulk_create(
+            Cart(user=self.customer, menuitem=mi, quantity=2, unit_price=mi.price, price=mi.price * 2)
+            for mi in self.items[:n]
+        )
+
+    def count_checkout_queries(self, n):
+        self.fill(n)
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.c.post("/api/orders")
+        self.assertEqual(r.status_code, 201, r.content)
+        return len(ctx.captured_queries), r.json()
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        small, _ = self.count_checkout_queries(1)
+        large, data = self.count_checkout_queries(30)
+        self.assertEqual(small, large)
+        self.assertEqual(len(data["items"]), 30)
+        self.assertEqual(data["total"], "150.00")
+        self.assertEqual(data["items"][0]["menuitem"]["category"]["title"], "Main")
+
+    def test_double_submit_creates_one_order(self):
+        self.fill(3)
+        self.assertEqual(self.c.post("/api/orders").status_code, 201)
+        self.assertEqual(self.c.post("/api/orders").status_code, 400)
+        self.assertEqual(Order.objects.filter(user=self.customer).count(), 1)
+        self.assertFalse(Cart.objects.filter(user=self.customer).exists())
+
+    def test_failure_rolls_back_everything(self):
+        self.fill(3)
+        with mock.patch.object(OrderItem.objects, "bulk_create", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                checkout(self.customer)
+        self.assertEqual(Cart.objects.filter(user=self.customer).count(), 3)
+        self.assertFalse(Order.objects.exists())
+
+
+class OrderBulkUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("boss")
+        cls.manager.groups.add(Group.objects.create(name=MANAGER))
+        crew = Group.objects.create(name=DELIVERY)
+        cls.crew, cls.other_crew = User.objects.create_user("crew"), User.objects.create_user("crew2")
+        crew.user_set.add(cls.crew, cls.other_crew)
+        cls.customer = User.objects.create_user("cust")
+        cls.orders = Order.objects.bulk_create(
+            Order(user=cls.customer, delivery_crew=cls.crew if i < 6 else None, total=1) for i in range(10)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.c = APIClient()
+
+    def patch(self, user, payload):
+        self.c.force_authenticate(user)
+        return self.c.patch("/api/orders/bulk", payload, format="json")
+
+    def test_manager_updates_ids_with_one_update(self):
+        ids = [o.id for o in self.orders[:4]] + [999999]
+        Order.objects.filter(pk=ids[0]).update(status=1)
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.patch(self.manager, {"ids": ids, "status": 1})
+        self.assertEqual(r.status_code, 200, r.content)
+        self.assertEqual(r.json(), {"matched": 4, "updated": 3, "unchanged": 1, "not_found": [999999]})
+        updates = [q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(Order.objects.filter(status=1).count(), 4)
+
+    def test_reassign_queue_by_filter_emits_events(self):
+        mark = broker.last_id
+        with self.captureOnCommitCallbacks(execute=True):
+            r = self.patch(self.manager, {
+                "filter": {"delivery_crew_id": self.crew.id, "status": 0},
+                "delivery_crew_id": self.other_crew.id,
+            })
+        self.assertEqual(r.json()["updated"], 6)
+        self.assertEqual(Order.objects.filter(delivery_crew=self.other_crew).count(), 6)
+        events, _ = broker.since(mark)
+        self.assertEqual({e.type for e in events}, {"order.assigned"})
+        self.assertEqual(len(events), 6)
+        self.assertTrue(all(self.crew.id in e.crew_ids for e in events))
+
+    def test_crew_only_sets_status_on_own_orders(self):
+        ids = [self.orders[0].id, self.orders[8].id]
+        r = self.patch(self.crew, {"ids": ids, "status": 1})
+        self.assertEqual(r.json()["not_found"], [self.orders[8].id])
+        self.assertEqual(Order.objects.get(pk=self.orders[8].id).status, 0)
+        self.assertEqual(self.patch(self.crew, {"ids": ids, "delivery_crew_id": None}).status_code, 403)
+        self.assertEqual(self.patch(self.customer, {"ids": ids, "status": 1}).status_code, 403)
+
+    def test_validation(self):
+        for payload in (
+            {"status": 1},
+            {"ids": [1], "filter": {"status": 0}, "status": 1},
+            {"ids": [1]},
+            {"filter": {}, "status": 1},
+            {"ids": [1], "status": 5},
+            {"ids": [1], "delivery_crew_id": 999999},
+        ):
+            with self.subTest(payload=payload):
+                self.assertEqual(self.patch(self.manager, payload).status_code, 400)
+
+
+class OrderExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("boss")
+        cls.manager.groups.add(Group.objects.create(name=MANAGER))
+        cls.crew = User.objects.create_user("crew")
+        cls.crew.groups.add(Group.objects.create(name=DELIVERY))
+        cls.customer = User.objects.create_user("cust")
+        cat = Category.objects.create(slug="main", title="Main")
+        soup, pie = MenuItem.objects.bulk_create([
+            MenuItem(title="Soup", price=Decimal("4.00"), category=cat),
+            MenuItem(title='Pie, "hot"', price=Decimal("3.50"), category=cat),
+        ])
+        cls.orders = Order.objects.bulk_create(
+            Order(user=cls.customer, delivery_crew=cls.crew if i % 2 else None, status=i % 2, total=Decimal("11.50"))
+            for i in range(5)
+        )
+        Order.objects.filter(pk=cls.orders[0].pk).update(date=timezone.now() - timedelta(days=10))
+        OrderItem.objects.bulk_create(
+            line
+            for order in cls.orders[:4]
+            for line in (
+                OrderItem(order=order, menuitem=soup, quantity=2, unit_price=soup.price, price=Decimal("8.00")),
+                OrderItem(order=order, menuitem=pie, quantity=1, unit_price=pie.price, price=pie.price),
+            )
+        )
+
+    def setUp(self):
+        self.c = APIClient()
+        self.c.force_authenticate(self.manager)
+
+    def get(self, url):
+        r = self.c.get(url)
+        self.assertEqual(r.status_code, 200, getattr(r, "content", b""))
+        return b"".join(r.streaming_content).decode()
+
+    def test_csv_has_a_line_per_item(self):
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.c.get("/api/orders/export.csv")
+            body = b"".join(r.streaming_content).decode()
+        self.assertEqual(r["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn("attachment", r["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 4 * 2 + 1)
+        self.assertEqual([int(row["order_id"]) for row in rows], sorted(int(row["order_id"]) for row in rows))
+        self.assertEqual(rows[1]["title"], 'Pie, "hot"')
+        self.assertEqual((rows[0]["quantity"], rows[0]["price"], rows[0]["username"]), ("2", "8.00", "cust"))
+        last = rows[-1]
+        self.assertEqual((last["order_id"], last["menuitem_id"], last["delivery_crew"]), (str(self.orders[4].id), "", ""))
+        selects = [q for q in ctx.captured_queries if "orders_orderitem" in q["sql"]]
+        self.assertEqual(len(selects), 1)
+
+    def test_ndjson_has_an_object_per_order(self):
+        records = [json.loads(line) for line in self.get("/api/orders/export.ndjson").splitlines()]
+        self.assertEqual([r["order_id"] for r in records], [o.id for o in self.orders])
+        self.assertEqual(len(records[0]["items"]), 2)
+        self.assertEqual(records[0]["items"][0], {
+            "menuitem_id": records[0]["items"][0]["menuitem_id"], "title": "Soup",
+            "quantity": 2, "unit_price": "4.00", "price": "8.00",
+        })
+        self.assertEqual((records[1]["delivery_crew"], records[1]["total"]), ("crew", "11.50"))
+        self.assertEqual(records[4]["items"], [])
+
+    def test_filters(self):
+        def ids(query):
+            return [json.loads(line)["order_id"] for line in self.get(f"/api/orders/export.ndjson?{query}").splitlines()]
+
+        today = timezone.localdate()
+        self.assertEqual(ids(f"from={today}"), [o.id for o in self.orders[1:]])
+        self.assertEqual(ids(f"to={today - timedelta(days=1)}"), [self.orders[0].id])
+        self.assertEqual(ids("status=1"), [self.orders[1].id, self.orders[3].id])
+        self.assertEqual(ids(f"delivery_crew={self.crew.id}"), [self.orders[1].id, self.orders[3].id])
+        self.assertEqual(ids("delivery_crew=none&status=0"), [o.id for o in self.orders[::2]])
+        for query in ("status=3", "delivery_crew=x", f"from={today}&to={today - timedelta(days=1)}"):
+            with self.subTest(query=query):
+                self.assertEqual(self.c.get(f"/api/orders/export.csv?{query}").status_code, 400)
+
+    def test_managers_only(self):
+        for user in (self.crew, self.customer):
+            self.c.force_authenticate(user)
+            self.assertEqual(self.c.get("/api/orders/export.csv").status_code, 403)
+        self.c.force_authenticate(None)
+        self.assertEqual(self.c.get("/api/orders/export.ndjson").status_code, 401)
+
+
+class OrderArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user("boss")
+        cls.manager.groups.add(Group.objects.create(name=MANAGER))
+        cls.crew = User.objects.create_user("crew")
+        cls.crew.groups.add(Group.objects.create(name=DELIVERY))
+        cls.customer, cls.other = User.objects.create_user("cust"), User.objects.create_user("other")
+        cat = Category.objects.create(slug="main", title="Main")
+        cls.soup = MenuItem.objects.create(title="Soup", price=Decimal("4.00"), category=cat)
+
+    def setUp(self):
+        cache.clear()
+        self.c = APIClient()
+
+    def place(self, user, days_ago, status=1):
+        Cart.objects.add_lines(user, [(self.soup, 2)])
+        order = checkout(user)
+        Order.objects.filter(pk=order.pk).update(
+            date=timezone.now() - timedelta(days=days_ago), status=status, delivery_crew=self.crew
+        )
+        return order.pk
+
+    def rollups(self):
+        return sorted(DailySales.objects.values_list("day", "orders", "quantity", "revenue")), sorted(
+            ItemDailySales.objects.values_list("day", "menuitem_id", "orders", "quantity")
+        )
+
+    def test_moves_old_delivered_orders_in_batches(self):
+        old = [self.place(self.customer, 100) for _ in range(5)]
+        undelivered = self.place(self.customer, 100, status=0)
+        recent = self.place(self.customer, 3)
+        rebuild()  # даты сдвинуты update() в обход сигналов
+        before = self.rollups()
+
+        stats = archive_orders(days=90, batch_size=2)
+        self.assertEqual(stats, {"orders": 5, "items": 5, "batches": 3})
+        self.assertEqual(sorted(ArchivedOrder.objects.values_list("id", flat=True)), old)
+        self.assertEqual(ArchivedOrderItem.objects.filter(order_id__in=old).count(), 5)
+        self.assertEqual(sorted(Order.objects.values_list("id", flat=True)), [undelivered, recent])
+        self.assertFalse(OrderItem.objects.filter(order_id__in=old).exists())
+        archived = ArchivedOrder.objects.get(pk=old[0])
+        self.assertEqual((archived.user, archived.total, archived.status), (self.customer, Decimal("8.00"), 1))
+        self.assertIsNotNone(archived.archived_at)
+
+        # архивация не вычитает заказы из rollups, а rebuild их видит
+        self.assertEqual(self.rollups(), before)
+        rebuild()
+        self.assertEqual(self.rollups(), before)
+        self.assertEqual(archive_orders(days=90), {"orders": 0, "items": 0, "batches": 0})
+
+    def test_archived_reads(self):
+        mine = self.place(self.customer, 200)
+        theirs = self.place(self.other, 200)
+        hot = self.place(self.customer, 1)
+        archive_orders(days=90)
+
+        self.c.force_authenticate(self.customer)
+        self.assertEqual([o["id"] for o in self.c.get("/api/orders").json()["results"]], [hot])
+        r = self.c.get("/api/orders", {"archived": 1})
+        self.assertEqual([o["id"] for o in r.json()["results"]], [mine])
+        self.assertEqual(r.json()["results"][0]["items"][0]["menuitem"]["title"], "Soup")
+        self.assertIn("archived_at", r.json()["results"][0])
+        self.assertEqual(self.c.get(f"/api/orders/{mine}", {"archived": 1}).status_code, 200)
+        self.assertEqual(self.c.get(f"/api/orders/{theirs}", {"archived": 1}).status_code, 404)
+        self.assertEqual(self.c.get(f"/api/orders/{mine}").status_code, 404)
+
+        self.c.force_authenticate(self.crew)
+        r = self.c.get("/api/orders?archived=1&fields=id")
+        self.assertEqual(sorted(o["id"] for o in r.json()["results"]), [mine, theirs])
+        self.assertEqual(self.c.patch(f"/api/orders/{mine}?archived=1", {"status": 0}, format="json").status_code, 405)
 
-# Create your tests here.
+        self.c.force_authenticate(self.manager)
+        self.assertEqual(self.c.delete(f"/api/orders/{mine}?archived=1").status_code, 405)
+        body = b"".join(self.c.get("/api/orders/export.ndjson?archived=1").streaming_content).decode()
+        self.assertEqual(sorted(json.loads(line)["order_id"] for line in body.splitlines()), [mine, theirs])
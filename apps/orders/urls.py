@@ -1,11 +1,13 @@
 # LittleLemonAPI/urls.py
-from django.urls import path
+from django.urls import path, re_path
 from .views import (
-    OrdersView, OrderDetailView
+    OrdersView, OrderDetailView, OrderBulkUpdateView, OrderExportView
 )
 
 urlpatterns = [
     path("orders", OrdersView.as_view()),
     path("orders/<int:pk>", OrderDetailView.as_view()),
+    path("orders/bulk", OrderBulkUpdateView.as_view()),
+    re_path(r"^orders/export\.(?P<fmt>csv|ndjson)$", OrderExportView.as_view()),
     path("cart/orders", OrdersView.as_view()),
 ]
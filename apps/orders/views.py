@@ -1,14 +1,48 @@
+import json
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import permissions, generics
+from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
-from rest_framework.throttling import ScopedRateThrottle
-
-from .models import Order, OrderItem
-from apps.cart.models import Cart
-from .serializers import OrderSerializer
-from apps.accounts.permissions import in_group
+from rest_framework.views import APIView
+
+from .models import Order, ArchivedOrder
+from .bulk import bulk_update_orders
+from .checkout import checkout, CheckoutConflict
+from .export import FORMATS
+from .serializers import (
+    OrderSerializer, ArchivedOrderSerializer, OrderBulkUpdateSerializer, OrderExportQuerySerializer,
+)
+from apps.accounts.permissions import IsManager, in_group
+from apps.accounts.roles import MANAGER, DELIVERY
+from apps.common.pagination import KeysetPagination
+from apps.common.throttling import ScopedBucketThrottle
+from apps.common.sparse import SparseFieldsMixin
 
 # Create your views here.
-class OrdersView(generics.ListCreateAPIView):
+class ArchiveReadMixin:
+    """?archived=1 -> the same reads over ArchivedOrder (see archive.py); writes are refused."""
+
+    @property
+    def archived(self):
+        return self.request.query_params.get("archived") in ("1", "true")
+
+    def check_permissions(self, request):
+        super().check_permissions(request)
+        if self.archived and request.method not in permissions.SAFE_METHODS:
+            raise MethodNotAllowed(request.method, detail="Archived orders are read-only")
+
+    def get_serializer_class(self):
+        return ArchivedOrderSerializer if self.archived else super().get_serializer_class()
+
+    def orders(self):
+        model = ArchivedOrder if self.archived else Order
+        return model.objects.all().select_related("user", "delivery_crew").prefetch_related("items__menuitem")
+
+
+class OrdersView(ArchiveReadMixin, SparseFieldsMixin, generics.ListCreateAPIView):
     """
     /api/orders
       GET:
@@ -17,54 +51,53 @@ class OrdersView(generics.ListCreateAPIView):
         - Customer     -> their orders
       POST (Customer):
         - Create order from user's cart, move items to OrderItems, clear cart
+          (one transaction, constant query count — see checkout.py)
+
+      ?pagination=cursor -> keyset pages on (ordering field, id), no COUNT
+      ?fields= / ?expand= -> sparse output (see apps.common.sparse)
+      ?archived=1 -> archived (delivered, older) orders instead, same rules
     """
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
     throttle_scope = "orders"
-    throttle_classes = [ScopedRateThrottle]
+    throttle_classes = [ScopedBucketThrottle]
 
     filterset_fields = ["status", "user", "delivery_crew"]
     ordering_fields = ["date", "total", "status", "id"]
     ordering = ["-date"]
 
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator") and KeysetPagination.is_requested(self.request):
+            self._paginator = KeysetPagination()
+        return super().paginator
+
     def get_queryset(self):
         user = self.request.user
-        qs = Order.objects.all().select_related("user", "delivery_crew").prefetch_related("items__menuitem")
-        if in_group(user, "Manager"):
-            return qs
-        if in_group(user, "Delivery crew"):
-            return qs.filter(delivery_crew=user)
-        return qs.filter(user=user)
+        qs = self.orders()
+        if in_group(user, MANAGER):
+            pass
+        elif in_group(user, DELIVERY):
+            qs = qs.filter(delivery_crew=user)
+        else:
+            qs = qs.filter(user=user)
+        return self.sparse_queryset(qs)
 
     def create(self, request, *args, **kwargs):
-        if in_group(request.user, "Manager") or in_group(request.user, "Delivery crew"):
+        if in_group(request.user, MANAGER) or in_group(request.user, DELIVERY):
             return Response({"detail": "Forbidden"}, status=403)
 
-        cart_items = Cart.objects.filter(user=request.user)
-        if not cart_items.exists():
+        try:
+            order = checkout(request.user)
+        except CheckoutConflict:
+            return Response({"detail": "Checkout already in progress"}, status=409)
+        if order is None:
             return Response({"detail": "Cart is empty"}, status=400)
 
-        order = Order.objects.create(user=request.user, status=0, total=0)
-        total = 0
-        bulk = []
-        for c in cart_items:
-            total += c.price
-            bulk.append(OrderItem(
-                order=order,
-                menuitem=c.menuitem,
-                quantity=c.quantity,
-                unit_price=c.unit_price,
-                price=c.price,
-            ))
-        OrderItem.objects.bulk_create(bulk)
-        order.total = total
-        order.save()
-        cart_items.delete()
-
         return Response(OrderSerializer(order).data, status=201)
 
 
-class OrderDetailView(generics.RetrieveUpdateDestroyAPIView):
+class OrderDetailView(ArchiveReadMixin, SparseFieldsMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     /api/orders/{orderId}
       GET:
@@ -77,26 +110,29 @@ class OrderDetailView(generics.RetrieveUpdateDestroyAPIView):
         - Customer     -> forbidden
       DELETE:
         - Manager only
+      ?archived=1 -> GET an archived order (same visibility); writes -> 405
     """
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
     throttle_scope = "orders"
-    throttle_classes = [ScopedRateThrottle]
+    throttle_classes = [ScopedBucketThrottle]
 
     def get_queryset(self):
         user = self.request.user
-        qs = Order.objects.all().select_related("user", "delivery_crew").prefetch_related("items__menuitem")
-        if in_group(user, "Manager"):
-            return qs
-        if in_group(user, "Delivery crew"):
-            return qs.filter(delivery_crew=user)
-        return qs.filter(user=user)
+        qs = self.orders()
+        if in_group(user, MANAGER):
+            pass
+        elif in_group(user, DELIVERY):
+            qs = qs.filter(delivery_crew=user)
+        else:
+            qs = qs.filter(user=user)
+        return self.sparse_queryset(qs)
 
     def update(self, request, *args, **kwargs):
         order = self.get_object()
         data = request.data
 
-        if in_group(request.user, "Manager"):
+        if in_group(request.user, MANAGER):
             allowed = {}
             if "delivery_crew_id" in data:
                 allowed["delivery_crew_id"] = data.get("delivery_crew_id")
@@ -110,7 +146,7 @@ class OrderDetailView(generics.RetrieveUpdateDestroyAPIView):
             self.perform_update(ser)
             return Response(ser.data, status=200)
 
-        if in_group(request.user, "Delivery crew"):
+        if in_group(request.user, DELIVERY):
             if request.method == "PUT":
                 return Response({"detail": "Use PATCH for status update"}, status=400)
             if order.delivery_crew_id != request.user.id:
@@ -127,6 +163,90 @@ class OrderDetailView(generics.RetrieveUpdateDestroyAPIView):
         return Response({"detail": "Forbidden"}, status=403)
 
     def destroy(self, request, *args, **kwargs):
-        if not in_group(request.user, "Manager"):
+        if not in_group(request.user, MANAGER):
+            return Response({"detail": "Forbidden"}, status=403)
+        return super().destroy(request, *args, **kwargs)
+
+
+class OrderBulkUpdateView(APIView):
+    """
+    PATCH /api/orders/bulk
+      { "ids": [1, 2, 3] }  or  { "filter": { "status"?, "user_id"?, "delivery_crew_id"? } }
+      plus "status": 0|1 and/or "delivery_crew_id": <id>|null
+
+      - Manager      -> any orders, status and/or delivery_crew_id
+      - Delivery crew-> status only, only orders assigned to them
+      - Customer     -> forbidden
+      One UPDATE for the whole set -> { matched, updated, unchanged, not_found }
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "orders"
+    throttle_classes = [ScopedBucketThrottle]
+
+    def patch(self, request):
+        user = request.user
+        ser = OrderBulkUpdateSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        changes = ser.changes()
+
+        qs = Order.objects.all()
+        if in_group(user, MANAGER):
+            pass
+        elif in_group(user, DELIVERY):
+            if "delivery_crew_id" in changes:
+                return Response({"detail": "Forbidden"}, status=403)
+            qs = qs.filter(delivery_crew=user)
+        else:
             return Response({"detail": "Forbidden"}, status=403)
-        return super().destroy(request, *args, **kwargs)
\ No newline at end of file
+
+        conditions = ser.validated_data.get("filter")
+        if conditions:
+            qs = qs.filter(**conditions)
+        return Response(bulk_update_orders(qs, changes, ids=ser.validated_data.get("ids")))
+
+
+class ExportRenderer(BaseRenderer):
+    """Lets DRF accept the export media types; errors go out as JSON text."""
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode()
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+
+class OrderExportView(APIView):
+    """
+    GET /api/orders/export.csv | /api/orders/export.ndjson   (Manager)
+      ?from=YYYY-MM-DD&to=YYYY-MM-DD&status=0|1&delivery_crew=<id>|none&archived=1
+
+      Every matching order with its items, oldest first, streamed as it is
+      read (see export.py): no pagination, no COUNT, flat memory.
+    """
+    throttle_scope = "export"
+    throttle_classes = [ScopedBucketThrottle]
+    renderer_classes = [JSONRenderer, CSVRenderer, NDJSONRenderer]
+
+    def get_permissions(self):
+        if self.request.user and self.request.user.is_superuser:
+            return [permissions.IsAuthenticated()]
+        return [permissions.IsAuthenticated(), IsManager()]
+
+    def get(self, request, fmt):
+        ser = OrderExportQuerySerializer(data=request.query_params)
+        ser.is_valid(raise_exception=True)
+        stream, content_type = FORMATS[fmt]
+
+        model = ArchivedOrder if ser.validated_data["archived"] else Order
+        response = StreamingHttpResponse(stream(model.objects.filter(**ser.filters())), content_type=content_type)
+        filename = f"orders-{timezone.localdate():%Y%m%d}.{fmt}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
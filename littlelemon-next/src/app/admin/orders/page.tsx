@@ -1,11 +1,13 @@
 "use client";
 import ManagerGuard from "@/components/ManagerGuard";
 import { api } from "@/lib/api";
+import { useOrderEvents } from "@/lib/useOrderEvents";
 import { useMutation, useQuery, useQueryClient } from "@tanstack/react-query";
 
 export default function AdminOrders() {
   const qc = useQueryClient();
   const { data: orders } = useQuery({ queryKey: ["orders-all"], queryFn: async () => (await api.get("/api/orders")).data });
+  useOrderEvents(["orders-all"]);
   const { data: crew } = useQuery({ queryKey: ["delivery-crew"], queryFn: async () => (await api.get("/api/groups/delivery-crew/users")).data });
 
   const list = Array.isArray(orders) ? orders : orders?.results ?? [];
@@ -3,6 +3,7 @@ import { useQuery } from "@tanstack/react-query";
 import { api } from "@/lib/api";
 import { Order } from "@/types/dto";
 import Guard from "@/components/Guard";
+import { useOrderEvents } from "@/lib/useOrderEvents";
 
 
 async function myOrders() {
@@ -13,6 +14,7 @@ return (Array.isArray(data) ? data : data.results) as Order[];
 
 export default function OrdersPage() {
 const { data, isLoading } = useQuery({ queryKey: ["orders"], queryFn: myOrders });
+useOrderEvents(["orders"]);
 return (
 <Guard>
 <h1 className="text-xl font-semibold mb-3">My Orders</h1>
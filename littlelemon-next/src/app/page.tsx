@@ -5,11 +5,38 @@ import Hero from "@/components/Hero";
 
 export const revalidate = 60;
 
+const absolute = (api: string | undefined, url?: string | null) =>
+  url && url.startsWith("/") ? `${api}${url}` : url;
 
-export default async function Home() {
-const res = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/menu-items`, { next: { revalidate } });
+type SnapshotCategory = { id: number; title: string; items: Omit<MenuItem, "category">[] };
+
+// статический снапшот (MEDIA_ROOT/snapshots/menu.json) отдаётся без Django
+async function loadMenu(): Promise<MenuItem[]> {
+const api = process.env.NEXT_PUBLIC_API_URL;
+const snapshot = process.env.NEXT_PUBLIC_MENU_SNAPSHOT_URL;
+if (snapshot) {
+  const res = await fetch(snapshot, { next: { revalidate } });
+  if (res.ok) {
+    const data: { categories: SnapshotCategory[] } = await res.json();
+    return data.categories.flatMap((c) =>
+      c.items.map((it) => ({
+        ...it,
+        category: { id: c.id, title: c.title },
+        inventory: 0,
+        image: absolute(api, it.images?.card?.webp ?? it.image),
+      }))
+    );
+  }
+}
+const res = await fetch(`${api}/api/menu-items`, { next: { revalidate } });
 const data = await res.json();
 const items: MenuItem[] = Array.isArray(data) ? data : data.results ?? [];
+// карточке хватает варианта card (480px) вместо оригинала
+return items.map((it) => ({ ...it, image: it.images?.card?.webp ?? it.image }));
+}
+
+export default async function Home() {
+const items = await loadMenu();
 
 
 return (
@@ -10,4 +10,12 @@ export async function addToCart(menuitemId: number, quantity = 1) {
     }
     throw err;
   }
-}
\ No newline at end of file
+}
+
+export type CartLineInput = { menuitem_id: number; quantity: number };
+
+// одна запрос-пачка вместо POST на каждое блюдо; ошибки приходят построчно
+export async function addManyToCart(lines: CartLineInput[]) {
+  const { data } = await api.post("/api/cart/menu-items/bulk", lines);
+  return data as { lines: unknown[]; errors: { index: number; errors: Record<string, string[]> }[] };
+}
@@ -0,0 +1,22 @@
+"use client";
+import { useEffect } from "react";
+import { useQueryClient } from "@tanstack/react-query";
+
+const EVENTS = ["order.created", "order.status", "order.assigned", "reset"];
+
+// SSE вместо опроса /api/orders: при событии просто инвалидируем список.
+// EventSource сам переподключается и шлёт Last-Event-ID.
+export function useOrderEvents(queryKey: unknown[]) {
+  const qc = useQueryClient();
+  const key = JSON.stringify(queryKey);
+
+  useEffect(() => {
+    const access = typeof window !== "undefined" ? localStorage.getItem("access") : null;
+    if (!access) return;
+    const url = `${process.env.NEXT_PUBLIC_API_URL ?? ""}/api/orders/events?token=${encodeURIComponent(access)}`;
+    const source = new EventSource(url);
+    const refresh = () => qc.invalidateQueries({ queryKey: JSON.parse(key) });
+    EVENTS.forEach((name) => source.addEventListener(name, refresh));
+    return () => source.close();
+  }, [qc, key]);
+}
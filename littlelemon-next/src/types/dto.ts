@@ -1,7 +1,13 @@
 export type Category = { id: number; title: string };
+export type ImageVariant = { width: number; height: number; webp?: string; jpeg?: string };
+export type ImageVariants = {
+thumb?: ImageVariant; card?: ImageVariant; full?: ImageVariant;
+srcset: { webp?: string; jpeg?: string };
+};
 export type MenuItem = {
 id: number; title: string; price: string; featured: boolean;
 category: Category | number; inventory: number; image?: string | null; 
+images?: ImageVariants | null;
 };
 export type CartItem = {
 id: number; quantity: number; unit_price: string; price: string; menuitem: MenuItem;
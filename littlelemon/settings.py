@@ -26,6 +26,8 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv("DEBUG")
+# DEBUG выше — сырая строка ("0" и "False" истинны); для значений по умолчанию ниже
+DEBUG_ON = os.getenv("DEBUG", "0").lower() in ("1", "true")
 
 ALLOWED_HOSTS = os.getenv("ALLOWED_HOSTS").split(' ')
 
@@ -34,6 +36,7 @@ ALLOWED_HOSTS = os.getenv("ALLOWED_HOSTS").split(' ')
 
 INSTALLED_APPS = [
     'apps.accounts',
+    'apps.analytics',
     'apps.cart',
     'apps.common',
     'apps.delivery',
@@ -64,6 +67,15 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# per-request timings as a Server-Timing header (apps/common/profiling.py);
+# off unless PROFILING=1, then every request is timed with probability
+# PROFILING_SAMPLE_RATE and ?_profile=1 forces it where PROFILING_ALLOW_FORCE
+PROFILING_ENABLED = os.getenv("PROFILING", "0") == "1"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 1.0 if DEBUG_ON else 0.01))
+PROFILING_ALLOW_FORCE = os.getenv("PROFILING_ALLOW_FORCE", "1" if DEBUG_ON else "0") == "1"
+if PROFILING_ENABLED:
+    MIDDLEWARE.insert(0, "apps.common.profiling.ProfilingMiddleware")
+
 ROOT_URLCONF = 'littlelemon.urls'
 
 TEMPLATES = [
@@ -87,10 +99,69 @@ WSGI_APPLICATION = 'littlelemon.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=sqlite (default) or postgres; the same test suite and benchmark
+# commands run against either.
+
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite").lower()
+
+if DB_ENGINE in ("postgres", "postgresql"):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv("DB_NAME", "littlelemon"),
+            'USER': os.getenv("DB_USER", "littlelemon"),
+            'PASSWORD': os.getenv("DB_PASSWORD", ""),
+            'HOST': os.getenv("DB_HOST", "localhost"),
+            'PORT': os.getenv("DB_PORT", "5432"),
+            # persistent connections, checked before reuse
+            'CONN_MAX_AGE': int(os.getenv("DB_CONN_MAX_AGE", 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv("DB_CONNECT_TIMEOUT", 5)),
+            },
+        }
+    }
+    if os.getenv("DB_POOL", "0") == "1":
+        # psycopg 3 + psycopg_pool only; the pool replaces persistent connections
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv("DB_POOL_MIN", 2)),
+            'max_size': int(os.getenv("DB_POOL_MAX", 20)),
+            'timeout': int(os.getenv("DB_POOL_TIMEOUT", 10)),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv("DB_NAME") or BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # BEGIN IMMEDIATE: writers queue on busy_timeout instead of
+                # failing with "database is locked" on lock upgrade
+                'transaction_mode': os.getenv("SQLITE_TRANSACTION_MODE", "IMMEDIATE"),
+            },
+        }
+    }
+
+# applied on every new SQLite connection (apps/common/db.py)
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -20000)),  # KiB when negative
+    "temp_store": "MEMORY",
+}
+
+
+# Cache
+# LocMem is per-process; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache) so that role and
+# menu invalidation reaches every worker.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
     }
 }
 
@@ -141,7 +212,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.accounts.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticatedOrReadOnly",),
     "DEFAULT_FILTER_BACKENDS": [
@@ -151,14 +222,14 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_PAGINATION_CLASS": "apps.common.pagination.DefaultPagination",
     "PAGE_SIZE": 10,
+    # view scope + user/anon одной транзакцией в общем для воркеров файле (apps/common/throttling.py)
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.ScopedRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
-        "rest_framework.throttling.AnonRateThrottle",
+        "apps.common.throttling.BucketThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
         "orders": "60/min",
         "cart": "60/min",
+        "export": "10/min",
         "user": "2000/day",
         "anon": "200/day",
     },
@@ -182,7 +253,50 @@ SIMPLE_JWT = {
     "SIGNING_KEY": SECRET_KEY,
     "AUTH_HEADER_TYPES": ("Bearer",),
     "AUTH_COOKIE_SECURE": False,
+    # токены несут username/флаги/роли -> аутентификация без запроса к БД
+    "TOKEN_OBTAIN_SERIALIZER": "apps.accounts.serializers.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "apps.accounts.serializers.ClaimsTokenRefreshSerializer",
 }
 
+# SQLite file with the throttle buckets, shared by every worker on the host
+# (":memory:" keeps them per process; the test runner uses that)
+THROTTLE_STORE = os.getenv("THROTTLE_STORE", str(BASE_DIR / "throttle.sqlite3"))
+
+# empties the throttle buckets before every test
+TEST_RUNNER = "apps.common.testing.TestRunner"
+
+# seconds a user's group names stay cached (invalidated on membership change)
+ROLE_CACHE_TTL = int(os.getenv("ROLE_CACHE_TTL", 300))
+
+# seconds the account fields (id, username, email) stay cached for views that need more than the JWT claims
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 60))
+
+# seconds a cached menu/categories response lives (menu version bumps invalidate sooner)
+MENU_CACHE_TTL = int(os.getenv("MENU_CACHE_TTL", 300))
+
+# pre-rendered menu JSON written on every menu change (see apps/menu/snapshot.py)
+MENU_SNAPSHOT_ENABLED = os.getenv("MENU_SNAPSHOT_ENABLED", "1") == "1"
+MENU_SNAPSHOT_ROOT = os.getenv("MENU_SNAPSHOT_ROOT") or MEDIA_ROOT / "snapshots"
+
+# menu photo variants (apps/menu/images.py): render on a background thread pool
+MENU_IMAGE_ASYNC = os.getenv("MENU_IMAGE_ASYNC", "1") == "1"
+MENU_IMAGE_WORKERS = int(os.getenv("MENU_IMAGE_WORKERS", 2))
+
+# order event stream (see apps/delivery/events.py): replay buffer size, seconds
+# between keep-alive comments, seconds before the server closes a stream
+ORDER_EVENTS_BUFFER = int(os.getenv("ORDER_EVENTS_BUFFER", 1000))
+ORDER_EVENTS_HEARTBEAT = int(os.getenv("ORDER_EVENTS_HEARTBEAT", 15))
+ORDER_EVENTS_STREAM_MAX = int(os.getenv("ORDER_EVENTS_STREAM_MAX", 300))
+
+# delivery dispatch (apps/delivery/dispatch.py): orders per UPDATE, open orders
+# a courier may hold before being skipped (0 = no cap)
+DISPATCH_BATCH_SIZE = int(os.getenv("DISPATCH_BATCH_SIZE", 200))
+DISPATCH_MAX_PER_CREW = int(os.getenv("DISPATCH_MAX_PER_CREW", 5))
+
+# order archive (apps/orders/archive.py): delivered orders older than this many
+# days move to the archive tables, this many per transaction
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv("ORDER_ARCHIVE_AFTER_DAYS", 90))
+ORDER_ARCHIVE_BATCH_SIZE = int(os.getenv("ORDER_ARCHIVE_BATCH_SIZE", 500))
+
 CORS_ALLOW_CREDENTIALS = False
 CORS_ALLOWED_ORIGINS = os.getenv("CORS_ALLOWED_ORIGINS").split(' ')
\ No newline at end of file
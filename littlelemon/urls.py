@@ -27,7 +27,9 @@ urlpatterns = [
     path("api/", include("apps.menu.urls")),
     path("api/", include("apps.cart.urls")),
     path("api/", include("apps.orders.urls")),
+    path("api/", include("apps.delivery.urls")),
     path("api/", include("apps.accounts.urls")),
+    path("api/", include("apps.analytics.urls")),
 ]
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)